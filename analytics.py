@@ -0,0 +1,160 @@
+from collections import namedtuple
+from datetime import date, datetime
+import numpy as np
+from habit_classes import Habit
+
+
+# analytics of one habit, see 'analyze()'
+Habit_stats = namedtuple("Habit_stats", ["streak", "longest_streak", "active", "completions"])
+
+
+def pack(habit_dict: dict) -> tuple:
+    """
+    Function to pack the period units (see 'Habit._unit()') of all habits into one concatenated array.
+
+    The day ordinals of all habits are concatenated first and converted to units with one call of '_unit()' per habit
+    class. Days that fall into the same (weekly) unit are dropped afterwards.
+
+    Args:
+        habit_dict (dict): Desired habit dictionary. Should be Habit.Instances!
+
+    Returns:
+        tuple: (units, offsets) - units of habit i are units[offsets[i]:offsets[i + 1]], sorted and without duplicates
+    """
+    habits = list(habit_dict.values())
+    # load missing tracking data of all habits with one query
+    Habit.prefetch(habits)
+    ordinals = np.concatenate([np.frombuffer(habit._dates_checked.ordinals, dtype=np.int32) for habit in habits] +
+                              [np.zeros(0, dtype=np.int32)]).astype(np.int64)
+    counts = np.array([len(habit._dates_checked) for habit in habits], dtype=np.int64)
+    habit_index = np.repeat(np.arange(len(habits)), counts)
+
+    # convert ordinals to units, habits of the same class share one conversion
+    classes = [type(habit) for habit in habits]
+    units = np.empty_like(ordinals)
+    for habit_class in set(classes):
+        mask = np.array([cls is habit_class for cls in classes])[habit_index]
+        units[mask] = habit_class._unit(ordinals[mask])
+
+    # drop units that are equal to the previous unit of the same habit
+    keep = np.ones(len(units), dtype=bool)
+    keep[1:] = (np.diff(units) != 0) | (np.diff(habit_index) != 0)
+    units = units[keep]
+
+    offsets = np.zeros(len(habits) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(habit_index[keep], minlength=len(habits)), out=offsets[1:])
+
+    return units, offsets
+
+
+def analyze(habit_dict: dict) -> dict:
+    """
+    Function to compute current streak, longest streak, activity status and number of completed periods of all habits.
+
+    Habits whose tracked dates are not loaded are answered from their summary (see 'Habit._summary_streak()') where
+    possible. All other habits are analyzed in one vectorized pass (see '_analyze_tracking()').
+
+    Args:
+        habit_dict (dict): Desired habit dictionary. Should be Habit.Instances!
+
+    Returns:
+        dict: Key: habit name, value: 'Habit_stats'
+    """
+    if not type(habit_dict) is dict:
+        raise ValueError("habit_dict should be of type: dict --- ideally Habit.Instances!")
+
+    today = datetime.today().date().toordinal()
+    stats = {}
+    remaining = {}
+    for name, habit in habit_dict.items():
+        streak = habit._summary_streak(habit._unit(today))
+        if streak is None:
+            remaining[name] = habit
+        else:
+            stats[name] = Habit_stats(streak, habit._summary.longest_streak, streak > 0, habit._summary.total)
+
+    stats.update(_analyze_tracking(remaining))
+
+    # keep order of habit_dict
+    return {name: stats[name] for name in habit_dict}
+
+
+def _analyze_tracking(habit_dict: dict) -> dict:
+    """
+    Function to compute current streak, longest streak, activity status and number of completed periods of habits from
+    their tracked dates in one vectorized pass.
+
+    Runs are detected on the packed units of all habits: a new run starts at the first unit of every habit and wherever
+    the difference to the previous unit is not 1. Run lengths follow from the positions of the run starts.
+
+    Args:
+        habit_dict (dict): Desired habit dictionary
+
+    Returns:
+        dict: Key: habit name, value: 'Habit_stats'
+    """
+    if len(habit_dict) == 0:
+        return {}
+
+    habits = list(habit_dict.values())
+    units, offsets = pack(habit_dict)
+    counts = np.diff(offsets)
+    has_units = counts > 0
+
+    # mark first unit of every run
+    run_start = np.ones(len(units), dtype=bool)
+    run_start[1:] = np.diff(units) != 1
+    run_start[offsets[:-1][has_units]] = True
+
+    # length of every run, runs are ordered by habit
+    start_position = np.flatnonzero(run_start)
+    run_length = np.diff(np.append(start_position, len(units)))
+    first_run = np.searchsorted(start_position, offsets[:-1][has_units])
+    longest = np.zeros(len(habits), dtype=np.int64)
+    if len(run_length):
+        longest[has_units] = np.maximum.reduceat(run_length, first_run)
+
+    # look up the current period of all habits at once: the sort key combines habit index and unit, which keeps the
+    # packed units sorted as a whole
+    today = datetime.today().date().toordinal()
+    current = np.array([habit._unit(today) for habit in habits], dtype=np.int64)
+    streak = np.zeros(len(habits), dtype=np.int64)
+    active = np.zeros(len(habits), dtype=bool)
+    if len(units):
+        base = min(units.min(), current.min())
+        span = max(units.max(), current.max()) - base + 1
+        keys = np.repeat(np.arange(len(habits)) * span - base, counts) + units
+        targets = np.arange(len(habits)) * span + (current - base)
+        position = np.minimum(np.searchsorted(keys, targets), len(keys) - 1)
+        active = keys[position] == targets
+
+        # streak counts the run containing the current period up to this period
+        run_of_position = np.searchsorted(start_position, position[active], side="right") - 1
+        streak[active] = current[active] - units[start_position[run_of_position]] + 1
+
+    return {name: Habit_stats(int(streak[index]), int(longest[index]), bool(active[index]), int(counts[index]))
+            for index, name in enumerate(habit_dict)}
+
+
+def count_in_window(habit_dict: dict, first: date, last: date) -> dict:
+    """
+    Function to count the completed periods of all habits between two dates (inclusive) using the history bitsets of
+    the habits (see 'Habit.history_bitset()').
+
+    Args:
+        habit_dict (dict): Desired habit dictionary. Should be Habit.Instances!
+        first (date): First day of the window
+        last (date): Last day of the window
+
+    Returns:
+        dict: Key: habit name, value: number of completed days (Daily) or weeks (Weekly)
+    """
+    if not type(habit_dict) is dict:
+        raise ValueError("habit_dict should be of type: dict --- ideally Habit.Instances!")
+    if not isinstance(first, date) or not isinstance(last, date):
+        raise ValueError("first and last must be of type: date")
+
+    Habit.prefetch(habit_dict.values())
+
+    return {name: habit.history_bitset().count(habit._unit(first.toordinal()), habit._unit(last.toordinal()))
+            for name, habit in habit_dict.items()}
@@ -0,0 +1,9 @@
+"""
+Benchmarks of the habit tracker. Every module is run from the repository root with 'python -m benchmarks.<module>':
+
+    bench_load:     scaling of 'Habit.load()' with habits and days of tracking data
+    bench_profiles: durability profiles on check-off and load workloads
+    bench_suite:    timed scenarios on synthetic workloads, JSON results comparable across commits
+    load_client:    concurrent clients against the HTTP/JSON server
+    synthetic:      deterministic generator of synthetic user databases
+"""
@@ -0,0 +1,93 @@
+"""
+Benchmark for 'Habit.load()'.
+
+Creates synthetic user databases with a growing number of habits and days of tracking data and measures how long it
+takes to load them. Run from the repository root:
+
+    python -m benchmarks.bench_load
+"""
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from habit_classes import Habit, Daily, Weekly
+
+
+HABIT_COUNTS = [10, 100, 300]
+DAY_COUNTS = [30, 365, 1825]
+REPEATS = 3
+
+
+def create_database(db_name: str, habits: int, days: int) -> None:
+    """
+    Function to fill a database with 'habits' habits (every fifth one weekly) that were checked off on each of the last
+    'days' days.
+
+    Args:
+        db_name (str): Path of the database to create
+        habits (int): Number of habits
+        days (int): Number of days of tracking data per habit
+    """
+    Habit.Instances = {}
+    Habit._DB_NAME = db_name
+    first_day = date.today() - timedelta(days=days - 1)
+
+    for number in range(habits):
+        if number % 5 == 4:
+            habit = Weekly(f"Weekly {number}", "Synthetic weekly habit")
+        else:
+            habit = Daily(f"Daily {number}", "Synthetic daily habit")
+
+        for offset in range(days):
+            habit.checkoff_streak(str(first_day + timedelta(days=offset)))
+        habit.save()
+
+    Habit.close_db()
+    Habit.Instances = {}
+
+
+def time_load(db_name: str, lazy: bool = False) -> float:
+    """
+    Function to measure the best of 'REPEATS' loads of a database.
+
+    Args:
+        db_name (str): Path of the database to load
+        lazy (bool) = False: Only load habit metadata (see 'Habit.load()')
+
+    Returns:
+        float: Load time in seconds
+    """
+    best = float("inf")
+    for _ in range(REPEATS):
+        Habit.Instances = {}
+        Habit._DB_NAME = db_name
+        start = time.perf_counter()
+        Habit.load(lazy=lazy)
+        best = min(best, time.perf_counter() - start)
+        Habit.close_db()
+
+    Habit.Instances = {}
+    return best
+
+
+def main() -> None:
+    print(f"{'habits':>8} {'days':>6} {'rows':>9} {'load [ms]':>10} {'us/row':>8} {'lazy [ms]':>10}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for habits in HABIT_COUNTS:
+            for days in DAY_COUNTS:
+                db_name = os.path.join(directory, f"bench_{habits}_{days}.db")
+                create_database(db_name, habits, days)
+                seconds = time_load(db_name)
+                lazy_seconds = time_load(db_name, lazy=True)
+
+                # weekly habits only keep one check-off per week
+                rows = (habits - habits // 5) * days + (habits // 5) * len({(date.today() - timedelta(days=d))
+                                                                            .isocalendar()[:2] for d in range(days)})
+                print(f"{habits:>8} {days:>6} {rows:>9} {seconds * 1000:>10.1f} {seconds * 1e6 / rows:>8.2f} "
+                      f"{lazy_seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
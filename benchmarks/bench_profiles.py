@@ -0,0 +1,88 @@
+"""
+Benchmark for the durability profiles of user databases (see 'storage.PROFILES').
+
+For every profile, measures a check-off workload (one check-off and one 'save()' per transaction, as in the command
+line interface) and a load workload ('Habit.load()' of a database with a year of history). Run from the repository
+root:
+
+    python -m benchmarks.bench_profiles
+"""
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from habit_classes import Daily, HabitRepository
+from storage import PROFILES
+
+HABITS = 20
+CHECKOFFS = 2000
+LOAD_HABITS = 100
+LOAD_DAYS = 365
+REPEATS = 3
+
+
+def time_checkoffs(directory: str, profile: str) -> float:
+    """
+    Function to measure 'CHECKOFFS' single check-offs spread over 'HABITS' habits, each saved in its own transaction.
+
+    Returns:
+        float: Seconds per check-off
+    """
+    repository = HabitRepository(os.path.join(directory, f"checkoff_{profile}"), profile)
+    habits = [Daily(f"Daily {number}", "Synthetic daily habit", repository) for number in range(HABITS)]
+    repository.save_many(habits)
+    first_day = date.today() - timedelta(days=CHECKOFFS // HABITS)
+
+    start = time.perf_counter()
+    for number in range(CHECKOFFS):
+        habit = habits[number % HABITS]
+        habit.checkoff_streak(str(first_day + timedelta(days=number // HABITS)))
+        habit.save()
+    seconds = time.perf_counter() - start
+
+    repository.close()
+    return seconds / CHECKOFFS
+
+
+def time_load(directory: str, profile: str) -> float:
+    """
+    Function to measure the best of 'REPEATS' loads of a database with 'LOAD_HABITS' habits and 'LOAD_DAYS' days of
+    history.
+
+    Returns:
+        float: Load time in seconds
+    """
+    username = os.path.join(directory, f"load_{profile}")
+    repository = HabitRepository(username, profile)
+    first_day = date.today() - timedelta(days=LOAD_DAYS - 1)
+    for number in range(LOAD_HABITS):
+        habit = Daily(f"Daily {number}", "Synthetic daily habit", repository)
+        for offset in range(LOAD_DAYS):
+            habit.checkoff_streak(str(first_day + timedelta(days=offset)))
+    repository.save_many(repository.instances.values())
+    repository.close()
+
+    best = float("inf")
+    for _ in range(REPEATS):
+        repository = HabitRepository(username, profile)
+        start = time.perf_counter()
+        repository.load()
+        best = min(best, time.perf_counter() - start)
+        repository.close()
+
+    return best
+
+
+def main() -> None:
+    print(f"{'profile':>10} {'check-off [ms]':>15} {'load [ms]':>10}")
+
+    with tempfile.TemporaryDirectory(dir=".") as directory:
+        for profile in PROFILES:
+            checkoff_seconds = time_checkoffs(directory, profile)
+            load_seconds = time_load(directory, profile)
+            print(f"{profile:>10} {checkoff_seconds * 1000:>15.3f} {load_seconds * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Benchmark suite on synthetic workloads (see 'benchmarks.synthetic').
+
+Creates the databases of a workload and times the scenarios in 'SCENARIOS': login (eager and lazy 'load()'), single
+check-offs with 'save()', a bulk check-off ('functions.checkoff_many()') and the all-habit streak reports. Every scenario
+runs 'repeats' times on a fresh copy of the databases, the best and the median run are reported. Results are written
+as JSON and can be compared with the results of another commit:
+
+    python -m benchmarks.bench_suite --output results.json
+    python -m benchmarks.bench_suite --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import functions as func
+from habit_classes import Daily, HabitRepository
+from storage import PROFILES, Storage
+from benchmarks.synthetic import PATTERNS, Workload, create_workload
+
+# version of the results format
+RESULTS_VERSION = 1
+
+# number of check-offs of the check-off scenarios
+CHECKOFFS = 200
+
+
+def copy_users(users: list, directory: str) -> list:
+    """
+    Function to copy the databases of a workload into 'directory', so a scenario can change them.
+
+    Returns:
+        list: Usernames of the copies
+    """
+    copies = []
+    for username, _ in users:
+        copy = os.path.join(directory, os.path.basename(username))
+        shutil.copyfile(username + ".db", copy + ".db")
+        copies.append(copy)
+
+    return copies
+
+
+def missing_checkoffs(repository: HabitRepository, count: int) -> list:
+    """
+    Function to choose 'count' (daily habit, date) pairs that are not checked off yet, newest dates first, spread over
+    all daily habits of a loaded repository.
+
+    Returns:
+        list: (habit name, ISO date) pairs
+    """
+    candidates = []
+    for habit in repository.instances.values():
+        if isinstance(habit, Daily):
+            checked = set(habit._dates_checked)
+            day = datetime.today().date()
+            missing = []
+            while len(missing) < count and day.isoformat() >= habit._date_created:
+                if day not in checked:
+                    missing.append((habit._name, day.isoformat()))
+                day -= timedelta(days=1)
+            candidates.append(missing)
+
+    # round robin over the habits
+    items = [item for row in zip(*candidates) for item in row] if candidates else []
+    return items[:count]
+
+
+def login(usernames: list, lazy: bool = False) -> int:
+    # loads every user database, returns the number of operations
+    for username in usernames:
+        repository = HabitRepository(username)
+        repository.load(lazy=lazy)
+        repository.close()
+    return len(usernames)
+
+
+def login_lazy(usernames: list) -> int:
+    return login(usernames, lazy=True)
+
+
+def checkoff(usernames: list) -> tuple:
+    # single check-offs, each saved in its own transaction (as in the command line interface)
+    repository = HabitRepository(usernames[0])
+    repository.load()
+    items = missing_checkoffs(repository, CHECKOFFS)
+
+    start = time.perf_counter()
+    for name, day in items:
+        habit = repository.instances[name]
+        habit.checkoff_streak(day)
+        habit.save()
+    seconds = time.perf_counter() - start
+
+    repository.close()
+    return len(items), seconds
+
+
+def bulk_checkoff(usernames: list) -> tuple:
+    # all check-offs in one 'checkoff_many()' call
+    repository = HabitRepository(usernames[0])
+    repository.load()
+    items = missing_checkoffs(repository, CHECKOFFS)
+
+    start = time.perf_counter()
+    func.checkoff_many(items, repository)
+    seconds = time.perf_counter() - start
+
+    repository.close()
+    return len(items), seconds
+
+
+def report(usernames: list) -> tuple:
+    # current and longest streak of all habits of every user, computed in memory after an eager load
+    repositories = []
+    for username in usernames:
+        repository = HabitRepository(username)
+        repository.load()
+        repositories.append(repository)
+
+    start = time.perf_counter()
+    for repository in repositories:
+        func.list_streak(repository.instances)
+        func.list_longest_streak(repository.instances)
+    seconds = time.perf_counter() - start
+
+    for repository in repositories:
+        repository.close()
+    return sum(len(repository.instances) for repository in repositories), seconds
+
+
+def report_db(usernames: list) -> int:
+    # current and longest streak of all habits of every user, computed by the database after a lazy load
+    for username in usernames:
+        repository = HabitRepository(username)
+        repository.load(lazy=True)
+        func.list_streak_db(repository=repository)
+        func.list_streak_db(longest=True, repository=repository)
+        repository.close()
+    return len(usernames)
+
+
+# scenarios: name -> function of the usernames of a fresh copy of the workload, returning the number of operations (or
+# the number of operations and the measured seconds, if setup must not be timed)
+SCENARIOS = {
+    "login": login,
+    "login_lazy": login_lazy,
+    "checkoff": checkoff,
+    "bulk_checkoff": bulk_checkoff,
+    "report": report,
+    "report_db": report_db,
+}
+
+
+def time_scenario(scenario, users: list, repeats: int) -> dict:
+    """
+    Function to run a scenario 'repeats' times, each time on a fresh copy of the databases.
+
+    Returns:
+        dict: Number of operations, best and median run in seconds and best time per operation in microseconds
+    """
+    runs = []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(users[0][0])) as directory:
+            usernames = copy_users(users, directory)
+            start = time.perf_counter()
+            result = scenario(usernames)
+            seconds = time.perf_counter() - start
+            if isinstance(result, tuple):
+                result, seconds = result
+            runs.append(seconds)
+
+    best = min(runs)
+    return {"ops": result, "best_s": best, "median_s": statistics.median(runs),
+            "us_per_op": best * 1e6 / result if result else None}
+
+
+def git_commit() -> str:
+    """
+    Function to get the current commit of the repository (None outside of a git checkout).
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(workload: Workload, scenarios: list, repeats: int) -> dict:
+    """
+    Function to create a workload in a temporary directory and time the scenarios on it.
+
+    Returns:
+        dict: Results (see 'RESULTS_VERSION')
+    """
+    with tempfile.TemporaryDirectory(dir=".") as directory:
+        users = create_workload(directory, workload)
+        results = {name: time_scenario(SCENARIOS[name], users, repeats) for name in scenarios}
+
+    return {"version": RESULTS_VERSION, "commit": git_commit(), "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "profile": Storage.default_profile,
+            "workload": workload._asdict(), "checkoffs": sum(rows for _, rows in users), "results": results}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Function to compare results with the results of another commit (best time per operation).
+
+    Args:
+        results (dict): Current results
+        baseline (dict): Results to compare with
+        threshold (float): Ratio current / baseline above which a scenario counts as regression
+
+    Returns:
+        list: Names of the regressed scenarios
+    """
+    if baseline.get("workload") != results["workload"] or baseline.get("profile") != results["profile"]:
+        print("warning: the baseline was measured on a different workload or profile")
+
+    print(f"{'scenario':>14} {'baseline [us/op]':>17} {'current [us/op]':>16} {'ratio':>7}")
+    regressions = []
+    for name, result in results["results"].items():
+        before = baseline.get("results", {}).get(name, {}).get("us_per_op")
+        if not before or not result["us_per_op"]:
+            print(f"{name:>14} {'-':>17} {result['us_per_op'] or 0:>16.1f} {'-':>7}")
+            continue
+
+        ratio = result["us_per_op"] / before
+        flag = " regression" if ratio > threshold else ""
+        print(f"{name:>14} {before:>17.1f} {result['us_per_op']:>16.1f} {ratio:>7.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark suite of the habit tracker on synthetic workloads.")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--habits", type=int, default=20, help="habits per user")
+    parser.add_argument("--years", type=float, default=3, help="years of history")
+    parser.add_argument("--density", type=float, default=0.7, help="share of checked periods")
+    parser.add_argument("--pattern", choices=PATTERNS, default="runs", help="gap pattern of the check-offs")
+    parser.add_argument("--weekly-every", type=int, default=5, help="every n-th habit is weekly (0: none)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", choices=list(PROFILES), default="strict", help="durability profile")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of another commit to compare with")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="slowdown (current / baseline) reported as regression")
+    arguments = parser.parse_args()
+
+    workload = Workload(arguments.users, arguments.habits, arguments.years, arguments.density, arguments.pattern,
+                        arguments.weekly_every, arguments.seed)
+    Storage.set_default_profile(arguments.profile)
+    results = run(workload, arguments.scenarios, arguments.repeats)
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            regressions = compare(results, json.load(file), arguments.threshold)
+        if regressions:
+            raise SystemExit(f"regressions: {', '.join(regressions)}")
+    else:
+        print(f"{'scenario':>14} {'ops':>6} {'best [ms]':>10} {'median [ms]':>12} {'us/op':>9}")
+        for name, result in results["results"].items():
+            print(f"{name:>14} {result['ops']:>6} {result['best_s'] * 1000:>10.2f} {result['median_s'] * 1000:>12.2f} "
+                  f"{result['us_per_op'] or 0:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Load client for the HTTP/JSON server ('server.py').
+
+Simulates many concurrent clients on keep-alive connections. Every client creates a habit for its user, checks it off
+and reads the streaks of its user. Prints throughput and latency percentiles. Without '--port', a server is started in
+the same process on a free port with databases in a temporary directory. Run from the repository root:
+
+    python -m benchmarks.load_client --clients 200 --requests 20
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from datetime import date, timedelta
+
+from server import HabitServer
+
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, path: str,
+                  payload: dict = None) -> tuple:
+    """
+    Function to send one request on an open keep-alive connection and read its JSON response.
+
+    Returns:
+        tuple: (status code, JSON payload)
+    """
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")[:-2]
+    headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in header_lines)}
+    data = await reader.readexactly(int(headers.get("content-length", 0)))
+
+    return int(status_line.split(" ")[1]), json.loads(data) if data else None
+
+
+async def client(host: str, port: int, number: int, requests: int, users: int) -> list:
+    """
+    Function to run one client: creates a habit and alternates check-offs and streak reads.
+
+    Args:
+        host (str): Server address
+        port (int): Server port
+        number (int): Number of the client
+        requests (int): Number of requests after creating the habit
+        users (int): Number of users the clients are spread over
+
+    Returns:
+        list: Latency of every request in seconds
+    """
+    user = f"loaduser{number % users}"
+    habit = f"Habit {number}"
+    latencies = []
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        start = time.perf_counter()
+        status, _ = await request(reader, writer, "POST", f"/users/{user}/habits",
+                                  {"name": habit, "description": "Load test habit.", "period": "Daily"})
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            raise RuntimeError(f"creating {habit} failed with status {status}")
+
+        for index in range(requests):
+            start = time.perf_counter()
+            if index % 2:
+                status, _ = await request(reader, writer, "GET", f"/users/{user}/streaks")
+            else:
+                day = date.today() - timedelta(days=index // 2)
+                status, _ = await request(reader, writer, "POST", f"/users/{user}/checkoffs",
+                                          {"items": [[habit, day.isoformat()]]})
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError(f"request failed with status {status}")
+    finally:
+        writer.close()
+
+    return latencies
+
+
+async def run(host: str, port: int, clients: int, requests: int, users: int) -> dict:
+    """
+    Function to run all clients concurrently.
+
+    Returns:
+        dict: Number of requests, duration, requests per second and latency percentiles in milliseconds
+    """
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client(host, port, number, requests, users) for number in range(clients)))
+    seconds = time.perf_counter() - start
+
+    latencies = sorted(latency for result in results for latency in result)
+    percentile = {name: latencies[min(len(latencies) - 1, int(len(latencies) * share))] * 1000
+                  for name, share in [("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)]}
+    return {"requests": len(latencies), "seconds": seconds, "requests_per_second": len(latencies) / seconds,
+            **percentile}
+
+
+async def run_local(clients: int, requests: int, users: int, workers: int) -> dict:
+    """
+    Function to start a server on a free localhost port and run the clients against it.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        server = HabitServer(directory, workers)
+        host, port = await server.start("127.0.0.1", 0)
+        try:
+            return await run(host, port, clients, requests, users)
+        finally:
+            await server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load client for the habit tracker server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="port of a running server (default: start a local server)")
+    parser.add_argument("--clients", type=int, default=200, help="number of concurrent clients")
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--users", type=int, default=50, help="number of users the clients are spread over")
+    parser.add_argument("--workers", type=int, default=4, help="worker threads of the local server")
+    arguments = parser.parse_args()
+
+    if arguments.port is None:
+        report = asyncio.run(run_local(arguments.clients, arguments.requests, arguments.users, arguments.workers))
+    else:
+        report = asyncio.run(run(arguments.host, arguments.port, arguments.clients, arguments.requests,
+                                 arguments.users))
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Deterministic generator of synthetic user databases for the benchmarks.
+
+A workload describes users x habits x years of history. The check-offs of every habit follow a gap pattern (see
+'PATTERNS') with a configurable density (share of checked periods). The same workload and seed always produce the same
+databases relative to the last day of the history, so results of different commits are comparable.
+"""
+import os
+import random
+from collections import namedtuple
+from datetime import date, timedelta
+
+from storage import Storage
+
+
+# gap patterns of the generated check-offs (periods are days for daily and weeks for weekly habits)
+#   uniform:  every period is checked independently with probability 'density'
+#   runs:     streaks and gaps alternate, streaks are 'RUN_LENGTH' periods long on average
+#   weekdays: like uniform, but daily habits are never checked on weekends
+PATTERNS = ("uniform", "runs", "weekdays")
+
+# mean length of a streak in the "runs" pattern
+RUN_LENGTH = 14
+
+# parameters of a synthetic workload, every 'weekly_every'-th habit of a user is weekly
+Workload = namedtuple("Workload", ["users", "habits", "years", "density", "pattern", "weekly_every", "seed"])
+
+
+def checked_units(rng: random.Random, units: int, density: float, pattern: str, weekday=None) -> list:
+    """
+    Function to choose which of 'units' consecutive periods are checked off.
+
+    Args:
+        rng (random.Random): Random number generator of the habit
+        units (int): Number of periods
+        density (float): Share of checked periods (0 to 1)
+        pattern (str): Gap pattern, see 'PATTERNS'
+        weekday (callable) = None: Maps a period to its weekday (daily habits in the "weekdays" pattern)
+
+    Returns:
+        list: Indices of the checked periods in ascending order
+    """
+    if pattern not in PATTERNS:
+        raise ValueError(f"pattern must be one of: {', '.join(PATTERNS)}")
+    if not 0 <= density <= 1:
+        raise ValueError("density must be between 0 and 1")
+
+    if pattern != "runs" or density in (0, 1):
+        return [unit for unit in range(units) if rng.random() < density
+                and (pattern != "weekdays" or weekday is None or weekday(unit) < 5)]
+
+    # geometric run and gap lengths, chosen so that runs cover 'density' of all periods on average
+    mean_gap = RUN_LENGTH * (1 - density) / density
+    checked = []
+    unit = int(rng.expovariate(1 / mean_gap))
+    while unit < units:
+        length = max(1, round(rng.expovariate(1 / RUN_LENGTH)))
+        checked.extend(range(unit, min(unit + length, units)))
+        unit += length + max(1, round(rng.expovariate(1 / mean_gap)))
+
+    return checked
+
+
+def create_user(path: str, workload: Workload, user: int, last_day: date) -> int:
+    """
+    Function to create the database of one user of a workload. Habits and check-offs are written with 'Storage' in one
+    transaction, 'habit_stats' is computed by the database afterwards.
+
+    Args:
+        path (str): Path of the database to create (must not exist)
+        workload (Workload): Parameters of the workload
+        user (int): Number of the user (selects the random sequence)
+        last_day (date): Last day of the history
+
+    Returns:
+        int: Number of check-offs
+    """
+    # string seeds are hashed deterministically (independent of PYTHONHASHSEED)
+    rng = random.Random(f"{workload.seed}-{user}")
+    days = round(workload.years * 365)
+    first_day = last_day - timedelta(days=days - 1)
+    first_monday = first_day - timedelta(days=first_day.weekday())
+    weeks = (last_day - first_monday).days // 7 + 1
+    rows = 0
+
+    storage = Storage.open(path)
+    with storage.transaction():
+        for number in range(workload.habits):
+            weekly = workload.weekly_every and number % workload.weekly_every == workload.weekly_every - 1
+            period = "Weekly" if weekly else "Daily"
+            habit_id = storage.insert_habit(f"{period} {number}", f"Synthetic {period.lower()} habit", period,
+                                            str(first_day))
+            if weekly:
+                # one check-off per week on a random day, clipped to the history
+                ordinals = [max(first_day, min(last_day, first_monday + timedelta(weeks=unit, days=rng.randrange(7))))
+                            .toordinal()
+                            for unit in checked_units(rng, weeks, workload.density, workload.pattern)]
+            else:
+                ordinals = [first_day.toordinal() + unit for unit in
+                            checked_units(rng, days, workload.density, workload.pattern,
+                                          lambda unit: (first_day.weekday() + unit) % 7)]
+            storage.insert_dates([(habit_id, ordinal) for ordinal in ordinals])
+            rows += len(ordinals)
+        storage.rebuild_stats()
+    storage.close()
+
+    return rows
+
+
+def create_workload(directory: str, workload: Workload, last_day: date = None) -> list:
+    """
+    Function to create the databases of all users of a workload.
+
+    Args:
+        directory (str): Directory of the databases
+        workload (Workload): Parameters of the workload
+        last_day (date) = None: Last day of the history (default: today)
+
+    Returns:
+        list: (username, number of check-offs) per user, the database of a user is '<username>.db'
+    """
+    last_day = last_day or date.today()
+    users = []
+    for user in range(workload.users):
+        username = os.path.join(directory, f"user{user}")
+        users.append((username, create_user(username + ".db", workload, user, last_day)))
+
+    return users
@@ -0,0 +1,248 @@
+"""
+Command line interface of the habit tracker.
+
+Without a command, the interactive interface is started. The commands work on the database of one user without
+interaction, e.g. from cron or shell scripts:
+
+    python cli.py checkoff --user alice Brush --date 2026-10-01
+    python cli.py streaks --user alice --json
+    python cli.py rebuild-stats --user alice
+    python cli.py import --user alice history.csv
+    python cli.py export --user alice history.npz --habit Brush --from 2026-01-01
+
+Modules are imported by the command that needs them (questionary for the interactive interface, numpy for exports), so
+short commands start quickly.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+
+def _date(value: str) -> date:
+    # argparse type of dates in format YYYY-MM-DD
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError("date must match format YYYY-MM-DD")
+
+
+def _open_user(user: str, create: bool = False):
+    """
+    Function to open the repository of a user without loading habits.
+
+    Args:
+        user (str): Username
+        create (bool) = False: Create the database if the user does not exist (otherwise: exit with an error)
+
+    Returns:
+        HabitRepository
+    """
+    import functions as func
+    from habit_classes import HabitRepository
+
+    if not create and not func.username_exists(user):
+        raise SystemExit(f"error: user {user} does not exist")
+
+    return HabitRepository(user)
+
+
+def tui(arguments) -> int:
+    """
+    Command to run the interactive interface.
+    """
+    from interface import main_menu, user_login
+
+    user_login(getattr(arguments, "write_behind", False))
+    main_menu()
+    return 0
+
+
+def checkoff(arguments) -> int:
+    """
+    Command to check off habits. Only the habits that are checked off are loaded (see 'HabitRepository.load_habit()').
+    """
+    import functions as func
+
+    repository = _open_user(arguments.user)
+    try:
+        for name in set(arguments.habits):
+            repository.load_habit(name)
+        day = arguments.date or str(date.today())
+        results = func.checkoff_many([(name, day) for name in arguments.habits], repository)
+    finally:
+        repository.close()
+
+    if arguments.json:
+        print(json.dumps([result._asdict() for result in results]))
+    else:
+        for result in results:
+            print(f"{result.name} {result.date}: {result.status}" + (f" ({result.message})" if result.message else ""))
+
+    return 1 if any(result.status == "invalid" for result in results) else 0
+
+
+def streaks(arguments) -> int:
+    """
+    Command to print the current or longest streaks of all habits. Streaks are computed by the database, no habits are
+    loaded.
+    """
+    import functions as func
+
+    repository = _open_user(arguments.user)
+    try:
+        streak_dict = func.list_streak_db(arguments.longest, repository)
+    finally:
+        repository.close()
+
+    print(json.dumps(streak_dict) if arguments.json else func.habit_streak_string(streak_dict))
+    return 0
+
+
+def rebuild_stats(arguments) -> int:
+    """
+    Command to recompute the streak summaries of the user database.
+    """
+    import functions as func
+
+    repository = _open_user(arguments.user)
+    try:
+        repository.load(lazy=True)
+        func.rebuild_stats(repository)
+    finally:
+        repository.close()
+
+    print(f"Rebuilt summaries of {len(repository.instances)} habits.")
+    return 0
+
+
+def import_(arguments) -> int:
+    """
+    Command to import check-offs from a CSV or JSONL file (creates the user if necessary).
+    """
+    import importer
+
+    # checked before the user is opened, so a rejected import does not create a database
+    if os.path.splitext(arguments.path)[1].lower() not in importer.READERS:
+        raise SystemExit(f"error: {arguments.path} is not a .csv or .jsonl file")
+    if not os.path.isfile(arguments.path):
+        raise SystemExit(f"error: {arguments.path} does not exist")
+
+    repository = _open_user(arguments.user, create=True)
+    try:
+        report = importer.import_file(arguments.path, arguments.chunk_size, repository)
+    except (ValueError, OSError) as error:
+        raise SystemExit(f"error: import failed: {error}")
+    finally:
+        repository.close()
+
+    print(json.dumps(report._asdict()) if arguments.json else
+          f"{report.rows} rows: {report.added} added, {report.duplicates} duplicates, {report.invalid} invalid, "
+          f"{report.habits_created} habits created ({report.rows_per_second:.0f} rows/s)")
+    return 0
+
+
+def export(arguments) -> int:
+    """
+    Command to export tracked dates to a CSV, JSONL or NPZ file.
+    """
+    import exporter
+
+    if os.path.splitext(arguments.path)[1].lower() not in exporter.EXTENSIONS:
+        raise SystemExit(f"error: {arguments.path} is not a .csv, .jsonl or .npz file")
+
+    repository = _open_user(arguments.user)
+    try:
+        rows = exporter.export_file(arguments.path, arguments.habits, arguments.first, arguments.last,
+                                    repository=repository)
+    except (ValueError, OSError) as error:
+        raise SystemExit(f"error: export failed: {error}")
+    finally:
+        repository.close()
+
+    print(f"Exported {rows} check-offs to {arguments.path}.")
+    return 0
+
+
+def parser() -> argparse.ArgumentParser:
+    """
+    Function to build the argument parser of the command line interface.
+    """
+    parser = argparse.ArgumentParser(prog="habit", description="Habit tracker")
+    parser.add_argument("--trace", nargs="?", const="1", metavar="FILE",
+                        help="record timing spans, print a summary on exit and optionally write them to FILE "
+                             "(JSON lines)")
+    parser.add_argument("--profile", nargs="?", const="1", metavar="FILE",
+                        help="profile the session with cProfile and optionally dump the statistics to FILE")
+    parser.add_argument("--metrics", metavar="TARGET",
+                        help="write metrics in OpenMetrics format to a file, unix:<path> or tcp:<host>:<port>")
+    parser.set_defaults(command=tui)
+    commands = parser.add_subparsers(title="commands")
+
+    command = commands.add_parser("tui", help="interactive interface (default)")
+    command.add_argument("--write-behind", action="store_true",
+                         help="save check-offs in the background (pending check-offs are written on exit)")
+    command.set_defaults(command=tui)
+
+    command = commands.add_parser("checkoff", help="check off habits")
+    command.add_argument("--user", required=True)
+    command.add_argument("habits", nargs="+", metavar="HABIT")
+    command.add_argument("--date", help="date in format YYYY-MM-DD (default: today)")
+    command.add_argument("--json", action="store_true", help="print the results as JSON")
+    command.set_defaults(command=checkoff)
+
+    command = commands.add_parser("streaks", help="print the streaks of all habits")
+    command.add_argument("--user", required=True)
+    command.add_argument("--longest", action="store_true", help="longest instead of current streaks")
+    command.add_argument("--json", action="store_true", help="print the streaks as JSON object")
+    command.set_defaults(command=streaks)
+
+    command = commands.add_parser("rebuild-stats", help="recompute the streak summaries")
+    command.add_argument("--user", required=True)
+    command.set_defaults(command=rebuild_stats)
+
+    command = commands.add_parser("import", help="import check-offs from a .csv or .jsonl file")
+    command.add_argument("--user", required=True)
+    command.add_argument("path")
+    command.add_argument("--chunk-size", type=int, default=10000, help="records per transaction")
+    command.add_argument("--json", action="store_true", help="print the report as JSON")
+    command.set_defaults(command=import_)
+
+    command = commands.add_parser("export", help="export check-offs to a .csv, .jsonl or .npz file")
+    command.add_argument("--user", required=True)
+    command.add_argument("path")
+    command.add_argument("--habit", dest="habits", action="append", metavar="HABIT",
+                         help="export only this habit (repeatable)")
+    command.add_argument("--from", dest="first", type=_date, help="first date (YYYY-MM-DD)")
+    command.add_argument("--to", dest="last", type=_date, help="last date (YYYY-MM-DD)")
+    command.set_defaults(command=export)
+
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """
+    Function to run the command line interface.
+
+    Args:
+        argv (list) = None: Arguments (default: 'sys.argv[1:]')
+
+    Returns:
+        int: Exit status
+    """
+    arguments = parser().parse_args(argv)
+
+    # without options, the environment variables HABIT_TRACE, HABIT_PROFILE and HABIT_METRICS are used
+    if arguments.trace or arguments.profile or "HABIT_TRACE" in os.environ or "HABIT_PROFILE" in os.environ:
+        import tracing
+        tracing.configure(arguments.trace, arguments.profile)
+    if arguments.metrics or "HABIT_METRICS" in os.environ:
+        import metrics
+        metrics.configure(arguments.metrics)
+
+    return arguments.command(arguments)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+from array import array
+from bisect import bisect_left, insort
+from collections.abc import Sequence
+from datetime import date
+
+
+class DateStore(Sequence):
+    """
+    Class to store the tracked dates of a habit. Dates are kept sorted and without duplicates as integer day ordinals
+    (see 'date.toordinal()') in an array, which needs four bytes per date. Membership checks use binary search.
+
+    Behaves like a read-only sequence of 'date' objects; dates can only be added via 'add()' or 'add_ordinal()'.
+
+    Class methods:
+        from_ordinals()
+
+    Instance methods:
+        add()
+        add_ordinal()
+        contains_ordinal()
+        count()
+        index()
+
+    Properties:
+        ordinals
+    """
+    __slots__ = ("_ordinals",)
+
+    def __init__(self, dates=()):
+        """
+        Creates a store containing the given dates.
+
+        Args:
+            dates (iterable): 'date' objects in any order, duplicates are removed
+        """
+        self._ordinals = array("i", sorted({day.toordinal() for day in dates}))
+
+    @classmethod
+    def from_ordinals(cls, ordinals) -> "DateStore":
+        """
+        Class method to create a store from day ordinals (e.g. rows of 'tracking' table).
+
+        Args:
+            ordinals (iterable): Day ordinals in any order, duplicates are removed
+
+        Returns:
+            DateStore
+        """
+        store = cls()
+        store._ordinals = array("i", sorted(set(ordinals)))
+        return store
+
+    @property
+    def ordinals(self) -> array:
+        """
+        Sorted day ordinals of all dates. Must not be modified.
+        """
+        return self._ordinals
+
+    def add(self, day: date) -> bool:
+        """
+        Adds a date to the store if it is not contained already.
+
+        Args:
+            day (date): Date to add
+
+        Returns:
+            bool: True if the date was added
+        """
+        return self.add_ordinal(day.toordinal())
+
+    def add_ordinal(self, ordinal: int) -> bool:
+        """
+        Adds a day ordinal to the store if it is not contained already. Appending dates in chronological order is O(1).
+
+        Args:
+            ordinal (int): Day ordinal to add
+
+        Returns:
+            bool: True if the ordinal was added
+        """
+        ordinals = self._ordinals
+        if not ordinals or ordinal > ordinals[-1]:
+            ordinals.append(ordinal)
+            return True
+        if self.contains_ordinal(ordinal):
+            return False
+
+        insort(ordinals, ordinal)
+        return True
+
+    def contains_ordinal(self, ordinal: int) -> bool:
+        """
+        Checks if a day ordinal is contained in the store.
+
+        Args:
+            ordinal (int): Day ordinal to look up
+
+        Returns:
+            bool
+        """
+        ordinals = self._ordinals
+        position = bisect_left(ordinals, ordinal)
+        return position < len(ordinals) and ordinals[position] == ordinal
+
+    def count(self, day: date) -> int:
+        """
+        Counts the occurrences of a date (0 or 1).
+        """
+        return 1 if day in self else 0
+
+    def index(self, day: date, start: int = 0, stop: int = None) -> int:
+        """
+        Returns the position of a date in the sorted store.
+        """
+        if day in self:
+            position = bisect_left(self._ordinals, day.toordinal())
+            if start <= position and (stop is None or position < stop):
+                return position
+        raise ValueError(f"{day} is not in store")
+
+    def __contains__(self, day) -> bool:
+        if not isinstance(day, date):
+            return False
+        return self.contains_ordinal(day.toordinal())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [date.fromordinal(ordinal) for ordinal in self._ordinals[index]]
+        return date.fromordinal(self._ordinals[index])
+
+    def __iter__(self):
+        return map(date.fromordinal, self._ordinals)
+
+    def __reversed__(self):
+        return map(date.fromordinal, reversed(self._ordinals))
+
+    def __len__(self) -> int:
+        return len(self._ordinals)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DateStore):
+            return self._ordinals == other._ordinals
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"DateStore({list(self)!r})"
@@ -0,0 +1,116 @@
+import csv
+import json
+import os
+import zipfile
+from datetime import date
+import numpy as np
+from habit_classes import Habit, HabitRepository
+
+
+# supported file formats
+EXTENSIONS = (".csv", ".jsonl", ".ndjson", ".npz")
+
+
+def _batches(cursor, size: int):
+    """
+    Generator to read a cursor in batches of at most 'size' rows (see 'sqlite3.Cursor.fetchmany()').
+    """
+    while batch := cursor.fetchmany(size):
+        yield batch
+
+
+def _records(storage, names, first: int, last: int, batch_size: int):
+    """
+    Generator to convert tracked dates to records in the format of 'importer.read_csv()'. Habits without tracked dates
+    are converted to one record without date (None), so importing the file creates them, too.
+    """
+    for batch in _batches(storage.fetch_export_tracking(names, first, last, empty=True), batch_size):
+        for _, name, period, description, ordinal in batch:
+            yield {"habit": name, "date": None if ordinal is None else date.fromordinal(ordinal).isoformat(),
+                   "period": period, "description": description}
+
+
+def _write_column(archive: zipfile.ZipFile, name: str, length: int, batches) -> None:
+    """
+    Writes a 1-dimensional int32 array to a '.npy' member of an archive batch by batch.
+
+    Args:
+        archive (zipfile.ZipFile): Archive opened for writing
+        name (str): Name of the array
+        length (int): Total number of values
+        batches (iterable): Lists of values
+    """
+    with archive.open(name + ".npy", "w", force_zip64=True) as file:
+        np.lib.format.write_array_header_1_0(file, {"descr": "<i4", "fortran_order": False, "shape": (length,)})
+        for batch in batches:
+            file.write(np.array(batch, dtype="<i4").tobytes())
+
+
+def export_file(path: str, names=None, first: date = None, last: date = None, batch_size: int = 10000,
+                repository: HabitRepository = None) -> int:
+    """
+    Function to export tracked dates of the user database to a CSV, JSONL or NPZ file (by extension) without loading
+    Habit instances.
+
+    Rows are ordered by habit and date and read with 'fetchmany()' batches, so memory stays flat regardless of the size
+    of the history. CSV and JSONL files contain one record per tracked date in the format read by 'importer' and one
+    record without date per habit without tracked dates. NPZ files contain the columns 'habit_id' and 'date' (day
+    ordinals) of the tracked dates and the columns 'habits_id', 'habits_name', 'habits_description', 'habits_period' and
+    'habits_date_created' of the exported habits, read within one transaction.
+
+    Args:
+        path (str): Path of the file (.csv, .jsonl or .npz)
+        names (iterable) = None: Names of the habits to export (default: all habits)
+        first (date) = None: First date to export (default: no limit)
+        last (date) = None: Last date to export (default: no limit)
+        batch_size (int) = 10000: Number of rows per 'fetchmany()' call
+        repository (HabitRepository) = None: Repository of the user (default: 'Habit.default_repository()')
+
+    Returns:
+        int: Number of exported tracked dates
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError("path must be a .csv, .jsonl or .npz file")
+    if (first is not None and not isinstance(first, date)) or (last is not None and not isinstance(last, date)):
+        raise ValueError("first and last must be of type: date")
+    if not type(batch_size) is int or batch_size < 1:
+        raise ValueError("batch_size must be a positive int")
+
+    storage = (repository if repository is not None else Habit.default_repository()).storage
+    names = None if names is None else list(names)
+    first = None if first is None else first.toordinal()
+    last = None if last is None else last.toordinal()
+    rows = 0
+
+    if extension == ".csv":
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, ["habit", "date", "period", "description"])
+            writer.writeheader()
+            for record in _records(storage, names, first, last, batch_size):
+                writer.writerow(record)
+                rows += record["date"] is not None
+    elif extension == ".npz":
+        # the length of the columns is written before their rows, so the rows must not change in between
+        with storage.read_transaction(), zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            rows = storage.count_export_tracking(names, first, last)
+            habits = storage.fetch_export_habits(names).fetchall()
+            for column, values in [("habits_id", [habit[0] for habit in habits]),
+                                   ("habits_name", [habit[1] for habit in habits]),
+                                   ("habits_description", [habit[2] for habit in habits]),
+                                   ("habits_period", [habit[3] for habit in habits]),
+                                   ("habits_date_created", [habit[4] for habit in habits])]:
+                with archive.open(column + ".npy", "w") as file:
+                    np.lib.format.write_array(file, np.array(values, dtype=None if values else "<U1"))
+            # one pass over the cursor per column
+            _write_column(archive, "habit_id", rows, ([row[0] for row in batch] for batch in
+                          _batches(storage.fetch_export_tracking(names, first, last), batch_size)))
+            _write_column(archive, "date", rows, ([row[4] for row in batch] for batch in
+                          _batches(storage.fetch_export_tracking(names, first, last), batch_size)))
+    else:
+        with open(path, "w", encoding="utf-8") as file:
+            for record in _records(storage, names, first, last, batch_size):
+                file.write(json.dumps(record) + "\n")
+                rows += record["date"] is not None
+
+    return rows
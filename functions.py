@@ -1,5 +1,24 @@
 import os
-from habit_classes import Habit, Daily, Weekly
+from collections import namedtuple
+from datetime import date, datetime
+import metrics
+from habit_classes import Habit, Daily, Weekly, HabitRepository
+from storage import Habit_summary
+
+
+# result of one check-off, see 'checkoff_many()'
+Checkoff_result = namedtuple("Checkoff_result", ["name", "date", "status", "message"])
+
+
+def _repository(repository: HabitRepository) -> HabitRepository:
+    """
+    Function to validate a repository argument. Falls back to 'Habit.default_repository()'.
+    """
+    if repository is None:
+        return Habit.default_repository()
+    if not isinstance(repository, HabitRepository):
+        raise ValueError("repository must be of type: HabitRepository")
+    return repository
 
 
 def username_exists(username: str) -> bool:
@@ -16,21 +35,24 @@ def username_exists(username: str) -> bool:
     return os.path.exists(database)
 
 
-def create_predefined_habits() -> None:
+def create_predefined_habits(repository: HabitRepository = None) -> None:
     """
     Function to create five pre-defined habits and save them to user database.
+
+    Args:
+        repository (HabitRepository) = None: Repository of the user (default: 'Habit.default_repository()')
     """
-    Daily("Brush", "Brush your teeth at least once a day.")
-    Daily("Duolingo", "Do a lesson on Duolingo.")
-    Daily("Exercise", "Exercise for 30 minutes.")
-    Weekly("Plants", "Water your plants every week.")
-    Weekly("Clean", "Clean your apartment.")
+    repository = _repository(repository)
+    Daily("Brush", "Brush your teeth at least once a day.", repository)
+    Daily("Duolingo", "Do a lesson on Duolingo.", repository)
+    Daily("Exercise", "Exercise for 30 minutes.", repository)
+    Weekly("Plants", "Water your plants every week.", repository)
+    Weekly("Clean", "Clean your apartment.", repository)
 
-    for habit in Habit.Instances.values():
-        habit.save()
+    repository.save_many(repository.instances.values())
 
 
-def create_habit(period: str, name: str, description: str):
+def create_habit(period: str, name: str, description: str, repository: HabitRepository = None):
     """
     Function to create a habit and save it to the database.
 
@@ -38,6 +60,7 @@ def create_habit(period: str, name: str, description: str):
         period (str): Desired periodicity of habit ('Daily'/'Weekly')
         name (str): Name of habit
         description (str): Description of habit
+        repository (HabitRepository) = None: Repository of the user (default: 'Habit.default_repository()')
 
     """
     if not period == "Daily" and not period == "Weekly":
@@ -45,12 +68,13 @@ def create_habit(period: str, name: str, description: str):
     if not type(name) is str or not type(description) is str:
         raise ValueError("name and description must be of type: str")
 
+    repository = _repository(repository)
     if period == "Daily":
-        Daily(name, description)
+        Daily(name, description, repository)
     elif period == "Weekly":
-        Weekly(name, description)
+        Weekly(name, description, repository)
 
-    Habit.Instances[name].save()
+    repository.instances[name].save()
 
 
 def habit_created_info(period: str, name: str, description: str) -> str:
@@ -119,6 +143,7 @@ def list_habits(habit_dict: dict, period: str = None) -> list:
         return [habit for habit in habit_dict]
 
 
+@metrics.ANALYTICS_SECONDS.time(function="list_active")
 def list_active(habit_dict: dict, active: bool = True) -> list:
     """
     Function to create a list of active/inactive habits.
@@ -135,12 +160,14 @@ def list_active(habit_dict: dict, active: bool = True) -> list:
     if not type(active) is bool:
         raise ValueError("active should be of type: bool")
 
-    if active:
-        return [habit for habit in habit_dict if habit_dict[habit].is_active()]
-    else:
-        return [habit for habit in habit_dict if not habit_dict[habit].is_active()]
+    # imported on first use, numpy slows down the start of the command line interface
+    import analytics
+
+    stats = analytics.analyze(habit_dict)
+    return [habit for habit in stats if stats[habit].active == active]
 
 
+@metrics.ANALYTICS_SECONDS.time(function="list_streak")
 def list_streak(habit_dict: dict) -> dict:
     """
        Function to return a dictionary containing all habits and their streaks. Key: habit, value: streak
@@ -154,13 +181,14 @@ def list_streak(habit_dict: dict) -> dict:
     if not type(habit_dict) is dict:
         raise ValueError("habit_dict should be of type: dict --- ideally Habit.Instances!")
 
-    streak_dict = {}
-    for habit in habit_dict:
-        streak_dict.update({habit: habit_dict[habit].streak()})
+    # imported on first use (see 'list_active()')
+    import analytics
 
-    return streak_dict
+    stats = analytics.analyze(habit_dict)
+    return {habit: stats[habit].streak for habit in stats}
 
 
+@metrics.ANALYTICS_SECONDS.time(function="list_longest_streak")
 def list_longest_streak(habit_dict: dict) -> dict:
     """
        Function to return a dictionary containing all habits and their longest streaks. Key: habit,
@@ -175,11 +203,105 @@ def list_longest_streak(habit_dict: dict) -> dict:
     if not type(habit_dict) is dict:
         raise ValueError("habit_dict should be of type: dict --- ideally Habit.Instances!")
 
-    streak_dict = {}
-    for habit in habit_dict:
-        streak_dict.update({habit: habit_dict[habit].longest_streak()})
+    # imported on first use (see 'list_active()')
+    import analytics
 
-    return streak_dict
+    stats = analytics.analyze(habit_dict)
+    return {habit: stats[habit].longest_streak for habit in stats}
+
+
+@metrics.ANALYTICS_SECONDS.time(function="list_streak_db")
+def list_streak_db(longest: bool = False, repository: HabitRepository = None) -> dict:
+    """
+       Function to return a dictionary containing all habits of the user database and their streaks.
+       Streaks are computed by the database, no Habit instances or tracking data are loaded. Key: habit, value: streak
+
+       Args:
+           longest (bool) = False: Argument to choose whether longest or current streaks should be listed
+           repository (HabitRepository) = None: Repository of the user (default: 'Habit.default_repository()')
+
+       Returns:
+           dict
+   """
+    if not type(longest) is bool:
+        raise ValueError("longest should be of type: bool")
+
+    today = datetime.today().date().toordinal()
+    repository = _repository(repository)
+    repository.flush()
+    rows = repository.storage.fetch_streaks(today)
+
+    if longest:
+        return {name: longest_streak for name, streak, longest_streak in rows}
+    else:
+        return {name: streak for name, streak, longest_streak in rows}
+
+
+@metrics.DB_SECONDS.time(operation="rebuild_stats")
+def rebuild_stats(repository: HabitRepository = None) -> None:
+    """
+    Function to recompute the streak summaries ('habit_stats' table) of the user database from the tracked dates, e.g.
+    if summaries are missing or stale. Summaries of loaded habits are refreshed as well.
+
+    Args:
+        repository (HabitRepository) = None: Repository of the user (default: 'Habit.default_repository()')
+    """
+    repository = _repository(repository)
+    repository.flush()
+    storage = repository.storage
+    storage.rebuild_stats()
+
+    summaries = {row["id"]: row for row in storage.fetch_habits()}
+    for habit in repository.instances.values():
+        if habit._id in summaries:
+            row = summaries[habit._id]
+            habit._summary = Habit_summary(row["run_start"], row["last_checked"], row["longest_streak"], row["total"])
+
+
+def checkoff_many(items, repository: HabitRepository = None) -> list:
+    """
+    Function to check off many habits and dates at once (e.g. backfills). Dates are validated like user input (see
+    'validators.date_validator()') and applied in memory with the rules of the habit period, i.e. a date is a duplicate
+    if it (Daily) or a date of the same week (Weekly) is already checked off. All new dates are saved in one
+    transaction (see 'HabitRepository.save_many()').
+
+    Args:
+        items (iterable): (habit name, date) pairs. Date as 'date', string in format YYYY-MM-DD or "today"
+        repository (HabitRepository) = None: Repository of the user (default: 'Habit.default_repository()')
+
+    Returns:
+        list: 'Checkoff_result' per item in input order, status: "added", "duplicate" or "invalid"
+    """
+    # validators imports this module
+    from validators import date_validator
+
+    repository = _repository(repository)
+    habits = repository.instances
+    results = []
+    changed = {}
+    for name, day in items:
+        if name not in habits:
+            results.append(Checkoff_result(name, day, "invalid", "Habit does not exist."))
+            continue
+
+        if day == "today":
+            day = datetime.today().date()
+        if isinstance(day, date):
+            day = day.isoformat()
+        valid = date_validator(day) if type(day) is str else "Date must match format YYYY-MM-DD"
+        if valid is not True:
+            results.append(Checkoff_result(name, day, "invalid", valid))
+            continue
+
+        habit = habits[name]
+        if habit.checkoff_streak(day):
+            changed[name] = habit
+            results.append(Checkoff_result(name, day, "added", None))
+        else:
+            results.append(Checkoff_result(name, day, "duplicate", "Period already checked off."))
+
+    repository.save_many(changed.values())
+    return results
 
 
 def habit_list_as_string(habit_list: list) -> str:
@@ -1,7 +1,16 @@
+import time
+import weakref
 from abc import ABC, abstractmethod
-import sqlite3
-from datetime import datetime, timedelta
+from datetime import date, datetime
+from itertools import groupby
+from operator import itemgetter
 from week_tuple import Week_tuple
+from date_store import DateStore
+from run_index import RunIndex
+from history_bitset import HistoryBitset
+from storage import Storage, Habit_summary
+from write_behind import WriteBehindQueue
+import metrics
 
 
 class Habit(ABC):
@@ -10,12 +19,20 @@ class Habit(ABC):
     deleting) of instances.
 
     Class attributes:
-        Instances (dict): Dictionary, which contains all instances of all child classes. Keys: Habit.name, Values: Habit
-        _DB_NAME (str): Database to which class connects (for loading, saving, etc.)
+        Instances (dict): Dictionary, which contains all instances of the default repository (see
+            'default_repository()'). Keys: Habit.name, Values: Habit
+        _DB_NAME (str): Database of the default repository (for loading, saving, etc.)
 
     Class methods:
         load()
+        load_habit()
+        prefetch()
+        save_many()
+        default_repository()
         change_db()
+        close_db()
+        _storage()
+        _by_repository()
 
     Instance methods:
         _initialize_db()
@@ -24,6 +41,14 @@ class Habit(ABC):
         update_description()
         delete()
         save()
+        run_count()
+        history_bitset()
+        _current_summary()
+        _summary_streak()
+        _mark_saved()
+        _set_date_store()
+        _ensure_tracking()
+        _add_date()
 
     Abstract methods:
         __init__()
@@ -31,61 +56,137 @@ class Habit(ABC):
         is_active()
         streak()
         longest_streak()
+        _unit()
+        _first_day()
     """
     Instances = {}
 
     _DB_NAME = "_test.db"
 
     @classmethod
-    def load(cls) -> None:
+    def load(cls, lazy: bool = False) -> None:
         """
-        Class method to load all previously saved Habit instances.
+        Class method to load all previously saved Habit instances of Habit._DB_NAME into 'Habit.Instances' (see
+        'HabitRepository.load()').
 
-        Connects to Habit._DB_NAME and initializes instances using 'period', 'name', 'description' values from 'habit'
-        table. Then, restores id and date_created.
-        Lastly, loads tracking data based on instance id from 'tracking' table.
+        Args:
+            lazy (bool) = False: Only load metadata from 'habit' table
         """
-        # connect to user database
-        with sqlite3.connect(cls._DB_NAME) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+        _default_repository.load(lazy)
 
-            cursor.execute("SELECT * FROM habit")
-            existing_habits = cursor.fetchall()
+    @classmethod
+    def load_habit(cls, name: str) -> "Habit":
+        """
+        Class method to load one habit of Habit._DB_NAME by name into 'Habit.Instances' (see
+        'HabitRepository.load_habit()').
+
+        Args:
+            name (str): Name of the habit
 
-            # initialize all habits
-            for habit in existing_habits:
-                if habit["period"] == "Daily":
-                    Daily(habit["name"], habit["description"])
-                elif habit["period"] == "Weekly":
-                    Weekly(habit["name"], habit["description"])
-                Habit.Instances[habit["name"]]._id = habit["id"]
-                Habit.Instances[habit["name"]]._date_created = habit["date_created"]
+        Returns:
+            Daily, Weekly or None if the habit does not exist
+        """
+        return _default_repository.load_habit(name)
+
+    @classmethod
+    def prefetch(cls, habits=None) -> None:
+        """
+        Class method to load the tracking data of all habits that have not been loaded yet, one query per repository
+        (see 'HabitRepository.prefetch()').
 
-            # load tracking data for each habit
-            for habit in Habit.Instances.values():
-                cursor.execute("SELECT * FROM tracking WHERE habit_id=?", (habit._id,))
-                dates = cursor.fetchall()
+        Args:
+            habits (iterable) = None: Habit instances to load (default: all instances in 'Habit.Instances')
+        """
+        if habits is None:
+            habits = Habit.Instances.values()
 
-                for date in dates:
-                    habit._dates_checked.append(datetime.strptime(date["date_checked"], "%Y-%m-%d").date())
+        for repository, repository_habits in cls._by_repository(habits).items():
+            repository.prefetch(repository_habits)
 
     @classmethod
-    def change_db(cls, username: str):
+    def save_many(cls, habits) -> None:
         """
-        Class method to change user database (Habit._DB_NAME).
+        Class method to save several Habit instances, one transaction per repository (see
+        'HabitRepository.save_many()').
 
         Args:
-            username (str): Enter a username / database name
+            habits (iterable): Habit instances to save
+        """
+        for repository, repository_habits in cls._by_repository(habits).items():
+            repository.save_many(repository_habits)
 
+    @classmethod
+    def default_repository(cls) -> "HabitRepository":
+        """
+        Class method to get the repository of habits that are not bound to a repository explicitly. It shares its
+        registry and database with 'Habit.Instances' and 'Habit._DB_NAME'.
+
+        Returns:
+            HabitRepository
+        """
+        return _default_repository
+
+    @staticmethod
+    def _by_repository(habits) -> dict:
+        """
+        Groups habits by their repository.
+
+        Returns:
+            dict: Key: HabitRepository, value: list of habits
+        """
+        groups = {}
+        for habit in habits:
+            groups.setdefault(habit._repository, []).append(habit)
+        return groups
+
+    @classmethod
+    def change_db(cls, username: str, profile: str = None, default_profile: str = None, memory: str = None):
+        """
+        Class method to change user database (Habit._DB_NAME) and optionally its durability profile (see
+        'storage.PROFILES') and in-memory mode (see 'storage.MEMORY_MODES').
+
+        Args:
+            username (str): Enter a username / database name
+            profile (str) = None: Durability profile of this user database ("strict", "balanced" or "fast")
+            default_profile (str) = None: Durability profile of all user databases without own profile
+            memory (str) = None: Keep this user database in memory ("snapshot" or "ephemeral")
         """
         if not type(username) is str:
             raise ValueError("username must be of type: str")
 
         cls._DB_NAME = username + ".db"
+        if default_profile is not None:
+            Storage.set_default_profile(default_profile)
+        if profile is not None:
+            Storage.set_profile(cls._DB_NAME, profile)
+        if memory is not None:
+            Storage.set_memory(cls._DB_NAME, memory)
+
+    @classmethod
+    def close_db(cls) -> None:
+        """
+        Class method to flush and close all open user databases: the write-behind queues of all repositories are
+        written and stopped first, so no writer thread reopens a database afterwards. Should be called before the
+        program exits.
+        """
+        try:
+            for repository in list(HabitRepository._writing):
+                repository.disable_write_behind()
+        finally:
+            Storage.close_all()
+
+    @classmethod
+    def _storage(cls) -> Storage:
+        """
+        Class method to get the shared storage of Habit._DB_NAME (opens the database on first use).
+
+        Returns:
+            Storage
+        """
+        return _default_repository.storage
 
     @abstractmethod
-    def __init__(self, name: str, description: str):
+    def __init__(self, name: str, description: str, repository: "HabitRepository" = None):
         """
         Abstract method to ensure implementation of __init__ in child classes.
         Child classes inherit this constructor method.
@@ -93,44 +194,118 @@ class Habit(ABC):
         Args:
             name (str): Enter a habit name.
             description (str): Enter a habit description.
+            repository (HabitRepository) = None: Repository the habit belongs to (default: 'Habit.default_repository()')
         """
         if not type(name) is str or not type(description) is str:
             raise ValueError("name and description must be of type: str")
+        if repository is not None and not isinstance(repository, HabitRepository):
+            raise ValueError("repository must be of type: HabitRepository")
 
         self._name = name
         self._description = description
         self._date_created = None
         self._dates_checked = []
+        self._tracking_loaded = True
+        self._summary = None
+        self._dates_added = []
+        self._saved_name = None
+        self._saved_description = None
         self._id = None
         self._period = "None"
-        Habit.Instances.update({self._name: self})
+        self._repository = repository if repository is not None else _default_repository
+        self._repository.instances.update({self._name: self})
         self._initialize_db()
         self._initialize_date_created()
 
+    @property
+    def _dates_checked(self) -> DateStore:
+        """
+        Read-only view of all tracked dates: a sorted sequence of 'date' objects without duplicates.
+        Assigning an iterable of dates replaces all tracked dates.
+        """
+        self._ensure_tracking()
+        return self._date_store
+
+    @_dates_checked.setter
+    def _dates_checked(self, dates) -> None:
+        self._set_date_store(DateStore(dates))
+
+    def _set_date_store(self, date_store: DateStore) -> None:
+        """
+        Replaces all tracked dates and rebuilds the run index ('Habit._runs') from them.
+
+        Args:
+            date_store (DateStore): New tracked dates
+        """
+        self._date_store = date_store
+        self._runs = RunIndex.from_units(self._unit(ordinal) for ordinal in date_store.ordinals)
+        self._bitset = None
+        self._tracking_loaded = True
+
+    def _ensure_tracking(self) -> None:
+        """
+        Loads the tracked dates of the instance from 'tracking' table if they have not been loaded yet (see
+        'Habit.load(lazy=True)').
+        """
+        if not self._tracking_loaded:
+            with metrics.DB_SECONDS.time(operation="load_habit"):
+                self._set_date_store(DateStore.from_ordinals(self._repository.storage.fetch_dates(self._id)))
+            metrics.ROWS.observe(len(self._date_store), operation="load_habit")
+
+    def _add_date(self, new_date) -> bool:
+        """
+        Adds a date to the tracked dates, the run index and the dates to be saved ('Habit._dates_added') if it is not
+        tracked already.
+
+        Args:
+            new_date (date): Date to add
+
+        Returns:
+            bool: True if the date was added
+        """
+        if not self._date_store.add(new_date):
+            return False
+
+        self._runs.add(self._unit(new_date.toordinal()))
+        if self._bitset is not None:
+            self._bitset.add(self._unit(new_date.toordinal()))
+        self._dates_added.append(new_date)
+        metrics.CHECKOFFS.inc(period=self._period)
+        return True
+
+    def history_bitset(self) -> HistoryBitset:
+        """
+        Method to get the check-off history of instance as a bitset with one bit per period (day or week) since
+        'Habit.date_created' (or since the first tracked date if it lies before). Built on first use and kept up to date
+        by check-offs.
+
+        Returns:
+            HistoryBitset
+        """
+        self._ensure_tracking()
+        if self._bitset is None:
+            created = self._unit(date.fromisoformat(self._date_created).toordinal())
+            self._bitset = HistoryBitset.from_units((self._unit(ordinal) for ordinal in self._date_store.ordinals),
+                                                    base=created)
+
+        return self._bitset
+
+    def run_count(self) -> int:
+        """
+        Method to get the number of runs (streaks separated by missed periods) of instance.
+
+        Returns:
+            int
+        """
+        self._ensure_tracking()
+        return len(self._runs)
+
     def _initialize_db(self) -> None:
         """
-        Connects to 'Habit._DB_NAME' and creates 'habit' and 'tracking' table if they do not exist already.
-        """
-        with sqlite3.connect(self._DB_NAME) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS habit (
-                    id INTEGER PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    description TEXT NOT NULL,
-                    period TEXT NOT NULL,
-                    date_created TEXT NOT NULL
-                )        
-            """)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS tracking (
-                    id INTEGER PRIMARY KEY,
-                    habit_id INTEGER,
-                    date_checked TEXT,
-                    FOREIGN KEY (habit_id) REFERENCES habit(id)
-                )   
-            """)
-            conn.commit()
+        Opens the shared storage of the repository of instance, which creates or upgrades 'habit' and 'tracking' table
+        to the current schema version when the database is opened for the first time.
+        """
+        self._repository.storage
 
     def _initialize_date_created(self):
         """
@@ -141,7 +316,8 @@ class Habit(ABC):
 
     def update_name(self, new_name: str):
         """
-        Changes 'Habit.name' to specified string and updates key in 'Habit.Instances'.
+        Changes 'Habit.name' to specified string and updates key in the registry of its repository (e.g.
+        'Habit.Instances').
 
         Args:
             new_name (str): The new name to be entered.
@@ -153,9 +329,9 @@ class Habit(ABC):
         old_name = self._name
         self._name = new_name
 
-        # update key in Habit.Instances
-        Habit.Instances.pop(old_name)
-        Habit.Instances.update({self._name: self})
+        # update key in registry
+        self._repository.instances.pop(old_name)
+        self._repository.instances.update({self._name: self})
 
     def update_description(self, new_description: str):
         """
@@ -171,62 +347,81 @@ class Habit(ABC):
 
     def delete(self) -> None:
         """
-        Connects to 'Habit._DB_NAME' and removes the metadata and tracked dates of a Habit instance from tables
-        'habits' and 'tracking' (based on 'Habit.id').
-        Then, instance is removed 'Habit.Instances'.
+        Removes the metadata and tracked dates of a Habit instance from tables 'habits' and 'tracking' of the database
+        of its repository (based on 'Habit.id').
+        Then, instance is removed from the registry of its repository (e.g. 'Habit.Instances').
         """
-        # remove habit from database (by id)
+        # remove habit from database (by id), queued changes of the habit are written first
         if self._id:
-            with sqlite3.connect(Habit._DB_NAME) as conn:
-                cursor = conn.cursor()
-
-                cursor.execute("DELETE FROM habit WHERE id=?", (self._id,))
-                cursor.execute("DELETE FROM tracking WHERE habit_id=?", (self._id,))
+            self._repository.flush()
+            with metrics.DB_SECONDS.time(operation="delete"):
+                self._repository.storage.delete_habit(self._id)
 
-                conn.commit()
-
-        # remove habit from Habit.Instances
-        Habit.Instances.pop(self._name)
+        # remove habit from registry
+        self._repository.instances.pop(self._name)
 
     def save(self) -> None:
         """
         Method to save instance data to user database.
 
-        Connects to 'Habit._DB_NAME' and saves metadata and tracked dates of a Habit instance.
-        If the Habit ('Habit.id') exists already, method will update name and description in 'habit' table.
-        Otherwise, a new entry will be created.
-
-        Dates associated with the Habit instance will be saved in 'tracking' table.
-        """
-        # if habit exists: update habit database (name, description), else: insert into habit database and add id
-        with sqlite3.connect(Habit._DB_NAME) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            # save habit meta data
-            if self._id:
-                cursor.execute("""
-                    UPDATE habit SET name=?, description=? WHERE id=?
-                    """, (self._name, self._description, self._id))
-            else:
-                cursor.execute("""
-                    INSERT INTO habit (name, description, period, date_created) VALUES (?,?,?,?)
-                    """, (self._name, self._description, self._period, self._date_created))
-                self._id = cursor.lastrowid
-
-            # save tracked dates if they do not exist already
-            cursor.execute("""
-                SELECT * FROM tracking WHERE habit_id = ?
-                """, (self._id,))
-            existing_dates = {row["date_checked"] for row in cursor.fetchall()}
-
-            for date in self._dates_checked:
-                if str(date) not in existing_dates:
-                    cursor.execute("""
-                        INSERT INTO tracking (habit_id, date_checked) VALUES (?, ?)
-                        """, (self._id, date))
-
-        conn.commit()
+        Saves metadata and tracked dates of a Habit instance to the database of its repository within one transaction.
+        If the Habit ('Habit.id') exists already, method will update name and description in 'habit' table (only if
+        they changed since the last save). Otherwise, a new entry will be created.
+
+        Only dates checked off since the last save ('Habit._dates_added') will be inserted into 'tracking' table (as day
+        ordinals). Dates that are tracked already are ignored by the database. If dates were added, the summary in
+        'habit_stats' table is updated from the run index in the same transaction.
+        """
+        self._repository.save_many([self])
+
+    def _current_summary(self) -> Habit_summary:
+        """
+        Computes the summary of the tracked dates from the run index (O(1)).
+
+        Returns:
+            Habit_summary
+        """
+        self._ensure_tracking()
+        last_run = self._runs.last_run()
+        if last_run is None:
+            return Habit_summary(None, None, 0, 0)
+
+        return Habit_summary(self._first_day(last_run[0]), self._date_store.ordinals[-1], self._runs.longest(),
+                             len(self._date_store))
+
+    def _summary_streak(self, unit: int):
+        """
+        Computes the streak ending at a period unit from 'Habit.summary' while the tracked dates are not loaded.
+
+        Args:
+            unit (int): Period unit of the current date
+
+        Returns:
+            int or None: None if the tracked dates are loaded, the summary is missing or the summary cannot answer
+            (because of check-offs after the unit)
+        """
+        summary = self._summary
+        if self._tracking_loaded or summary is None:
+            return None
+        if summary.total == 0:
+            return 0
+
+        last_unit = self._unit(summary.last_checked)
+        if last_unit > unit:
+            return None
+        if last_unit < unit:
+            return 0
+
+        return unit - self._unit(summary.run_start) + 1
+
+    def _mark_saved(self) -> None:
+        """
+        Marks the current state of the instance as saved: resets 'Habit._dates_added' and remembers the saved name and
+        description.
+        """
+        self._dates_added = []
+        self._saved_name = self._name
+        self._saved_description = self._description
 
     def __str__(self):
         return (f"Habit ID: {self._id}\n" +
@@ -238,6 +433,24 @@ class Habit(ABC):
                 f"Current streak: {self.streak()}\n" +
                 f"Longest streak: {self.longest_streak()}\n")
 
+    @staticmethod
+    @abstractmethod
+    def _unit(ordinal: int) -> int:
+        """
+        Abstract method to ensure implementation of '_unit()' in child classes. Converts a day ordinal into the period
+        unit of the habit (consecutive periods have consecutive units).
+        """
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def _first_day(unit: int) -> int:
+        """
+        Abstract method to ensure implementation of '_first_day()' in child classes. Converts a period unit into the
+        day ordinal of its first day (inverse of '_unit()').
+        """
+        pass
+
     @abstractmethod
     def checkoff_streak(self):
         """
@@ -277,9 +490,14 @@ class Daily(Habit):
         name (str): Habit name
         description (str): Habit description
         date_created (str): Date of creation (format: YYYY-MM-DD)
-        dates_checked (list): List containing all tracked dates (based on 'datetime' objects)
+        dates_checked (DateStore): Sorted, read-only sequence of all tracked dates (based on 'datetime' objects)
+        dates_added (list): List containing all dates tracked since the last save
+        runs (RunIndex): Index of all runs of consecutive periods
+        bitset (HistoryBitset): Cached bitset of the history (see 'history_bitset()')
+        summary (Habit_summary): Summary of the tracked dates as saved in 'habit_stats' table
         id (int): Unique identifier for database interaction
         period (str) = "Daily": Shows periodicity of instance
+        repository (HabitRepository): Repository the habit belongs to
 
     Instance methods:
         __init__()                      [partly inherited from Habit class]
@@ -289,12 +507,17 @@ class Daily(Habit):
         update_description()            [inherited from Habit class]
         delete()                        [inherited from Habit class]
         save()                          [inherited from Habit class]
+        run_count()                     [inherited from Habit class]
+        history_bitset()                [inherited from Habit class]
+        _mark_saved()                   [inherited from Habit class]
         checkoff_streak()
         is_active()
         streak()
         longest_streak()
+        _unit()
+        _first_day()
     """
-    def __init__(self, name: str, description: str):
+    def __init__(self, name: str, description: str, repository: "HabitRepository" = None):
         """
         Creates instance of class Daily.
 
@@ -303,8 +526,9 @@ class Daily(Habit):
         Args:
             name (str): Enter a habit name.
             description (str): Enter a habit description.
+            repository (HabitRepository) = None: Repository the habit belongs to (default: 'Habit.default_repository()')
         """
-        super().__init__(name, description)
+        super().__init__(name, description, repository)
         self._period = "Daily"
 
     def is_active(self) -> bool:
@@ -316,31 +540,34 @@ class Daily(Habit):
         """
         today = datetime.today().date()
 
-        if len(self._dates_checked) > 0:
-            if today in self._dates_checked:
-                return True
-            else:
-                return False
-        else:
-            return False
+        # answer from summary if tracked dates are not loaded
+        streak = self._summary_streak(today.toordinal())
+        if streak is not None:
+            return streak > 0
+
+        self._ensure_tracking()
+        return today in self._date_store
 
     def checkoff_streak(self, date: str = "today"):
         """
         Method to mark habit as completed/to check-off habit.
 
-        Appends the specified date to 'self.dates_checked' (default: current date) if it does not already exist.
+        Adds the specified date to 'self.dates_checked' (default: current date) if it does not already exist.
 
         Args:
             date (str): Date to enter (in format: YYYY-MM-DD)
+
+        Returns:
+            bool: True if the date was added
         """
+        self._ensure_tracking()
         # add current or specified date to _dates_checked if not already existing
         if date == "today":
             new_date = datetime.today().date()
         else:
             new_date = datetime.strptime(date, "%Y-%m-%d").date()
 
-        if new_date not in self._dates_checked:
-            self._dates_checked.append(new_date)
+        return self._add_date(new_date)
 
     def streak(self) -> int:
         """
@@ -349,14 +576,16 @@ class Daily(Habit):
         Returns:
             int
         """
-        current_streak = 0
-        today = datetime.today().date()
+        today = datetime.today().date().toordinal()
 
-        while today in self._dates_checked:
-            current_streak += 1
-            today -= timedelta(days=1)
+        # answer from summary if tracked dates are not loaded
+        streak = self._summary_streak(today)
+        if streak is not None:
+            return streak
 
-        return current_streak
+        # length of the run of consecutive days ending today
+        self._ensure_tracking()
+        return self._runs.run_length(today)
 
     def longest_streak(self) -> int:
         """
@@ -365,22 +594,37 @@ class Daily(Habit):
         Returns:
             int
         """
-        max_streak = 0
-        # sort values
-        self._dates_checked.sort(reverse=True)
+        if not self._tracking_loaded and self._summary is not None:
+            return self._summary.longest_streak
+
+        self._ensure_tracking()
+        return self._runs.longest()
+
+    @staticmethod
+    def _unit(ordinal: int) -> int:
+        """
+        Method to convert a day ordinal into the period unit of daily habits (the day ordinal itself).
+
+        Args:
+            ordinal (int): Day ordinal
+
+        Returns:
+            int
+        """
+        return ordinal
 
-        if len(self._dates_checked) > 0:
-            streak_count = 1
-            max_streak = 1
-            for date in range(len(self._dates_checked) - 1):
-                if (self._dates_checked[date] - self._dates_checked[date + 1]).days == 1:
-                    streak_count += 1
-                    if streak_count > max_streak:
-                        max_streak = streak_count
-                else:
-                    streak_count = 1
+    @staticmethod
+    def _first_day(unit: int) -> int:
+        """
+        Method to convert a period unit of daily habits into a day ordinal (the unit itself).
 
-        return max_streak
+        Args:
+            unit (int): Period unit
+
+        Returns:
+            int
+        """
+        return unit
 
 
 class Weekly(Habit):
@@ -393,9 +637,15 @@ class Weekly(Habit):
         name (str): Habit name
         description (str): Habit description
         date_created (str): Date of creation (format: YYYY-MM-DD)
-        dates_checked (list): List containing all tracked dates (based on 'datetime' objects)
+        dates_checked (DateStore): Sorted, read-only sequence of all tracked dates (based on 'datetime' objects)
+        dates_added (list): List containing all dates tracked since the last save
+        runs (RunIndex): Index of all runs of consecutive periods
+        bitset (HistoryBitset): Cached bitset of the history (see 'history_bitset()')
+        summary (Habit_summary): Summary of the tracked dates as saved in 'habit_stats' table
+        weeks_checked (set): Set containing the week units (see '_unit()') of all tracked dates
         id (int): Unique identifier for database interaction
         period (str) = "Weekly": Shows periodicity of instance
+        repository (HabitRepository): Repository the habit belongs to
 
     Instance methods:
         __init__()                      [partly inherited from Habit class]
@@ -405,14 +655,23 @@ class Weekly(Habit):
         update_description()            [inherited from Habit class]
         delete()                        [inherited from Habit class]
         save()                          [inherited from Habit class]
+        run_count()                     [inherited from Habit class]
+        history_bitset()                [inherited from Habit class]
+        _mark_saved()                   [inherited from Habit class]
         checkoff_streak()
         is_active()
         streak()
         longest_streak()
+        _unit()
+        _first_day()
+        _set_date_store()               [extends Habit class]
+        _add_date()                     [extends Habit class]
         _convert_week()
+        _week_tuple()
+        _week_index()
         _previous_week()
     """
-    def __init__(self, name: str, description: str):
+    def __init__(self, name: str, description: str, repository: "HabitRepository" = None):
         """
         Creates instance of class Daily.
 
@@ -421,8 +680,9 @@ class Weekly(Habit):
         Args:
             name (str): Enter a habit name.
             description (str): Enter a habit description.
+            repository (HabitRepository) = None: Repository the habit belongs to (default: 'Habit.default_repository()')
         """
-        super().__init__(name, description)
+        super().__init__(name, description, repository)
         self._period = "Weekly"
 
     def is_active(self) -> bool:
@@ -433,38 +693,39 @@ class Weekly(Habit):
         Returns:
              bool
         """
-        active = False
-        # convert today and dates_checked to Week_tuple
-        this_week = Week_tuple(datetime.today().isocalendar().year, datetime.today().isocalendar().week)
-        weeks_checked = self._convert_week()
+        this_week = self._unit(datetime.today().date().toordinal())
 
-        if len(weeks_checked) > 0:
-            if this_week in weeks_checked:
-                active = True
+        # answer from summary if tracked dates are not loaded
+        streak = self._summary_streak(this_week)
+        if streak is not None:
+            return streak > 0
 
-        return active
+        self._ensure_tracking()
+        return this_week in self._weeks_checked
 
     def checkoff_streak(self, date: str = "today"):
         """
         Method to mark habit as completed/to check-off habit.
 
-        Appends the specified date to 'self.dates_checked' (default: current date) if it does not already contain a date
+        Adds the specified date to 'self.dates_checked' (default: current date) if it does not already contain a date
         from the same week.
 
         Args:
             date (str): Date to enter (in format: YYYY-MM-DD)
+
+        Returns:
+            bool: True if the date was added
         """
+        self._ensure_tracking()
         if date == "today":
             new_day = datetime.today().date()
-            new_week = Week_tuple(new_day.isocalendar().year, new_day.isocalendar().week)
         else:
             new_day = datetime.strptime(date, "%Y-%m-%d").date()
-            new_week = Week_tuple(new_day.isocalendar().year, new_day.isocalendar().week)
 
-        weeks_checked = self._convert_week()
+        if self._unit(new_day.toordinal()) in self._weeks_checked:
+            return False
 
-        if new_week not in weeks_checked:
-            self._dates_checked.append(new_day)
+        return self._add_date(new_day)
 
     def streak(self) -> int:
         """
@@ -473,16 +734,16 @@ class Weekly(Habit):
         Returns:
             int
         """
-        current_streak = 0
-        # convert current week and dates_checked to Week_tuple
-        weeks_checked = self._convert_week()
-        this_week = Week_tuple(datetime.today().isocalendar().year, datetime.today().isocalendar().week)
+        this_week = self._unit(datetime.today().date().toordinal())
 
-        while this_week in weeks_checked:
-            current_streak += 1
-            this_week = Weekly._previous_week(this_week)
+        # answer from summary if tracked dates are not loaded
+        streak = self._summary_streak(this_week)
+        if streak is not None:
+            return streak
 
-        return current_streak
+        # length of the run of consecutive weeks ending this week
+        self._ensure_tracking()
+        return self._runs.run_length(this_week)
 
     def longest_streak(self) -> int:
         """
@@ -491,34 +752,103 @@ class Weekly(Habit):
         Returns:
             int
         """
-        max_streak = 0
-        # convert dates to Week_tuple and sort
-        weeks_checked = self._convert_week()
-        weeks_checked.sort(reverse=True)
+        if not self._tracking_loaded and self._summary is not None:
+            return self._summary.longest_streak
 
-        if len(weeks_checked) > 0:
-            streak = 1
-            max_streak = 1
-            for date in range(len(weeks_checked) - 1):
-                if Weekly._previous_week(weeks_checked[date]) == weeks_checked[date + 1]:
-                    streak += 1
-                    if streak > max_streak:
-                        max_streak = streak
-                else:
-                    streak = 1
+        self._ensure_tracking()
+        return self._runs.longest()
 
-        return max_streak
+    @staticmethod
+    def _unit(ordinal: int) -> int:
+        """
+        Method to convert a day ordinal into the period unit of weekly habits: the number of the (ISO) week counted from
+        the week of 0001-01-01, which is a Monday.
+
+        Args:
+            ordinal (int): Day ordinal
+
+        Returns:
+            int
+        """
+        return (ordinal - 1) // 7
+
+    @staticmethod
+    def _first_day(unit: int) -> int:
+        """
+        Method to convert a week unit into the day ordinal of the Monday of the week.
+
+        Args:
+            unit (int): Week unit
+
+        Returns:
+            int
+        """
+        return unit * 7 + 1
+
+    def _set_date_store(self, date_store: DateStore) -> None:
+        """
+        Replaces all tracked dates, rebuilds the run index and the set of checked week units ('self.weeks_checked').
+
+        Args:
+            date_store (DateStore): New tracked dates
+        """
+        super()._set_date_store(date_store)
+        self._weeks_checked = {self._unit(ordinal) for ordinal in date_store.ordinals}
+
+    def _add_date(self, new_date) -> bool:
+        """
+        Adds a date like 'Habit._add_date()' and keeps 'self.weeks_checked' in sync.
+
+        Args:
+            new_date (date): Date to add
+
+        Returns:
+            bool: True if the date was added
+        """
+        if not super()._add_date(new_date):
+            return False
+
+        self._weeks_checked.add(self._unit(new_date.toordinal()))
+        return True
 
     def _convert_week(self) -> list:
         """
-        Method to convert all 'datetime' objects in 'self.dates_checked' into 'Week_tuple' objects.
+        Method to convert all 'datetime' objects in 'self.dates_checked' into 'Week_tuple' objects (for display).
 
         Returns:
             list of 'Week_tuple' objects
         """
-        iso_list = [date.isocalendar() for date in self._dates_checked]
+        self._ensure_tracking()
+        return [Weekly._week_tuple(self._unit(ordinal)) for ordinal in self._date_store.ordinals]
+
+    @staticmethod
+    def _week_tuple(unit: int) -> Week_tuple:
+        """
+        Method to convert a week unit (see '_unit()') into a 'Week_tuple' object.
+
+        Args:
+            unit (int): Week unit
+
+        Returns:
+            Week_tuple
+        """
+        # monday of the week
+        iso = date.fromordinal(Weekly._first_day(unit)).isocalendar()
 
-        return [Week_tuple(iso.year, iso.week) for iso in iso_list]
+        return Week_tuple(iso.year, iso.week)
+
+    @staticmethod
+    def _week_index(week: Week_tuple) -> int:
+        """
+        Method to convert a 'Week_tuple' object into a week unit (see '_unit()').
+
+        Args:
+            week (Week_tuple): Week to convert
+
+        Returns:
+            int
+        """
+        return Weekly._unit(date.fromisocalendar(week.year, week.week, 1).toordinal())
 
     @staticmethod
     def _previous_week(date: Week_tuple) -> Week_tuple:
@@ -531,8 +861,322 @@ class Weekly(Habit):
         Returns:
             Week_tuple
         """
-        # compute previous week based on fixed week day (here: monday) - difference exactly 1 week
-        monday = datetime.fromisocalendar(date.year, date.week, 1)
-        previous_monday = (monday - timedelta(weeks=1)).isocalendar()
+        # consecutive weeks have consecutive week units
+        return Weekly._week_tuple(Weekly._week_index(date) - 1)
+
+
+class HabitRepository:
+    """
+    Class to hold the habits of one user. Owns the storage of the user database and its own registry of habits, so one
+    process can keep the habits of many users in memory at the same time.
+
+    Class attributes:
+        _writing (WeakSet): Repositories in write-behind mode (see 'Habit.close_db()')
+
+    Instance methods:
+        load()
+        load_habit()
+        prefetch()
+        save_many()
+        enable_write_behind()
+        disable_write_behind()
+        flush()
+        close()
+        _from_row()
+
+    Properties:
+        instances
+        db_name
+        storage
+        writer
+    """
+    _writing = weakref.WeakSet()
+
+    def __init__(self, username: str, profile: str = None, memory: str = None):
+        """
+        Creates an empty repository for the database of a user.
+
+        Args:
+            username (str): Enter a username / database name
+            profile (str) = None: Durability profile of the database (see 'storage.PROFILES', default:
+                'Storage.default_profile')
+            memory (str) = None: Keep the database in memory ("snapshot" or "ephemeral", see 'storage.MEMORY_MODES')
+        """
+        if not type(username) is str:
+            raise ValueError("username must be of type: str")
+
+        self._db_name = username + ".db"
+        self._instances = {}
+        if profile is not None:
+            Storage.set_profile(self._db_name, profile)
+        if memory is not None:
+            Storage.set_memory(self._db_name, memory)
+        self._writer = None
+
+    @property
+    def instances(self) -> dict:
+        """
+        Dictionary, which contains all habits of the repository. Keys: Habit.name, Values: Habit
+        """
+        return self._instances
+
+    @property
+    def db_name(self) -> str:
+        """
+        Database of the repository (for loading, saving, etc.)
+        """
+        return self._db_name
+
+    @property
+    def storage(self) -> Storage:
+        """
+        Shared storage of the database (opens the database on first use).
+        """
+        return Storage.open(self.db_name)
+
+    @property
+    def writer(self) -> WriteBehindQueue:
+        """
+        Write-behind queue of the repository or None (see 'enable_write_behind()').
+        """
+        return self._writer
+
+    def load(self, lazy: bool = False) -> None:
+        """
+        Method to load all previously saved habits of the database into the repository.
+
+        Initializes instances using 'period', 'name', 'description' values from 'habit' table. Then, restores id and
+        date_created. Habits that are in the repository already are not loaded again.
+        Lastly, loads the tracking data of all habits (see 'prefetch()'). In lazy mode, the tracking data of each habit is
+        loaded when it is needed for the first time instead.
+
+        Args:
+            lazy (bool) = False: Only load metadata from 'habit' table
+        """
+        metrics.LOADS.inc()
+        start = time.perf_counter()
+
+        # initialize all habits, habits in the repository already (e.g. by 'load_habit()') are kept
+        rows = self.storage.fetch_habits()
+        habits = [habit for habit in (self._from_row(row) for row in rows if row["name"] not in self.instances)
+                  if habit is not None]
+
+        read = len(rows)
+        if not lazy:
+            read += self.prefetch(habits)
+
+        metrics.DB_SECONDS.observe(time.perf_counter() - start, operation="load")
+        metrics.ROWS.observe(read, operation="load")
+
+    def load_habit(self, name: str) -> Habit:
+        """
+        Method to load one habit by name (uses the unique index on 'habit.name') together with its tracking data only,
+        e.g. to check off a single habit without loading the others. A habit that is in the repository already is
+        returned as it is (if it was loaded lazily, its tracking data is loaded when it is needed, see 'load()').
+
+        Args:
+            name (str): Name of the habit
+
+        Returns:
+            Daily, Weekly or None if the habit does not exist
+        """
+        if not type(name) is str:
+            raise ValueError("name must be of type: str")
+
+        habit = self.instances.get(name)
+        if habit is not None:
+            return habit
+
+        row = self.storage.fetch_habit(name)
+        habit = self._from_row(row) if row is not None else None
+        if habit is not None:
+            habit._ensure_tracking()
+        return habit
+
+    def _from_row(self, row) -> Habit:
+        """
+        Creates the instance of a habit from its row (see 'Storage.fetch_habits()') and adds it to the repository. The
+        tracking data is not loaded.
+
+        Returns:
+            Daily, Weekly or None if the period is unknown
+        """
+        if row["period"] == "Daily":
+            instance = Daily(row["name"], row["description"], self)
+        elif row["period"] == "Weekly":
+            instance = Weekly(row["name"], row["description"], self)
+        else:
+            return None
+        instance._id = row["id"]
+        instance._date_created = row["date_created"]
+        instance._tracking_loaded = False
+        if row["total"] is not None:
+            instance._summary = Habit_summary(row["run_start"], row["last_checked"], row["longest_streak"],
+                                              row["total"])
+        instance._mark_saved()
+
+        return instance
+
+    def prefetch(self, habits=None) -> int:
+        """
+        Method to load the tracking data of all habits of the repository that have not been loaded yet.
+
+        Loads the tracking data with a single query ordered by habit id and distributes the rows to their instances in
+        one pass over the cursor.
+
+        Args:
+            habits (iterable) = None: Habit instances to load (default: all habits of the repository)
+
+        Returns:
+            int: Number of loaded tracking rows
+        """
+        if habits is None:
+            habits = self.instances.values()
+
+        # map habits that still need their tracking data by id
+        habits_by_id = {habit._id: habit for habit in habits if not habit._tracking_loaded}
+        if not habits_by_id:
+            return 0
+
+        # load tracking data of all habits at once, rows arrive grouped by habit id
+        read = 0
+        for habit_id, rows in groupby(self.storage.fetch_tracking(), key=itemgetter(0)):
+            habit = habits_by_id.get(habit_id)
+            # skip tracking data of habits that do not exist (anymore) or are loaded already
+            if habit is None:
+                continue
+            habit._set_date_store(DateStore.from_ordinals(row[1] for row in rows))
+            read += len(habit._date_store)
+
+        # habits without tracking data
+        for habit in habits_by_id.values():
+            habit._tracking_loaded = True
+
+        return read
+
+    def save_many(self, habits) -> None:
+        """
+        Method to save several habits of the repository within one transaction (see 'Habit.save()').
+
+        Metadata is written per habit, the dates checked off since the last save of all habits are inserted with one
+        'executemany', as are the updated summaries.
+        In write-behind mode, the changes of habits that were saved before are queued instead (see
+        'enable_write_behind()'), only new habits are written immediately (after the queued changes, e.g. a new habit
+        may take the name of a habit whose rename is queued).
+
+        Args:
+            habits (iterable): Habit instances to save
+        """
+        metrics.SAVES.inc()
+        habits = list(habits)
+        if self._writer is not None:
+            self._writer.enqueue([habit for habit in habits if habit._id])
+            habits = [habit for habit in habits if not habit._id]
+            if not habits:
+                return
+            self._writer.flush()
+        storage = self.storage
+        start = time.perf_counter()
+
+        # ids and summaries assigned in the transaction, restored if it is rolled back
+        inserted = []
+        summaries = [(habit, habit._summary) for habit in habits]
+        try:
+            with storage.transaction():
+                # if habit exists: update habit database (name, description), else: insert into habit database and
+                # add id
+                changed = []
+                for habit in habits:
+                    if not habit._id:
+                        habit._id = storage.insert_habit(habit._name, habit._description, habit._period,
+                                                         habit._date_created)
+                        inserted.append(habit)
+                        changed.append(habit)
+                    else:
+                        if habit._name != habit._saved_name or habit._description != habit._saved_description:
+                            storage.update_habit(habit._id, habit._name, habit._description)
+                        if habit._dates_added:
+                            changed.append(habit)
+
+                # save dates checked off since last save and update summaries
+                dates = [(habit._id, date.toordinal()) for habit in habits for date in habit._dates_added]
+                storage.insert_dates(dates)
+                for habit in changed:
+                    habit._summary = habit._current_summary()
+                storage.update_stats([(habit._id, habit._summary) for habit in changed])
+        except BaseException:
+            # e.g. a duplicate name: the other new habits of the batch are inserted by their next save
+            for habit in inserted:
+                habit._id = None
+            for habit, summary in summaries:
+                habit._summary = summary
+            raise
+
+        for habit in habits:
+            habit._mark_saved()
+        metrics.DB_SECONDS.observe(time.perf_counter() - start, operation="save")
+        metrics.ROWS.observe(len(dates) + len(changed), operation="save")
+
+    def enable_write_behind(self, max_delay: float = 0.05, max_items: int = 100) -> WriteBehindQueue:
+        """
+        Method to save check-offs and edits of habits in the background: 'save()' queues the changes and returns
+        immediately, a writer thread writes them in batches (see 'WriteBehindQueue').
+
+        Args:
+            max_delay (float) = 0.05: Longest time in seconds a change waits for its batch
+            max_items (int) = 100: Largest number of changes per batch
+
+        Returns:
+            WriteBehindQueue
+        """
+        if self._writer is None:
+            self._writer = WriteBehindQueue(self, max_delay, max_items)
+            HabitRepository._writing.add(self)
+
+        return self._writer
+
+    def disable_write_behind(self) -> None:
+        """
+        Method to write all queued changes and return to saving immediately.
+        """
+        writer, self._writer = self._writer, None
+        HabitRepository._writing.discard(self)
+        if writer is not None:
+            writer.close()
+
+    def flush(self) -> None:
+        """
+        Method to wait until all queued changes are written (see 'enable_write_behind()').
+        """
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self) -> None:
+        """
+        Method to flush and close the database of the repository (writes queued changes first). The habits stay in
+        memory.
+        """
+        try:
+            self.disable_write_behind()
+        finally:
+            Storage.close_path(self.db_name)
+
+
+class _DefaultRepository(HabitRepository):
+    """
+    Repository of the class attributes 'Habit.Instances' and 'Habit._DB_NAME' (see 'Habit.change_db()'). Used by habits
+    that are not bound to a repository explicitly.
+    """
+    def __init__(self):
+        self._writer = None
+
+    @property
+    def instances(self) -> dict:
+        return Habit.Instances
+
+    @property
+    def db_name(self) -> str:
+        return Habit._DB_NAME
+
 
-        return Week_tuple(previous_monday.year, previous_monday.week)
+_default_repository = _DefaultRepository()
@@ -0,0 +1,192 @@
+class HistoryBitset:
+    """
+    Class to store the history of a habit as a bitset with one bit per period unit (day ordinal for daily habits, week
+    number for weekly habits, see 'Habit._unit()'). Bit i is set if unit 'base' + i was completed.
+
+    The bits are kept in a Python int, so counting check-offs in a window, membership checks and run lengths are bit
+    operations. A multi-year daily history needs one bit per day instead of four bytes per tracked date.
+
+    Class methods:
+        from_units()
+        from_bytes()
+
+    Instance methods:
+        add()
+        count()
+        run_length()
+        units()
+        to_bytes()
+
+    Properties:
+        nbytes
+    """
+    __slots__ = ("base", "bits")
+
+    def __init__(self, base: int, bits: int = 0):
+        """
+        Creates a bitset.
+
+        Args:
+            base (int): Unit of the lowest bit
+            bits (int): Bits of the history (bit i: unit 'base' + i)
+        """
+        if not type(base) is int or not type(bits) is int:
+            raise ValueError("base and bits must be of type: int")
+
+        self.base = base
+        self.bits = bits
+
+    @classmethod
+    def from_units(cls, units, base: int = None) -> "HistoryBitset":
+        """
+        Class method to build a bitset from units (e.g. the converted rows of 'tracking' table).
+
+        Args:
+            units (iterable): Completed units in any order
+            base (int) = None: Unit of the lowest bit, e.g. the unit of 'Habit.date_created'. Lowered to the first unit
+                if the history starts earlier
+
+        Returns:
+            HistoryBitset
+        """
+        units = list(units)
+        if units:
+            first = min(units)
+            base = first if base is None else min(base, first)
+        elif base is None:
+            base = 0
+
+        # set bits in a byte buffer, converting the buffer once is faster than shifting a growing int
+        buffer = bytearray((max(units) - base) // 8 + 1 if units else 0)
+        for unit in units:
+            offset = unit - base
+            buffer[offset >> 3] |= 1 << (offset & 7)
+
+        return cls(base, int.from_bytes(buffer, "little"))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, base: int) -> "HistoryBitset":
+        """
+        Class method to restore a bitset written by 'to_bytes()'.
+
+        Args:
+            data (bytes): Bits in little-endian byte order
+            base (int): Unit of the lowest bit
+
+        Returns:
+            HistoryBitset
+        """
+        return cls(base, int.from_bytes(data, "little"))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Number of bytes needed to store the bits.
+        """
+        return (self.bits.bit_length() + 7) // 8
+
+    def add(self, unit: int) -> bool:
+        """
+        Sets the bit of a unit. Moves 'base' down if the unit lies before it.
+
+        Args:
+            unit (int): Completed unit
+
+        Returns:
+            bool: True if the bit was not set before
+        """
+        if unit < self.base:
+            self.bits <<= self.base - unit
+            self.base = unit
+
+        mask = 1 << (unit - self.base)
+        if self.bits & mask:
+            return False
+
+        self.bits |= mask
+        return True
+
+    def count(self, first: int = None, last: int = None) -> int:
+        """
+        Counts the completed units in a window (popcount of the masked bits).
+
+        Args:
+            first (int) = None: First unit of the window (default: all units from the start)
+            last (int) = None: Last unit of the window (default: all units until the end)
+
+        Returns:
+            int
+        """
+        bits = self.bits
+        if first is not None and first > self.base:
+            bits >>= first - self.base
+            offset = first
+        else:
+            offset = self.base
+
+        if last is not None:
+            if last < offset:
+                return 0
+            bits &= (1 << (last - offset + 1)) - 1
+
+        return bits.bit_count()
+
+    def run_length(self, unit: int) -> int:
+        """
+        Calculates the number of consecutive completed units ending with the given unit (e.g. the current streak).
+
+        Args:
+            unit (int): Last unit of the run
+
+        Returns:
+            int: 0 if the unit is not completed
+        """
+        if unit not in self:
+            return 0
+
+        # complement of the bits up to the unit, the highest set bit marks the last gap
+        width = unit - self.base + 1
+        gaps = ~self.bits & ((1 << width) - 1)
+
+        return width - gaps.bit_length()
+
+    def units(self) -> list:
+        """
+        Returns all completed units in ascending order (inverse of 'from_units()').
+
+        Returns:
+            list
+        """
+        units = []
+        for index, byte in enumerate(self.to_bytes()):
+            while byte:
+                lowest = byte & -byte
+                units.append(self.base + index * 8 + lowest.bit_length() - 1)
+                byte ^= lowest
+
+        return units
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns the bits in little-endian byte order (see 'from_bytes()').
+
+        Returns:
+            bytes
+        """
+        return self.bits.to_bytes(self.nbytes, "little")
+
+    def __contains__(self, unit) -> bool:
+        if not type(unit) is int or unit < self.base:
+            return False
+        return bool((self.bits >> (unit - self.base)) & 1)
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, HistoryBitset):
+            return NotImplemented
+        return self.units() == other.units()
+
+    def __repr__(self) -> str:
+        return f"HistoryBitset(base={self.base}, bits={self.bits:#x})"
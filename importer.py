@@ -0,0 +1,193 @@
+import csv
+import json
+import os
+import time
+from collections import namedtuple
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
+from habit_classes import Habit, HabitRepository, Weekly
+from validators import habit_name_validator, habit_description_validator
+
+
+# result of an import, see 'import_file()'
+#   duplicates: valid records that did not add a date (tracked already or record without date)
+#   habits_created: created habits, their creation date is their first imported date (today if they have none)
+Import_report = namedtuple("Import_report", ["rows", "added", "duplicates", "invalid", "habits_created", "seconds",
+                                             "rows_per_second"])
+
+
+# day ordinal of records without date (only the habit is created), day ordinals start at 1
+NO_DATE = 0
+
+
+def read_csv(path: str):
+    """
+    Generator to read tracking records from a CSV file with header. Required columns: 'habit', 'date' (may be empty to
+    only create the habit, see 'exporter'). Optional columns: 'period' ('Daily'/'Weekly'), 'description'.
+
+    Args:
+        path (str): Path of the CSV file
+
+    Yields:
+        dict: One record per row
+    """
+    with open(path, newline="", encoding="utf-8") as file:
+        yield from csv.DictReader(file)
+
+
+def read_jsonl(path: str):
+    """
+    Generator to read tracking records from a JSON Lines file (one object per line, keys as in 'read_csv()').
+
+    Args:
+        path (str): Path of the JSONL file
+
+    Yields:
+        dict: One record per non-empty line (None if the line is not valid JSON, so it is counted as invalid)
+    """
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+
+
+# readers of the supported file formats. Keys: file extension, Values: generator function
+READERS = {".csv": read_csv, ".jsonl": read_jsonl, ".ndjson": read_jsonl}
+
+
+@lru_cache(maxsize=4096)
+def _parse_ordinal(text: str) -> int:
+    """
+    Converts a date string (YYYY-MM-DD) to a day ordinal. Histories repeat the same dates across habits, so parsed
+    dates are cached.
+
+    Returns:
+        int: Day ordinal or None if the string is not a valid date
+    """
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date().toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_records(records, today: int):
+    """
+    Generator to convert records to (name, period, description, day ordinal) tuples. Records that are not objects,
+    invalid names and descriptions (see 'validators') as well as invalid and future dates are passed on with name or
+    ordinal None so they can be counted. Records without date (missing or empty) have ordinal 'NO_DATE'.
+
+    Args:
+        records (iterable): Records as yielded by 'read_csv()' or 'read_jsonl()'
+        today (int): Day ordinal of the current date
+
+    Yields:
+        tuple
+    """
+    for record in records:
+        if not isinstance(record, dict):
+            yield None, None, None, None
+            continue
+
+        text = record.get("date")
+        if text is None or text == "":
+            ordinal = NO_DATE
+        else:
+            ordinal = _parse_ordinal(text) if type(text) is str else None
+            if ordinal is not None and ordinal > today:
+                ordinal = None
+        name = record.get("habit")
+        description = record.get("description") or "Imported habit."
+        # names are unique per user, uniqueness is checked against the database instead of a registry
+        if not type(name) is str or habit_name_validator(name, {}) is not True:
+            name = None
+        if not type(description) is str or habit_description_validator(description) is not True:
+            name = None
+        yield name, record.get("period") or "Daily", description, ordinal
+
+
+def chunks(iterable, size: int):
+    """
+    Generator to split an iterable into lists of at most 'size' items.
+    """
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def import_file(path: str, chunk_size: int = 10000, repository: HabitRepository = None) -> Import_report:
+    """
+    Function to import historical check-offs from a CSV or JSONL file (by extension) into the user database.
+
+    Records are streamed through a generator pipeline and written in chunks, one transaction per chunk, so memory stays
+    bounded by the chunk size. Missing habits are created ('period' column, default: Daily), also by records without
+    date; at the end, their creation date is set to their first imported date. Dates that are checked off already
+    (Daily) or that fall into a week that is checked off already (Weekly) are skipped. Summaries are rebuilt once at the
+    end. Loaded habits are not updated, call 'HabitRepository.load()' afterwards.
+
+    Args:
+        path (str): Path of the file (.csv or .jsonl)
+        chunk_size (int) = 10000: Number of records per transaction
+        repository (HabitRepository) = None: Repository of the user (default: 'Habit.default_repository()')
+
+    Returns:
+        Import_report
+    """
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError("path must be a .csv or .jsonl file")
+    records = reader(path)
+    if not type(chunk_size) is int or chunk_size < 1:
+        raise ValueError("chunk_size must be a positive int")
+
+    start = time.perf_counter()
+    storage = (repository if repository is not None else Habit.default_repository()).storage
+    today = datetime.today().date()
+    habits = {row["name"]: (row["id"], row["period"]) for row in storage.fetch_habits()}
+    rows = added = invalid = habits_created = 0
+    # first imported day ordinal of every created habit. Keys: habit id, Values: day ordinal
+    first_dates = {}
+
+    for chunk in chunks(parse_records(records, today.toordinal()), chunk_size):
+        daily = []
+        weekly = []
+        created = 0
+        with storage.transaction():
+            changes = storage.total_changes()
+            for name, period, description, ordinal in chunk:
+                if not name or ordinal is None or period not in ("Daily", "Weekly"):
+                    invalid += 1
+                    continue
+                if name not in habits:
+                    habits[name] = (storage.insert_habit(name, description, period, str(today)), period)
+                    first_dates[habits[name][0]] = today.toordinal()
+                    created += 1
+                if ordinal == NO_DATE:
+                    continue
+                habit_id, period = habits[name]
+                if habit_id in first_dates and ordinal < first_dates[habit_id]:
+                    first_dates[habit_id] = ordinal
+                if period == "Weekly":
+                    weekly.append((habit_id, ordinal, Weekly._first_day(Weekly._unit(ordinal))))
+                else:
+                    daily.append((habit_id, ordinal))
+
+            storage.insert_dates(daily)
+            storage.insert_weekly_dates(weekly)
+            # every new habit and every inserted date counts as one change
+            added += storage.total_changes() - changes - created
+        rows += len(chunk)
+        habits_created += created
+
+    # created habits exist since their first imported date, e.g. for streaks bounded by 'date_created'
+    with storage.transaction():
+        storage.update_date_created((str(date.fromordinal(ordinal)), habit_id)
+                                    for habit_id, ordinal in first_dates.items())
+    storage.rebuild_stats()
+
+    seconds = time.perf_counter() - start
+    return Import_report(rows, added, rows - added - invalid, invalid, habits_created, seconds,
+                         rows / seconds if seconds else 0.0)
@@ -1,15 +1,19 @@
 import questionary
 import functions as func
-from habit_classes import Habit
+from habit_classes import HabitRepository
 from validators import user_name_validator, habit_name_validator, habit_description_validator, date_validator
 
-habit_dictionary = Habit.Instances
+repository = None
+habit_dictionary = {}
 run_main = True
 ask_main_question = True
 main_question = ""
 
 
-def user_login():
+def user_login(write_behind: bool = False):
+    global repository
+    global habit_dictionary
+
     run_login = True
     print("Welcome to your habit tracker.")
 
@@ -23,8 +27,9 @@ def user_login():
         # check if username exists
         if func.username_exists(username):
             run_login = False
-            Habit.change_db(username)
-            Habit.load()
+            repository = HabitRepository(username)
+            # tracking data is loaded when it is needed
+            repository.load(lazy=True)
 
         # else ask to create new account
         else:
@@ -36,8 +41,13 @@ def user_login():
 
             if create_username == "Yes":
                 run_login = False
-                Habit.change_db(username)
-                func.create_predefined_habits()
+                repository = HabitRepository(username)
+                func.create_predefined_habits(repository)
+
+    # optionally, check-offs are saved in the background, pending changes are written on exit
+    if write_behind:
+        repository.enable_write_behind()
+    habit_dictionary = repository.instances
 
 
 def main_menu():
@@ -65,6 +75,8 @@ def main_menu():
 
         elif main_question == "Exit":
             run_main = False
+            # write pending changes and close user database
+            repository.close()
 
 
 def manage_habits_menu():
@@ -90,14 +102,14 @@ def manage_habits_menu():
         # user enters name
         create_habit_name = questionary.text(
             "Please enter your habit name:",
-            validate=habit_name_validator).ask()
+            validate=lambda name: habit_name_validator(name, habit_dictionary)).ask()
         # user enters description
         create_habit_description = questionary.text(
             "Please enter a habit description:",
             validate=habit_description_validator).ask()
 
         # create habit and print message
-        func.create_habit(create_habit_period, create_habit_name, create_habit_description)
+        func.create_habit(create_habit_period, create_habit_name, create_habit_description, repository)
         print(func.habit_created_info(create_habit_period, create_habit_name, create_habit_description))
 
         # return to "Manage habits" menu
@@ -117,7 +129,7 @@ def manage_habits_menu():
         if edit_attribute == "Name":
             new_name = questionary.text(
                 "Please enter a new habit name:",
-                validate=habit_name_validator).ask()
+                validate=lambda name: habit_name_validator(name, habit_dictionary)).ask()
             # change habit name and save
             habit_dictionary[edit_habit].update_name(new_name)
             habit_dictionary[new_name].save()
@@ -200,8 +212,9 @@ def checkoff_habits_menu():
             "Which habit would you like to check-off?",
             choices=func.list_habits(habit_dictionary)).ask()
 
-        habit_dictionary[check_habit].checkoff_streak()
-        habit_dictionary[check_habit].save()
+        habit = repository.load_habit(check_habit)
+        habit.checkoff_streak()
+        habit.save()
 
         # return to "Check-off habits" menu
         return_checkoff_menu()
@@ -216,8 +229,9 @@ def checkoff_habits_menu():
             "Please enter the date:",
             validate=date_validator).ask()
 
-        habit_dictionary[check_habit].checkoff_streak(date=check_date)
-        habit_dictionary[check_habit].save()
+        habit = repository.load_habit(check_habit)
+        habit.checkoff_streak(date=check_date)
+        habit.save()
 
         # return to "Check-off habits" menu
         return_checkoff_menu()
@@ -1,8 +1,6 @@
-from interface import main_menu, user_login
-from habit_classes import Habit
+import sys
+from cli import main
 
 
-# start
-user_login()
-
-main_menu()
+# start (interactive interface without command, see 'cli.py')
+sys.exit(main())
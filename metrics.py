@@ -0,0 +1,330 @@
+import atexit
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+# environment variables of the metrics export (see 'configure()')
+TARGET_VARIABLE = "HABIT_METRICS"
+INTERVAL_VARIABLE = "HABIT_METRICS_INTERVAL"
+
+# default upper bounds of latency histograms in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# upper bounds of the rows per operation histogram
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000)
+
+
+def _escape(value) -> str:
+    # label values are quoted, backslashes, quotes and line feeds are escaped
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple, extra: str = None) -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in labels]
+    if extra is not None:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value) -> str:
+    return repr(float(value)) if type(value) is float else str(value)
+
+
+class Counter:
+    """
+    Class of monotonically increasing counters, one value per combination of label values.
+
+    Instance methods:
+        inc()
+        value()
+        samples()
+    """
+    def __init__(self, name: str, help_text: str):
+        """
+        Creates a counter. Use 'Registry.counter()' to register it.
+
+        Args:
+            name (str): Name of the metric family (without '_total')
+            help_text (str): Description of the metric
+        """
+        self.name = name
+        self.help = help_text
+        self.type = "counter"
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        """
+        Increases the counter of the label values by 'amount' (non-negative).
+        """
+        if amount < 0:
+            raise ValueError("amount must be non-negative")
+
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """
+        Returns the counter of the label values.
+        """
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self) -> list:
+        """
+        Returns the lines of the metric in OpenMetrics text format (without metadata).
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}_total{_labels(key)} {_number(value)}" for key, value in values]
+
+
+class Histogram:
+    """
+    Class of histograms (cumulative buckets, count and sum of the observations), one per combination of label values.
+
+    Instance methods:
+        observe()
+        time()
+        count()
+        total()
+        samples()
+    """
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS):
+        """
+        Creates a histogram. Use 'Registry.histogram()' to register it.
+
+        Args:
+            name (str): Name of the metric family
+            help_text (str): Description of the metric
+            buckets (tuple) = LATENCY_BUCKETS: Ascending upper bounds of the buckets (+Inf is added)
+        """
+        if list(buckets) != sorted(buckets):
+            raise ValueError("buckets must be ascending")
+
+        self.name = name
+        self.help = help_text
+        self.type = "histogram"
+        self.buckets = tuple(buckets)
+        # per label values: [observations per bucket (not cumulative, last one is +Inf), count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """
+        Adds an observation to the histogram of the label values.
+        """
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0, 0]
+            entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Context manager (or decorator) to observe the duration of a block in seconds.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        """
+        Returns the number of observations of the label values.
+        """
+        entry = self._values.get(tuple(sorted(labels.items())))
+        return entry[1] if entry else 0
+
+    def total(self, **labels) -> float:
+        """
+        Returns the sum of the observations of the label values.
+        """
+        entry = self._values.get(tuple(sorted(labels.items())))
+        return entry[2] if entry else 0
+
+    def samples(self) -> list:
+        """
+        Returns the lines of the metric in OpenMetrics text format (without metadata).
+        """
+        with self._lock:
+            values = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+
+        lines = []
+        for key, (counts, count, total) in values:
+            cumulative = 0
+            for bound, observations in zip(self.buckets + ("+Inf",), counts):
+                cumulative += observations
+                le = 'le="' + (bound if type(bound) is str else repr(float(bound))) + '"'
+                lines.append(f"{self.name}_bucket{_labels(key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_labels(key)} {count}")
+            lines.append(f"{self.name}_sum{_labels(key)} {_number(total)}")
+        return lines
+
+
+class Registry:
+    """
+    Class to hold the metrics of a process.
+
+    Instance methods:
+        counter()
+        histogram()
+        exposition()
+    """
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} is registered already")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        """
+        Creates and registers a counter (see 'Counter').
+        """
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        """
+        Creates and registers a histogram (see 'Histogram').
+        """
+        return self._register(Histogram(name, help_text, buckets))
+
+    def exposition(self) -> str:
+        """
+        Returns all metrics in OpenMetrics text format (also readable by Prometheus).
+
+        Returns:
+            str
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.extend(metric.samples())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+# registry of the habit tracker, updated by 'habit_classes', 'functions' and 'write_behind'
+REGISTRY = Registry()
+
+CHECKOFFS = REGISTRY.counter("habit_checkoffs", "Check-offs added to habits in memory.")
+SAVES = REGISTRY.counter("habit_saves", "Calls of HabitRepository.save_many() (every Habit.save()).")
+LOADS = REGISTRY.counter("habit_loads", "Calls of HabitRepository.load().")
+ROWS = REGISTRY.histogram("habit_rows", "Rows read or written per database operation.", ROW_BUCKETS)
+DB_SECONDS = REGISTRY.histogram("habit_db_seconds", "Latency of database operations in seconds.")
+ANALYTICS_SECONDS = REGISTRY.histogram("habit_analytics_seconds", "Latency of analytics functions in seconds.")
+
+
+class MetricsExporter:
+    """
+    Class to write the metrics of a registry in OpenMetrics text format at intervals (in a background thread) and on
+    exit. Targets:
+        '<path>': the file is replaced atomically on every write
+        'unix:<path>': the text is sent to a Unix domain socket (one connection per write)
+        'tcp:<host>:<port>': the text is sent to a TCP socket (one connection per write)
+
+    Instance methods:
+        write()
+        close()
+        _run()
+    """
+    def __init__(self, target: str, interval: float = 15.0, registry: Registry = None):
+        """
+        Creates an exporter and starts its thread.
+
+        Args:
+            target (str): File or socket to write to (see above)
+            interval (float) = 15.0: Seconds between writes
+            registry (Registry) = None: Metrics to write (default: 'REGISTRY')
+        """
+        if not type(target) is str or not target:
+            raise ValueError("target must be a non-empty str")
+        if not isinstance(interval, (int, float)) or interval <= 0:
+            raise ValueError("interval must be a positive number")
+
+        self.target = target
+        self.interval = interval
+        self.registry = registry or REGISTRY
+        self.writes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="habit-metrics", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self) -> None:
+        """
+        Writes the current metrics to the target.
+        """
+        # imported here, processes without socket target do not need it (e.g. short commands of 'cli')
+        import socket
+
+        data = self.registry.exposition().encode()
+
+        if self.target.startswith("unix:"):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.connect(self.target[len("unix:"):])
+                connection.sendall(data)
+        elif self.target.startswith("tcp:"):
+            host, _, port = self.target[len("tcp:"):].rpartition(":")
+            with socket.create_connection((host, int(port)), timeout=self.interval) as connection:
+                connection.sendall(data)
+        else:
+            temporary = f"{self.target}.tmp"
+            with open(temporary, "wb") as file:
+                file.write(data)
+            os.replace(temporary, self.target)
+
+        self.writes += 1
+
+    def close(self) -> None:
+        """
+        Stops the thread and writes the metrics a last time.
+        """
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        atexit.unregister(self.close)
+        try:
+            self.write()
+        except OSError:
+            pass
+
+    def _run(self) -> None:
+        """
+        Loop of the exporter thread.
+        """
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError:
+                # e.g. the scraper is not listening: write again at the next interval
+                pass
+
+
+def configure(target: str = None, interval: float = None) -> MetricsExporter:
+    """
+    Function to start exporting the metrics to the target of a command line option or, if not given, of the environment
+    variable 'HABIT_METRICS' (interval: 'HABIT_METRICS_INTERVAL', default 15 seconds).
+
+    Returns:
+        MetricsExporter or None if no target is set
+    """
+    target = target or os.environ.get(TARGET_VARIABLE)
+    if not target:
+        return None
+    interval = interval or float(os.environ.get(INTERVAL_VARIABLE, 15.0))
+
+    return MetricsExporter(target, interval)
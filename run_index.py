@@ -0,0 +1,144 @@
+from array import array
+from bisect import bisect_right
+
+
+class RunIndex:
+    """
+    Class to index the runs (maximal intervals of consecutive periods) of a habit. Periods are integer units, i.e. day
+    ordinals for daily habits and week numbers for weekly habits.
+
+    Runs are stored as two sorted arrays of first and last units. Adding a unit extends, merges or creates runs and
+    keeps the longest run length up to date, so reading the longest streak, the number of runs or the current streak
+    is O(1) (O(log runs) if the unit is not part of the latest run).
+
+    Class methods:
+        from_units()
+
+    Instance methods:
+        add()
+        run_length()
+        longest()
+        last_run()
+    """
+    __slots__ = ("_starts", "_ends", "_longest")
+
+    def __init__(self):
+        """
+        Creates an empty index.
+        """
+        self._starts = array("i")
+        self._ends = array("i")
+        self._longest = 0
+
+    @classmethod
+    def from_units(cls, units) -> "RunIndex":
+        """
+        Class method to build an index in one pass.
+
+        Args:
+            units (iterable): Sorted units, duplicates are allowed
+
+        Returns:
+            RunIndex
+        """
+        index = cls()
+        starts, ends = index._starts, index._ends
+
+        for unit in units:
+            if ends and unit <= ends[-1] + 1:
+                if unit > ends[-1]:
+                    ends[-1] = unit
+            else:
+                starts.append(unit)
+                ends.append(unit)
+
+        index._longest = max((end - start + 1 for start, end in zip(starts, ends)), default=0)
+        return index
+
+    def add(self, unit: int) -> bool:
+        """
+        Adds a unit to the index. Extends the adjacent run or merges the two runs around the unit if it closes a gap.
+
+        Args:
+            unit (int): Unit to add
+
+        Returns:
+            bool: True if the unit was not part of a run before
+        """
+        starts, ends = self._starts, self._ends
+        # run starting at or before unit
+        position = bisect_right(starts, unit) - 1
+
+        if position >= 0 and ends[position] >= unit:
+            return False
+
+        extends_left = position >= 0 and ends[position] == unit - 1
+        extends_right = position + 1 < len(starts) and starts[position + 1] == unit + 1
+
+        if extends_left and extends_right:
+            ends[position] = ends[position + 1]
+            del starts[position + 1]
+            del ends[position + 1]
+        elif extends_left:
+            ends[position] = unit
+        elif extends_right:
+            position += 1
+            starts[position] = unit
+        else:
+            position += 1
+            starts.insert(position, unit)
+            ends.insert(position, unit)
+
+        self._longest = max(self._longest, ends[position] - starts[position] + 1)
+        return True
+
+    def run_length(self, unit: int) -> int:
+        """
+        Calculates the number of consecutive units of the run containing the given unit, counted up to this unit
+        (i.e. the streak ending at this unit).
+
+        Args:
+            unit (int): Last unit of the streak
+
+        Returns:
+            int: 0 if the unit is not part of a run
+        """
+        starts, ends = self._starts, self._ends
+        if not starts:
+            return 0
+
+        # most streaks are read for the latest run
+        if starts[-1] <= unit <= ends[-1]:
+            return unit - starts[-1] + 1
+
+        position = bisect_right(starts, unit) - 1
+        if position >= 0 and ends[position] >= unit:
+            return unit - starts[position] + 1
+
+        return 0
+
+    def longest(self) -> int:
+        """
+        Returns the length of the longest run.
+
+        Returns:
+            int
+        """
+        return self._longest
+
+    def last_run(self) -> tuple:
+        """
+        Returns first and last unit of the latest run.
+
+        Returns:
+            tuple: (first unit, last unit) or None if the index is empty
+        """
+        if not self._starts:
+            return None
+        return self._starts[-1], self._ends[-1]
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __iter__(self):
+        return zip(self._starts, self._ends)
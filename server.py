@@ -0,0 +1,358 @@
+import argparse
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+import functions as func
+import metrics
+from habit_classes import HabitRepository
+from storage import MEMORY_MODES, PROFILES
+from validators import user_name_validator, habit_name_validator, habit_description_validator
+
+
+# largest accepted request body in bytes
+MAX_BODY = 1 << 20
+
+
+class RequestError(Exception):
+    """
+    Exception to answer a request with an error status (see 'HabitServer._dispatch()').
+    """
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class HabitServer:
+    """
+    Class to serve the habits of many users over HTTP/JSON.
+
+    The server runs on an asyncio event loop and keeps one 'HabitRepository' per user in memory, loaded on the first
+    request of the user. At most 'max_users' repositories are kept, the least recently used one is closed when another
+    user is loaded. Requests of one user are serialized by a per-user lock, the work of a request (database access and
+    analytics) runs in a thread pool, so requests of different users proceed in parallel.
+
+    Endpoints (user: alphanumeric username, database: '<directory>/<user>.db'). Only POST requests create the database
+    of a new user, GET requests of unknown users are answered with 404:
+        GET  /users/<user>/habits[?period=Daily|Weekly]     -> {"habits": [{"name", "description", "period"}, ...]}
+        POST /users/<user>/habits     {"name", "description", "period"}     -> {"created": name}
+        POST /users/<user>/checkoffs  {"items": [[name, date], ...]}      -> {"results": ['Checkoff_result', ...]}
+        GET  /users/<user>/streaks[?longest=1]                            -> {"streaks": {name: streak, ...}}
+
+    Instance methods:
+        start()
+        serve_forever()
+        close()
+        _path()
+        _repository()
+        _evict()
+        _handle()
+        _respond()
+        _dispatch()
+        _list_habits()
+        _create_habit()
+        _checkoff()
+        _streaks()
+    """
+    def __init__(self, directory: str = ".", workers: int = 4, profile: str = None, memory: str = None,
+                 max_users: int = 1000):
+        """
+        Creates a server.
+
+        Args:
+            directory (str) = ".": Directory of the user databases
+            workers (int) = 4: Number of worker threads
+            profile (str) = None: Durability profile of the user databases (see 'storage.PROFILES')
+            memory (str) = None: Keep the user databases in memory (see 'storage.MEMORY_MODES')
+            max_users (int) = 1000: Largest number of users kept in memory (not limited in "ephemeral" memory mode,
+                closing a repository would discard its database)
+        """
+        if not type(directory) is str:
+            raise ValueError("directory must be of type: str")
+        if not type(workers) is int or workers < 1:
+            raise ValueError("workers must be a positive int")
+        if not type(max_users) is int or max_users < 1:
+            raise ValueError("max_users must be a positive int")
+
+        self.directory = directory
+        self.profile = profile
+        self.memory = memory
+        self.max_users = max_users
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="habit-worker")
+        # repositories by user, least recently used first (only changed by the event loop)
+        self._repositories = OrderedDict()
+        self._locks = {}
+        self._server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> tuple:
+        """
+        Starts listening for connections.
+
+        Args:
+            host (str) = "127.0.0.1": Address to listen on
+            port (int) = 8080: Port to listen on (0: any free port)
+
+        Returns:
+            tuple: (host, port) the server listens on
+        """
+        self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self) -> None:
+        """
+        Serves requests until the server is closed.
+        """
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """
+        Stops listening, waits for running requests and closes all user databases.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=True)
+        for repository in self._repositories.values():
+            repository.close()
+
+    def _path(self, user: str) -> str:
+        """
+        Returns the database name of a user (without '.db').
+        """
+        return os.path.join(self.directory, user)
+
+    def _repository(self, user: str) -> HabitRepository:
+        """
+        Opens the repository of a user and loads its habits lazily. Runs in a worker thread under the lock of the user.
+        """
+        repository = HabitRepository(self._path(user), self.profile, self.memory)
+        repository.load(lazy=True)
+        return repository
+
+    async def _evict(self) -> None:
+        """
+        Closes the least recently used repositories while more than 'max_users' are open. Waits for running requests
+        of the user first.
+        """
+        loop = asyncio.get_running_loop()
+        while len(self._repositories) > self.max_users and self.memory != "ephemeral":
+            user = next(iter(self._repositories))
+            lock = self._locks[user]
+            async with lock:
+                # the lock is removed with the repository, requests waiting for it take a new one
+                repository = self._repositories.pop(user, None)
+                self._locks.pop(user, None)
+                if repository is not None:
+                    await loop.run_in_executor(self._executor, repository.close)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Handles one connection: parses HTTP/1.1 requests (keep-alive) and writes JSON responses.
+        """
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")[:-2]
+                try:
+                    method, target, version = request_line.split(" ")
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request line."}, False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if not 0 <= length <= MAX_BODY:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length."}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, payload = HTTPStatus.OK, await self._dispatch(method, target, body)
+                except RequestError as error:
+                    status, payload = error.status, {"error": error.message}
+                except Exception as error:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(error)}
+
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: HTTPStatus, payload: dict, keep_alive: bool) -> None:
+        """
+        Writes a JSON response.
+        """
+        body = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> dict:
+        """
+        Routes a request to its handler, which runs in the thread pool under the lock of the user.
+
+        Returns:
+            dict: JSON payload of the response
+        """
+        url = urlsplit(target)
+        parts = url.path.strip("/").split("/")
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        routes = {("GET", "habits"): self._list_habits,
+                  ("POST", "habits"): self._create_habit,
+                  ("POST", "checkoffs"): self._checkoff,
+                  ("GET", "streaks"): self._streaks}
+        if len(parts) != 3 or parts[0] != "users" or parts[2] not in ("habits", "checkoffs", "streaks"):
+            raise RequestError(HTTPStatus.NOT_FOUND, "Unknown endpoint.")
+        handler = routes.get((method, parts[2]))
+        if handler is None:
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "Method not allowed.")
+        # only POST requests create the database of a new user
+        create = method == "POST"
+
+        user = parts[1]
+        valid = user_name_validator(user)
+        if valid is not True:
+            raise RequestError(HTTPStatus.BAD_REQUEST, valid)
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Body must be JSON.")
+        if not type(data) is dict:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Body must be a JSON object.")
+
+        if not create and user not in self._repositories and not os.path.exists(self._path(user) + ".db"):
+            raise RequestError(HTTPStatus.NOT_FOUND, "User not found.")
+
+        loop = asyncio.get_running_loop()
+        while True:
+            lock = self._locks.setdefault(user, asyncio.Lock())
+            async with lock:
+                # the user was evicted while the request waited for the lock
+                if self._locks.get(user) is not lock:
+                    continue
+                repository = self._repositories.get(user)
+                if repository is None:
+                    repository = await loop.run_in_executor(self._executor, self._repository, user)
+                    self._repositories[user] = repository
+                else:
+                    self._repositories.move_to_end(user)
+                payload = await loop.run_in_executor(self._executor, handler, repository, query, data)
+            break
+
+        await self._evict()
+        return payload
+
+    @staticmethod
+    def _list_habits(repository: HabitRepository, query: dict, data: dict) -> dict:
+        """
+        Lists the habits of a user (see 'functions.list_habits()').
+        """
+        period = query.get("period")
+        if period not in (None, "Daily", "Weekly"):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "period must be 'Daily' or 'Weekly'")
+
+        habits = repository.instances
+        return {"habits": [{"name": name, "description": habits[name]._description, "period": habits[name]._period}
+                           for name in func.list_habits(habits, period)]}
+
+    @staticmethod
+    def _create_habit(repository: HabitRepository, query: dict, data: dict) -> dict:
+        """
+        Creates and saves a habit after validating it like user input (see 'functions.create_habit()').
+        """
+        name, description, period = data.get("name"), data.get("description"), data.get("period", "Daily")
+        if not type(name) is str or not type(description) is str:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "name and description must be of type: str")
+        for valid in (habit_name_validator(name, repository.instances), habit_description_validator(description)):
+            if valid is not True:
+                raise RequestError(HTTPStatus.BAD_REQUEST, valid)
+        if period not in ("Daily", "Weekly"):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "period must be 'Daily' or 'Weekly'")
+
+        func.create_habit(period, name, description, repository)
+        return {"created": name}
+
+    @staticmethod
+    def _checkoff(repository: HabitRepository, query: dict, data: dict) -> dict:
+        """
+        Checks off (habit name, date) pairs in one transaction (see 'functions.checkoff_many()').
+        """
+        items = data.get("items")
+        if not type(items) is list or not all(type(item) is list and len(item) == 2 and type(item[0]) is str
+                                              for item in items):
+            raise RequestError(HTTPStatus.BAD_REQUEST, "items must be a list of [name, date] pairs")
+
+        results = func.checkoff_many([tuple(item) for item in items], repository)
+        return {"results": [result._asdict() for result in results]}
+
+    @staticmethod
+    def _streaks(repository: HabitRepository, query: dict, data: dict) -> dict:
+        """
+        Lists the current or longest streaks of all habits of a user (see 'functions.list_streak()').
+        """
+        if query.get("longest") in ("1", "true"):
+            return {"streaks": func.list_longest_streak(repository.instances)}
+        return {"streaks": func.list_streak(repository.instances)}
+
+
+async def serve(host: str, port: int, directory: str, workers: int, profile: str = None, memory: str = None,
+                max_users: int = 1000) -> None:
+    """
+    Function to run a server until it is cancelled (e.g. by Ctrl+C).
+    """
+    server = HabitServer(directory, workers, profile, memory, max_users)
+    host, port = await server.start(host, port)
+    print(f"Serving habits on http://{host}:{port}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the habit tracker over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--directory", default=".", help="directory of the user databases")
+    parser.add_argument("--workers", type=int, default=4, help="number of worker threads")
+    parser.add_argument("--max-users", type=int, default=1000, help="number of user databases kept open")
+    parser.add_argument("--profile", choices=list(PROFILES), help="durability profile of the user databases")
+    parser.add_argument("--memory", choices=list(MEMORY_MODES),
+                        help="keep the user databases in memory (snapshot: saved to disk at intervals and on exit)")
+    parser.add_argument("--metrics", metavar="TARGET",
+                        help="write metrics in OpenMetrics format to a file, unix:<path> or tcp:<host>:<port>")
+    arguments = parser.parse_args()
+    metrics.configure(arguments.metrics)
+
+    try:
+        asyncio.run(serve(arguments.host, arguments.port, arguments.directory, arguments.workers, arguments.profile,
+                          arguments.memory, arguments.max_users))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
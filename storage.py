@@ -0,0 +1,773 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date
+
+
+# current version of the database schema, stored in the database file via 'PRAGMA user_version'
+SCHEMA_VERSION = 4
+
+# durability profiles of user databases (PRAGMA settings), see 'Storage.set_profile()'
+#   strict:   rollback journal, every commit is synced (SQLite defaults)
+#   balanced: write-ahead log, synced at checkpoints only (commits are atomic but the last ones may be lost on power loss)
+#   fast:     like balanced, additionally memory-mapped reads and a larger page cache
+# in WAL mode, a checkpoint runs every 'wal_autocheckpoint' pages and the log is truncated to 'journal_size_limit' bytes
+PROFILES = {
+    "strict": {"journal_mode": "DELETE", "synchronous": "FULL", "wal_autocheckpoint": 1000, "journal_size_limit": -1,
+               "mmap_size": 0, "cache_size": -2000},
+    "balanced": {"journal_mode": "WAL", "synchronous": "NORMAL", "wal_autocheckpoint": 1000,
+                 "journal_size_limit": 16 * 1024 * 1024, "mmap_size": 0, "cache_size": -2000},
+    "fast": {"journal_mode": "WAL", "synchronous": "NORMAL", "wal_autocheckpoint": 1000,
+             "journal_size_limit": 16 * 1024 * 1024, "mmap_size": 256 * 1024 * 1024, "cache_size": -64 * 1024},
+}
+
+# in-memory modes of user databases, see 'Storage.set_memory()'
+#   snapshot:  the database lives in memory, is loaded from its file on open and copied back to the file in the
+#              background every 'Storage.snapshot_interval' seconds and on close
+#   ephemeral: the database lives in memory only and starts empty, its file is never read or written
+MEMORY_MODES = ("snapshot", "ephemeral")
+
+# summary of the tracked dates of a habit as stored in 'habit_stats' table (dates as day ordinals)
+Habit_summary = namedtuple("Habit_summary", ["run_start", "last_checked", "longest_streak", "total"])
+
+# runs of all habits (gaps and islands): within a run, unit minus row number is constant, so every (habit, group) is
+# one run. units are day ordinals for daily and week numbers ((ordinal - 1) / 7) for weekly habits
+_RUNS = """
+    units AS (
+        SELECT DISTINCT habit.id AS habit_id,
+               CASE WHEN habit.period = 'Weekly' THEN (date_checked - 1) / 7 ELSE date_checked END AS unit
+        FROM habit JOIN tracking ON tracking.habit_id = habit.id
+    ),
+    islands AS (
+        SELECT habit_id, unit, unit - ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY unit) AS grp
+        FROM units
+    ),
+    runs AS (
+        SELECT habit_id, MIN(unit) AS first_unit, MAX(unit) AS last_unit, COUNT(*) AS length
+        FROM islands GROUP BY habit_id, grp
+    )
+"""
+
+# recomputes 'habit_stats' table for all habits, run_start is the first day of the latest run
+_REBUILD_STATS = f"""
+    INSERT INTO habit_stats (habit_id, run_start, last_checked, longest_streak, total)
+    WITH {_RUNS}
+    SELECT habit.id,
+           (SELECT CASE WHEN habit.period = 'Weekly' THEN first_unit * 7 + 1 ELSE first_unit END
+            FROM runs WHERE runs.habit_id = habit.id ORDER BY last_unit DESC LIMIT 1),
+           (SELECT MAX(date_checked) FROM tracking WHERE tracking.habit_id = habit.id),
+           COALESCE((SELECT MAX(length) FROM runs WHERE runs.habit_id = habit.id), 0),
+           (SELECT COUNT(*) FROM tracking WHERE tracking.habit_id = habit.id)
+    FROM habit
+"""
+
+
+def _create_tables(cursor: sqlite3.Cursor) -> None:
+    """
+    Migration 0 -> 1: Creates 'habit' and 'tracking' table in their original layout if they do not exist already.
+    Databases created before the schema was versioned already contain these tables.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS habit (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            description TEXT NOT NULL,
+            period TEXT NOT NULL,
+            date_created TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tracking (
+            id INTEGER PRIMARY KEY,
+            habit_id INTEGER,
+            date_checked TEXT,
+            FOREIGN KEY (habit_id) REFERENCES habit(id)
+        )
+    """)
+
+
+def _tracking_ordinals(cursor: sqlite3.Cursor) -> None:
+    """
+    Migration 1 -> 2: Rebuilds 'tracking' table with dates stored as integer day ordinals (see 'date.toordinal()') and
+    a unique index on (habit_id, date_checked). Duplicate rows and rows with malformed dates are dropped.
+    """
+    cursor.execute("""
+        CREATE TABLE tracking_new (
+            id INTEGER PRIMARY KEY,
+            habit_id INTEGER NOT NULL,
+            date_checked INTEGER NOT NULL,
+            FOREIGN KEY (habit_id) REFERENCES habit(id)
+        )
+    """)
+    cursor.execute("CREATE UNIQUE INDEX tracking_habit_date ON tracking_new (habit_id, date_checked)")
+    # julianday('0001-01-01') is 1721425.5, which is ordinal 1
+    cursor.execute("""
+        INSERT OR IGNORE INTO tracking_new (habit_id, date_checked)
+        SELECT habit_id, CAST(julianday(date_checked) - 1721424.5 AS INTEGER) FROM tracking
+        WHERE habit_id IS NOT NULL AND julianday(date_checked) IS NOT NULL
+        ORDER BY id
+    """)
+    cursor.execute("DROP TABLE tracking")
+    cursor.execute("ALTER TABLE tracking_new RENAME TO tracking")
+
+
+def _create_stats(cursor: sqlite3.Cursor) -> None:
+    """
+    Migration 2 -> 3: Creates 'habit_stats' table, which summarizes the tracked dates of every habit, and fills it from
+    'tracking' table.
+    """
+    cursor.execute("""
+        CREATE TABLE habit_stats (
+            habit_id INTEGER PRIMARY KEY,
+            run_start INTEGER,
+            last_checked INTEGER,
+            longest_streak INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            FOREIGN KEY (habit_id) REFERENCES habit(id)
+        )
+    """)
+    cursor.execute(_REBUILD_STATS)
+
+
+def _unique_habit_names(cursor: sqlite3.Cursor) -> None:
+    """
+    Migration 3 -> 4: Creates a unique index on 'habit.name', so single habits can be looked up by name (see
+    'Storage.fetch_habit()'). Habits that share the name of an older habit are renamed to '<name> (<id>)' first.
+    """
+    cursor.execute("""
+        UPDATE habit SET name = name || ' (' || id || ')'
+        WHERE id NOT IN (SELECT MIN(id) FROM habit GROUP BY name)
+    """)
+    cursor.execute("CREATE UNIQUE INDEX habit_name ON habit (name)")
+
+
+# MIGRATIONS[n] upgrades a database from version n to version n + 1
+MIGRATIONS = [
+    _create_tables,
+    _tracking_ordinals,
+    _create_stats,
+    _unique_habit_names,
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    """
+    Function to read the schema version of a database.
+
+    Args:
+        conn (sqlite3.Connection): Connection to a user database
+
+    Returns:
+        int
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> None:
+    """
+    Function to upgrade a user database to 'SCHEMA_VERSION' in place.
+
+    Every pending migration runs in its own transaction together with the update of 'PRAGMA user_version', so an
+    interrupted upgrade leaves the database at the last completed version.
+
+    Args:
+        conn (sqlite3.Connection): Connection to a user database
+    """
+    version = schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"database schema version {version} is newer than supported version {SCHEMA_VERSION}")
+    if version == SCHEMA_VERSION:
+        return
+
+    # manage transactions explicitly, as sqlite3 does not open them for DDL statements
+    isolation_level = conn.isolation_level
+    conn.commit()
+    conn.isolation_level = None
+    try:
+        for number in range(version, SCHEMA_VERSION):
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                MIGRATIONS[number](cursor)
+                cursor.execute(f"PRAGMA user_version = {number + 1}")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+    finally:
+        conn.isolation_level = isolation_level
+
+
+class Storage:
+    """
+    Class to manage the connection to a user database. Every database is opened once (see 'Storage.open()'); the
+    connection is kept open and shared by all Habit instances until 'Storage.close()' is called. Statements are kept as
+    constant strings, so the statement cache of the connection prepares each of them only once.
+
+    Class attributes:
+        _open (dict): Dictionary, which contains all open storages. Keys: database path, Values: Storage
+        _profiles (dict): Durability profiles of single databases. Keys: database path, Values: name in 'PROFILES'
+        default_profile (str): Durability profile of all other databases
+        _memory (dict): In-memory modes of single databases. Keys: database path, Values: mode in 'MEMORY_MODES'
+        snapshot_interval (float): Seconds between background snapshots of databases in "snapshot" mode
+
+    Class methods:
+        open()
+        close_path()
+        close_all()
+        set_profile()
+        set_default_profile()
+        set_memory()
+
+    Instance methods:
+        transaction()
+        read_transaction()
+        apply_profile()
+        checkpoint()
+        snapshot()
+        insert_habit()
+        update_habit()
+        update_date_created()
+        delete_habit()
+        insert_dates()
+        insert_weekly_dates()
+        total_changes()
+        update_stats()
+        rebuild_stats()
+        fetch_habits()
+        fetch_habit()
+        fetch_tracking()
+        fetch_export_habits()
+        fetch_export_tracking()
+        count_export_tracking()
+        fetch_dates()
+        fetch_streaks()
+        flush()
+        close()
+        _run_snapshots()
+    """
+    _open = {}
+    _profiles = {}
+    default_profile = "strict"
+    _memory = {}
+    snapshot_interval = 60.0
+
+    _INSERT_HABIT = "INSERT INTO habit (name, description, period, date_created) VALUES (?, ?, ?, ?)"
+    _UPDATE_HABIT = "UPDATE habit SET name=?, description=? WHERE id=?"
+    _UPDATE_DATE_CREATED = "UPDATE habit SET date_created=? WHERE id=?"
+    _DELETE_HABIT = "DELETE FROM habit WHERE id=?"
+    _DELETE_TRACKING = "DELETE FROM tracking WHERE habit_id=?"
+    _DELETE_STATS = "DELETE FROM habit_stats WHERE habit_id=?"
+    _UPDATE_STATS = """
+        INSERT OR REPLACE INTO habit_stats (habit_id, run_start, last_checked, longest_streak, total)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    _INSERT_DATE = "INSERT OR IGNORE INTO tracking (habit_id, date_checked) VALUES (?, ?)"
+    _INSERT_WEEKLY_DATE = """
+        INSERT INTO tracking (habit_id, date_checked)
+        SELECT :habit_id, :date WHERE NOT EXISTS (
+            SELECT 1 FROM tracking WHERE habit_id = :habit_id AND date_checked BETWEEN :monday AND :monday + 6
+        )
+    """
+    _SELECT_HABITS = """
+        SELECT id, name, description, period, date_created, run_start, last_checked, longest_streak, total
+        FROM habit LEFT JOIN habit_stats ON habit_stats.habit_id = habit.id
+        ORDER BY id
+    """
+    _SELECT_HABIT = """
+        SELECT id, name, description, period, date_created, run_start, last_checked, longest_streak, total
+        FROM habit LEFT JOIN habit_stats ON habit_stats.habit_id = habit.id
+        WHERE name = ?
+    """
+    _SELECT_TRACKING = "SELECT habit_id, date_checked FROM tracking ORDER BY habit_id, date_checked"
+    _SELECT_DATES = "SELECT date_checked FROM tracking WHERE habit_id=? ORDER BY date_checked"
+    # filters of the export queries, habit names are passed as one JSON array to keep the statement constant
+    _EXPORT_FILTER = """
+        WHERE (:names IS NULL OR habit.name IN (SELECT value FROM json_each(:names)))
+    """
+    _SELECT_EXPORT_HABITS = f"""
+        SELECT id, name, description, period, date_created FROM habit {_EXPORT_FILTER} ORDER BY id
+    """
+    _SELECT_EXPORT_TRACKING = f"""
+        SELECT habit.id, habit.name, habit.period, habit.description, tracking.date_checked
+        FROM habit JOIN tracking ON tracking.habit_id = habit.id
+        {_EXPORT_FILTER} AND tracking.date_checked BETWEEN :first AND :last
+        ORDER BY habit.id, tracking.date_checked
+    """
+    # habits without tracked dates in the range are returned once with date NULL
+    _SELECT_EXPORT_RECORDS = f"""
+        SELECT habit.id, habit.name, habit.period, habit.description, tracking.date_checked
+        FROM habit LEFT JOIN tracking
+            ON tracking.habit_id = habit.id AND tracking.date_checked BETWEEN :first AND :last
+        {_EXPORT_FILTER}
+        ORDER BY habit.id, tracking.date_checked
+    """
+    _COUNT_EXPORT_TRACKING = f"""
+        SELECT COUNT(*)
+        FROM habit JOIN tracking ON tracking.habit_id = habit.id
+        {_EXPORT_FILTER} AND tracking.date_checked BETWEEN :first AND :last
+    """
+    _SELECT_STREAKS = f"""
+        WITH {_RUNS},
+        today AS (
+            SELECT id AS habit_id, CASE WHEN period = 'Weekly' THEN (:today - 1) / 7 ELSE :today END AS unit
+            FROM habit
+        )
+        SELECT habit.name,
+               COALESCE(MAX(CASE WHEN runs.first_unit <= today.unit AND today.unit <= runs.last_unit
+                                 THEN today.unit - runs.first_unit + 1 END), 0) AS streak,
+               COALESCE(MAX(runs.length), 0) AS longest_streak
+        FROM habit
+        JOIN today ON today.habit_id = habit.id
+        LEFT JOIN runs ON runs.habit_id = habit.id
+        GROUP BY habit.id
+        ORDER BY habit.id
+    """
+
+    @classmethod
+    def open(cls, path: str) -> "Storage":
+        """
+        Class method to get the storage of a database. Opens (and upgrades) the database if it is not open already.
+
+        Args:
+            path (str): Path of the user database
+
+        Returns:
+            Storage
+        """
+        if not type(path) is str:
+            raise ValueError("path must be of type: str")
+
+        storage = cls._open.get(path)
+        if storage is None:
+            storage = cls(path)
+            cls._open[path] = storage
+
+        return storage
+
+    @classmethod
+    def set_profile(cls, path: str, profile: str) -> None:
+        """
+        Class method to choose the durability profile (see 'PROFILES') of a database. Applied immediately if the
+        database is open.
+
+        Args:
+            path (str): Path of the user database
+            profile (str): Name of the profile ("strict", "balanced" or "fast"), None: use 'default_profile'
+        """
+        if profile is not None and profile not in PROFILES:
+            raise ValueError(f"profile must be one of: {', '.join(PROFILES)}")
+
+        if profile is None:
+            cls._profiles.pop(path, None)
+        else:
+            cls._profiles[path] = profile
+        if path in cls._open:
+            cls._open[path].apply_profile()
+
+    @classmethod
+    def set_default_profile(cls, profile: str) -> None:
+        """
+        Class method to choose the durability profile of all databases without own profile. Applied immediately to
+        open databases.
+
+        Args:
+            profile (str): Name of the profile ("strict", "balanced" or "fast")
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"profile must be one of: {', '.join(PROFILES)}")
+
+        cls.default_profile = profile
+        for storage in cls._open.values():
+            storage.apply_profile()
+
+    @classmethod
+    def set_memory(cls, path: str, memory: str) -> None:
+        """
+        Class method to choose whether a database lives in memory (see 'MEMORY_MODES'). Takes effect the next time the
+        database is opened, so an open storage is closed (and snapshotted) first.
+
+        Args:
+            path (str): Path of the user database
+            memory (str): "snapshot" or "ephemeral", None: keep the database on disk
+        """
+        if memory is not None and memory not in MEMORY_MODES:
+            raise ValueError(f"memory must be one of: {', '.join(MEMORY_MODES)}")
+
+        if cls._memory.get(path) == memory:
+            return
+        cls.close_path(path)
+        if memory is None:
+            cls._memory.pop(path, None)
+        else:
+            cls._memory[path] = memory
+
+    @classmethod
+    def close_path(cls, path: str) -> None:
+        """
+        Class method to close the storage of a database if it is open.
+
+        Args:
+            path (str): Path of the user database
+        """
+        storage = cls._open.get(path)
+        if storage is not None:
+            storage.close()
+
+    @classmethod
+    def close_all(cls) -> None:
+        """
+        Class method to close all open storages.
+        """
+        for storage in list(cls._open.values()):
+            storage.close()
+
+    def __init__(self, path: str):
+        """
+        Opens a connection to a user database and upgrades it to the current schema version.
+        Use 'Storage.open()' to share connections.
+
+        Args:
+            path (str): Path of the user database
+        """
+        self.path = path
+        self.memory = Storage._memory.get(path)
+        # the connection may be used by other threads (e.g. the workers of 'server' or 'WriteBehindQueue'), transactions
+        # are serialized by the lock
+        self._conn = sqlite3.connect(path if self.memory is None else ":memory:", check_same_thread=False)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self.profile = None
+        if self.memory == "snapshot" and os.path.exists(path):
+            # hydrate the in-memory database with the backup API (page by page, no SQL round trips)
+            source = sqlite3.connect(path)
+            try:
+                source.backup(self._conn)
+            finally:
+                source.close()
+        self.apply_profile()
+        version = schema_version(self._conn)
+        migrate(self._conn)
+
+        self._snapshot_thread = None
+        if self.memory == "snapshot":
+            # an upgraded or new database is written on the first snapshot even without changes of its rows
+            self._snapshot_changes = self._conn.total_changes if version == SCHEMA_VERSION else None
+            self._stop_snapshots = threading.Event()
+            self._snapshot_thread = threading.Thread(target=self._run_snapshots, name="habit-snapshot", daemon=True)
+            self._snapshot_thread.start()
+            atexit.register(self.close)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager to group statements into one transaction. Commits when the outermost block is left and rolls
+        back if it is left with an exception or the commit fails (e.g. the database is busy), so the next transaction
+        starts clean. Nested blocks join the enclosing transaction. Other threads wait until the outermost block is left.
+        """
+        with self._lock:
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.rollback()
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                try:
+                    self._conn.commit()
+                except BaseException:
+                    self._conn.rollback()
+                    raise
+
+    @contextmanager
+    def read_transaction(self):
+        """
+        Context manager to run several queries on one state of the database (see 'transaction()'). The transaction is
+        started explicitly, so other processes cannot change the database between the queries either.
+        """
+        with self.transaction():
+            if not self._conn.in_transaction:
+                self._conn.execute("BEGIN")
+            yield self
+
+    def apply_profile(self) -> None:
+        """
+        Applies the durability profile of the database (see 'Storage.set_profile()') if it changed.
+        """
+        profile = Storage._profiles.get(self.path, Storage.default_profile)
+        if profile == self.profile:
+            return
+
+        with self._lock:
+            # the journal mode cannot change inside a transaction
+            self._conn.commit()
+            for pragma, value in PROFILES[profile].items():
+                self._conn.execute(f"PRAGMA {pragma} = {value}")
+            self.profile = profile
+
+    def checkpoint(self) -> None:
+        """
+        Copies the write-ahead log into the database and truncates it (WAL profiles only).
+        """
+        with self._lock:
+            self._conn.commit()
+            if PROFILES[self.profile]["journal_mode"] == "WAL":
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def snapshot(self) -> bool:
+        """
+        Copies an in-memory database ("snapshot" mode) into its file with the backup API. Skipped if nothing changed
+        since the last snapshot. The file is replaced in one transaction, so it always holds a complete snapshot.
+
+        Returns:
+            bool: True if the file was written
+        """
+        with self._lock:
+            if self.memory != "snapshot" or self._conn is None:
+                return False
+            self._conn.commit()
+            changes = self._conn.total_changes
+            if changes == self._snapshot_changes:
+                return False
+
+            target = sqlite3.connect(self.path)
+            try:
+                self._conn.backup(target)
+            finally:
+                target.close()
+            self._snapshot_changes = changes
+            return True
+
+    def insert_habit(self, name: str, description: str, period: str, date_created: str) -> int:
+        """
+        Inserts habit metadata into 'habit' table.
+
+        Returns:
+            int: id of the new habit
+        """
+        return self._conn.execute(self._INSERT_HABIT, (name, description, period, date_created)).lastrowid
+
+    def update_habit(self, habit_id: int, name: str, description: str) -> None:
+        """
+        Updates name and description of a habit in 'habit' table.
+        """
+        self._conn.execute(self._UPDATE_HABIT, (name, description, habit_id))
+
+    def update_date_created(self, rows) -> None:
+        """
+        Updates the creation dates of habits in 'habit' table (e.g. to the first imported date, see 'importer').
+
+        Args:
+            rows (iterable): (date created (YYYY-MM-DD), habit id) pairs
+        """
+        self._conn.executemany(self._UPDATE_DATE_CREATED, rows)
+
+    def delete_habit(self, habit_id: int) -> None:
+        """
+        Removes a habit and its tracked dates from 'habit' and 'tracking' table.
+        """
+        with self.transaction():
+            self._conn.execute(self._DELETE_HABIT, (habit_id,))
+            self._conn.execute(self._DELETE_TRACKING, (habit_id,))
+            self._conn.execute(self._DELETE_STATS, (habit_id,))
+
+    def insert_dates(self, rows) -> None:
+        """
+        Inserts tracked dates into 'tracking' table. Dates that are tracked already are ignored.
+
+        Args:
+            rows (iterable): (habit id, day ordinal) pairs
+        """
+        self._conn.executemany(self._INSERT_DATE, rows)
+
+    def insert_weekly_dates(self, rows) -> None:
+        """
+        Inserts tracked dates of weekly habits into 'tracking' table. Dates are ignored if a date of the same week is
+        tracked already (uses the index on 'tracking' table).
+
+        Args:
+            rows (iterable): (habit id, day ordinal, day ordinal of the monday of the week) tuples
+        """
+        self._conn.executemany(self._INSERT_WEEKLY_DATE, ({"habit_id": habit_id, "date": day, "monday": monday}
+                                                          for habit_id, day, monday in rows))
+
+    def total_changes(self) -> int:
+        """
+        Returns the number of rows modified since the database was opened (e.g. to count inserted dates).
+
+        Returns:
+            int
+        """
+        return self._conn.total_changes
+
+    def update_stats(self, summaries) -> None:
+        """
+        Writes summaries of habits to 'habit_stats' table.
+
+        Args:
+            summaries (iterable): (habit id, 'Habit_summary') pairs
+        """
+        self._conn.executemany(self._UPDATE_STATS, ((habit_id, *summary) for habit_id, summary in summaries))
+
+    def rebuild_stats(self) -> None:
+        """
+        Recomputes 'habit_stats' table of all habits from 'tracking' table (e.g. if the summary is missing or stale).
+        """
+        with self.transaction():
+            self._conn.execute("DELETE FROM habit_stats")
+            self._conn.execute(_REBUILD_STATS)
+
+    def fetch_habits(self) -> list:
+        """
+        Returns the metadata and summary of all habits ordered by id.
+
+        Returns:
+            list of 'sqlite3.Row' objects (keys: id, name, description, period, date_created and the fields of
+            'Habit_summary', which are None if the summary of a habit is missing)
+        """
+        cursor = self._conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        return cursor.execute(self._SELECT_HABITS).fetchall()
+
+    def fetch_habit(self, name: str) -> sqlite3.Row:
+        """
+        Returns the metadata and summary of one habit (uses the unique index on 'habit.name').
+
+        Args:
+            name (str): Name of the habit
+
+        Returns:
+            'sqlite3.Row' (keys as in 'fetch_habits()') or None if no habit has this name
+        """
+        cursor = self._conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        return cursor.execute(self._SELECT_HABIT, (name,)).fetchone()
+
+    def fetch_tracking(self) -> sqlite3.Cursor:
+        """
+        Returns a cursor over all tracked dates, ordered by habit id and date.
+
+        Returns:
+            sqlite3.Cursor yielding (habit id, day ordinal) tuples
+        """
+        return self._conn.execute(self._SELECT_TRACKING)
+
+    @staticmethod
+    def _export_parameters(names, first: int, last: int) -> dict:
+        """
+        Returns the parameters of the export queries (see 'fetch_export_habits()').
+        """
+        return {"names": None if names is None else json.dumps(list(names)),
+                "first": 1 if first is None else first,
+                "last": date.max.toordinal() if last is None else last}
+
+    def fetch_export_habits(self, names=None) -> sqlite3.Cursor:
+        """
+        Returns a cursor over the metadata of habits, ordered by id.
+
+        Args:
+            names (iterable) = None: Names of the habits to export (default: all habits)
+
+        Returns:
+            sqlite3.Cursor yielding (id, name, description, period, date_created) tuples
+        """
+        return self._conn.execute(self._SELECT_EXPORT_HABITS, self._export_parameters(names, None, None))
+
+    def fetch_export_tracking(self, names=None, first: int = None, last: int = None,
+                              empty: bool = False) -> sqlite3.Cursor:
+        """
+        Returns a cursor over tracked dates with the metadata of their habit, ordered by habit id and date. Rows are
+        produced by SQLite while the cursor is read (e.g. with 'fetchmany()').
+
+        Args:
+            names (iterable) = None: Names of the habits to export (default: all habits)
+            first (int) = None: Day ordinal of the first date to export (default: no limit)
+            last (int) = None: Day ordinal of the last date to export (default: no limit)
+            empty (bool) = False: Also return habits without tracked dates in the range (once, with day ordinal None)
+
+        Returns:
+            sqlite3.Cursor yielding (habit id, name, period, description, day ordinal) tuples
+        """
+        statement = self._SELECT_EXPORT_RECORDS if empty else self._SELECT_EXPORT_TRACKING
+        return self._conn.execute(statement, self._export_parameters(names, first, last))
+
+    def count_export_tracking(self, names=None, first: int = None, last: int = None) -> int:
+        """
+        Counts the rows of 'fetch_export_tracking()' (same arguments).
+
+        Returns:
+            int
+        """
+        parameters = self._export_parameters(names, first, last)
+        return self._conn.execute(self._COUNT_EXPORT_TRACKING, parameters).fetchone()[0]
+
+    def fetch_dates(self, habit_id: int) -> list:
+        """
+        Returns the tracked dates of one habit (uses the index on 'tracking' table).
+
+        Args:
+            habit_id (int): id of the habit
+
+        Returns:
+            list of day ordinals in ascending order
+        """
+        return [row[0] for row in self._conn.execute(self._SELECT_DATES, (habit_id,))]
+
+    def fetch_streaks(self, today: int) -> list:
+        """
+        Computes current and longest streak of all habits inside SQLite using window functions, without loading the
+        tracked dates.
+
+        Args:
+            today (int): Day ordinal of the current date
+
+        Returns:
+            list of (name, streak, longest streak) tuples ordered by habit id
+        """
+        return self._conn.execute(self._SELECT_STREAKS, {"today": today}).fetchall()
+
+    def flush(self) -> None:
+        """
+        Commits all pending changes.
+        """
+        with self._lock:
+            self._conn.commit()
+
+    def close(self) -> None:
+        """
+        Flushes pending changes (and the write-ahead log), writes a last snapshot of an in-memory database, closes the
+        connection and removes the storage from 'Storage._open'.
+        """
+        if self._snapshot_thread is not None:
+            self._stop_snapshots.set()
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+            atexit.unregister(self.close)
+
+        with self._lock:
+            if self._conn is not None:
+                self.checkpoint()
+                self.snapshot()
+                self._conn.close()
+                self._conn = None
+        if Storage._open.get(self.path) is self:
+            Storage._open.pop(self.path)
+
+    def _run_snapshots(self) -> None:
+        """
+        Loop of the snapshot thread: writes a snapshot every 'Storage.snapshot_interval' seconds until the storage is
+        closed.
+        """
+        while not self._stop_snapshots.wait(Storage.snapshot_interval):
+            try:
+                self.snapshot()
+            except sqlite3.Error:
+                # e.g. the file is locked by another process: keep the changes in memory and retry at the next interval
+                pass
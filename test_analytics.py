@@ -0,0 +1,66 @@
+import random
+import pytest
+from datetime import datetime, timedelta
+from habit_classes import Habit, Daily, Weekly
+import analytics
+from freezegun import freeze_time
+
+
+@pytest.fixture
+def random_habits() -> dict:
+    # setup: create habits with random check-offs (including future dates and empty histories) in memory
+    Habit.Instances = {}
+    Habit.change_db("_test", memory="ephemeral")
+    random.seed(3)
+    start = datetime(2014, 1, 1).date()
+
+    for number in range(40):
+        habit = Daily(f"Daily {number}", "Description") if number % 2 else Weekly(f"Weekly {number}", "Description")
+        density = random.random()
+        for offset in range(500):
+            if random.random() < density:
+                habit.checkoff_streak(str(start + timedelta(days=offset)))
+
+    yield Habit.Instances
+
+    # teardown: delete habits
+    Habit.Instances = {}
+
+
+@freeze_time("2015-01-18")
+def test_analyze(random_habits):
+    stats = analytics.analyze(random_habits)
+
+    # vectorized analytics match the methods of every habit
+    assert list(stats) == list(random_habits)
+    for name, habit in random_habits.items():
+        completions = sum(end - start + 1 for start, end in habit._runs)
+        assert stats[name] == (habit.streak(), habit.longest_streak(), habit.is_active(), completions)
+
+
+def test_analyze_empty():
+    assert analytics.analyze({}) == {}
+
+    with pytest.raises(ValueError):
+        analytics.analyze([])
+
+
+def test_pack(random_habits):
+    units, offsets = analytics.pack(random_habits)
+
+    assert len(offsets) == len(random_habits) + 1
+    assert offsets[-1] == len(units)
+    for index, habit in enumerate(random_habits.values()):
+        assert list(units[offsets[index]:offsets[index + 1]]) == sorted(habit._unit(ordinal) for ordinal in
+                                                                         habit._dates_checked.ordinals)
+
+
+def test_count_in_window(random_habits):
+    first, last = datetime(2014, 3, 1).date(), datetime(2014, 5, 31).date()
+    counts = analytics.count_in_window(random_habits, first, last)
+
+    # weekly habits count all weeks touching the window
+    for name, habit in random_habits.items():
+        first_unit, last_unit = habit._unit(first.toordinal()), habit._unit(last.toordinal())
+        assert counts[name] == len({habit._unit(ordinal) for ordinal in habit._dates_checked.ordinals
+                                    if first_unit <= habit._unit(ordinal) <= last_unit})
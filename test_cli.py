@@ -0,0 +1,74 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from datetime import date, timedelta
+import cli
+
+
+@pytest.fixture
+def user_directory(tmp_path, monkeypatch):
+    # setup: user databases in a temporary directory, user alice with imported history
+    monkeypatch.chdir(tmp_path)
+    yesterday = date.today() - timedelta(days=1)
+    with open("history.csv", "w") as file:
+        file.write(f"habit,date,period\nBrush,{yesterday - timedelta(days=1)},Daily\nBrush,{yesterday},Daily\n"
+                   f"Plants,{yesterday},Weekly\n")
+    assert cli.main(["import", "--user", "alice", "history.csv"]) == 0
+
+    yield tmp_path
+
+
+def test_checkoff_and_streaks(user_directory, capsys):
+    capsys.readouterr()
+    assert cli.main(["checkoff", "--user", "alice", "Brush", "Brush", "Floss"]) == 1
+    assert capsys.readouterr().out.splitlines()[1:] == [f"Brush {date.today()}: duplicate (Period already checked off.)",
+                                                        f"Floss {date.today()}: invalid (Habit does not exist.)"]
+
+    assert cli.main(["checkoff", "--user", "alice", "Plants", "--date", "2015-01-05", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out)[0]["status"] == "added"
+
+    assert cli.main(["streaks", "--user", "alice", "--json"]) == 0
+    assert json.loads(capsys.readouterr().out) == {"Brush": 3, "Plants": 1}
+    assert cli.main(["streaks", "--user", "alice", "--longest"]) == 0
+    assert capsys.readouterr().out == "Habit: Brush - Streak: 3\nHabit: Plants - Streak: 1\n"
+
+    assert cli.main(["rebuild-stats", "--user", "alice"]) == 0
+    assert capsys.readouterr().out == "Rebuilt summaries of 2 habits.\n"
+
+    with pytest.raises(SystemExit, match="user bob does not exist"):
+        cli.main(["streaks", "--user", "bob"])
+    assert not os.path.exists("bob.db")
+
+
+def test_export(user_directory, capsys):
+    assert cli.main(["export", "--user", "alice", "brush.jsonl", "--habit", "Brush",
+                     "--from", str(date.today() - timedelta(days=1))]) == 0
+    assert capsys.readouterr().out.endswith("Exported 1 check-offs to brush.jsonl.\n")
+
+    with pytest.raises(SystemExit):
+        cli.main(["export", "--user", "alice", "brush.csv", "--from", "yesterday"])
+
+
+def test_import_export_errors(user_directory):
+    # rejected imports do not create the user
+    with pytest.raises(SystemExit, match="notes.txt is not a .csv or .jsonl file"):
+        cli.main(["import", "--user", "bob", "notes.txt"])
+    with pytest.raises(SystemExit, match="missing.csv does not exist"):
+        cli.main(["import", "--user", "bob", "missing.csv"])
+    assert not os.path.exists("bob.db")
+
+    with pytest.raises(SystemExit, match="notes.txt is not a .csv, .jsonl or .npz file"):
+        cli.main(["export", "--user", "alice", "notes.txt"])
+    with pytest.raises(SystemExit, match="error: export failed"):
+        cli.main(["export", "--user", "alice", os.path.join("missing", "brush.csv")])
+
+
+def test_lazy_imports(user_directory):
+    # short commands neither import the interactive interface nor numpy
+    code = ("import sys, cli; cli.main(['checkoff', '--user', 'alice', 'Brush']); cli.main(['streaks', '--user', "
+            "'alice']); print(sorted({'questionary', 'numpy', 'interface', 'analytics'} & set(sys.modules)))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            env={**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(cli.__file__))})
+    assert result.stdout.splitlines()[-1] == "[]"
@@ -0,0 +1,29 @@
+from datetime import date
+from date_store import DateStore
+
+
+def test_add():
+    store = DateStore()
+
+    assert store.add(date(2015, 1, 2)) is True
+    assert store.add(date(2015, 1, 1)) is True
+    assert store.add(date(2015, 1, 2)) is False
+    assert store.add_ordinal(date(2015, 1, 3).toordinal()) is True
+
+    assert store == [date(2015, 1, 1), date(2015, 1, 2), date(2015, 1, 3)]
+    assert list(store.ordinals) == [date(2015, 1, day).toordinal() for day in (1, 2, 3)]
+
+
+def test_sequence():
+    store = DateStore([date(2015, 1, 3), date(2015, 1, 1), date(2015, 1, 1)])
+
+    assert len(store) == 2
+    assert store[0] == date(2015, 1, 1)
+    assert store[-1] == date(2015, 1, 3)
+    assert store[:1] == [date(2015, 1, 1)]
+    assert date(2015, 1, 3) in store
+    assert date(2015, 1, 2) not in store
+    assert "2015-01-01" not in store
+    assert store.count(date(2015, 1, 1)) == 1
+    assert store.index(date(2015, 1, 3)) == 1
+    assert store == DateStore.from_ordinals([date(2015, 1, 3).toordinal(), date(2015, 1, 1).toordinal()])
@@ -0,0 +1,91 @@
+import csv
+import json
+import os
+import numpy as np
+import pytest
+from datetime import date
+from habit_classes import Habit, Daily, Weekly
+import exporter
+import importer
+
+
+@pytest.fixture
+def export_database() -> None:
+    # setup: create a database with two habits
+    Habit.close_db()
+    Habit.Instances = {}
+    Habit.change_db("_export")
+    if os.path.exists(Habit._DB_NAME):
+        os.remove(Habit._DB_NAME)
+
+    brush = Daily("Brush", "Brush your teeth.")
+    for day in ["2015-01-03", "2015-01-01", "2015-01-02"]:
+        brush.checkoff_streak(day)
+    plants = Weekly("Plants", "Water your plants.")
+    for day in ["2015-01-14", "2015-01-05"]:
+        plants.checkoff_streak(day)
+    Habit.save_many([plants, brush, Daily("Read", "Read a book.")])
+    Habit.Instances = {}
+
+    yield
+
+    # teardown: delete habits and databases
+    Habit.close_db()
+    Habit.Instances = {}
+    Habit._DB_NAME = "_test.db"
+    for name in ["_export.db", "_reimport.db"]:
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def test_export_csv(export_database, tmp_path):
+    path = str(tmp_path / "export.csv")
+    assert exporter.export_file(path, batch_size=2) == 5
+
+    # ordered by habit and date
+    with open(path, newline="") as file:
+        rows = [(row["habit"], row["date"]) for row in csv.DictReader(file)]
+    assert rows == [("Plants", "2015-01-05"), ("Plants", "2015-01-14"), ("Brush", "2015-01-01"),
+                    ("Brush", "2015-01-02"), ("Brush", "2015-01-03"), ("Read", "")]
+
+    # exported files can be imported again, including habits without tracked dates
+    Habit.change_db("_reimport")
+    report = importer.import_file(path)
+    assert (report.added, report.invalid, report.habits_created) == (5, 0, 3)
+    Habit.load()
+    assert list(Habit.Instances) == ["Plants", "Brush", "Read"]
+    assert Habit.Instances["Read"]._dates_checked == []
+
+
+def test_export_jsonl_filtered(export_database, tmp_path):
+    path = str(tmp_path / "export.jsonl")
+    assert exporter.export_file(path, names=["Brush"], first=date(2015, 1, 2)) == 2
+
+    with open(path) as file:
+        records = [json.loads(line) for line in file]
+    assert records == [{"habit": "Brush", "date": "2015-01-02", "period": "Daily", "description": "Brush your teeth."},
+                       {"habit": "Brush", "date": "2015-01-03", "period": "Daily", "description": "Brush your teeth."}]
+    assert exporter.export_file(path, names=[]) == 0
+
+    # habits without tracked dates in the range are exported without date
+    assert exporter.export_file(path, names=["Plants"], first=date(2015, 2, 1)) == 0
+    with open(path) as file:
+        assert [json.loads(line)["date"] for line in file] == [None]
+
+
+def test_export_npz(export_database, tmp_path):
+    path = str(tmp_path / "export.npz")
+    assert exporter.export_file(path, last=date(2015, 1, 5), batch_size=1) == 4
+
+    with np.load(path) as data:
+        assert list(data["habits_name"]) == ["Plants", "Brush", "Read"]
+        assert list(data["habit_id"]) == [1, 2, 2, 2]
+        assert [date.fromordinal(int(day)) for day in data["date"]] == [date(2015, 1, 5), date(2015, 1, 1),
+                                                                        date(2015, 1, 2), date(2015, 1, 3)]
+
+
+def test_export_invalid(export_database):
+    with pytest.raises(ValueError):
+        exporter.export_file("export.txt")
+    with pytest.raises(ValueError):
+        exporter.export_file("export.csv", first="2015-01-01")
@@ -3,50 +3,29 @@ import sqlite3
 from habit_classes import Habit, Daily, Weekly
 import functions as func
 import os
+import random
+from datetime import datetime, timedelta
 from freezegun import freeze_time
 
 
 @pytest.fixture
 def temporary_database() -> None:
-    # setup: create test database
+    # setup: close shared database connections and create an empty test database in memory (never written to disk)
+    Habit.close_db()
     Habit.Instances = {}
-    Habit.change_db("_test")
-
-    # refresh database (drop habit and tracking table and create them again)
-    conn = sqlite3.connect(Habit._DB_NAME)
-
-    cursor = conn.cursor()
-    cursor.execute("DROP TABLE IF EXISTS habit")
-    cursor.execute("DROP TABLE IF EXISTS tracking")
-    cursor.execute("""
-                        CREATE TABLE IF NOT EXISTS habit (
-                            id INTEGER PRIMARY KEY,
-                            name TEXT NOT NULL,
-                            description TEXT NOT NULL,
-                            period TEXT NOT NULL,
-                            date_created TEXT NOT NULL
-                        )        
-                    """)
-    cursor.execute("""
-                        CREATE TABLE IF NOT EXISTS tracking (
-                            id INTEGER PRIMARY KEY,
-                            habit_id INTEGER,
-                            date_checked TEXT,
-                            FOREIGN KEY (habit_id) REFERENCES habit(id)
-                        )   
-                    """)
-    conn.commit()
+    Habit.change_db("_test", memory="ephemeral")
 
     yield
 
-    # teardown: close database connection, delete habits
-    conn.close()
+    # teardown: close database connections (drops the test database), delete habits
+    Habit.close_db()
     Habit.Instances = {}
 
 
 @pytest.fixture
 def predefined_habits() -> list[Habit]:
-    # setup: create five predefined habits
+    # setup: create five predefined habits (in the in-memory test database)
+    Habit.change_db("_test", memory="ephemeral")
     # habit 1 - Brush teeth, Daily
     example_habit_1 = Daily("Brush", "Brush your teeth at least once a day.")
     # tracked dates from 22.12.14 to 18.01.15, missing date: 05.01.15
@@ -145,13 +124,11 @@ def test_create_habit(temporary_database):
     assert isinstance(Habit.Instances[d_name], Daily)
     assert isinstance(Habit.Instances[w_name], Weekly)
 
-    # check habit saving
-    with sqlite3.connect(Habit._DB_NAME) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT * FROM habit")
-        existing_habits = cursor.fetchall()
+    # check habit saving (the test database lives in memory, so it is read through the shared connection)
+    cursor = Habit._storage()._conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute("SELECT * FROM habit")
+    existing_habits = cursor.fetchall()
 
     assert len(existing_habits) == 2
     assert [habit["name"] for habit in existing_habits] == [d_name, w_name]
@@ -225,3 +202,82 @@ def test_habit_streak_string(predefined_habits):
                                      "Habit: Exercise - Streak: 20\n" +
                                      "Habit: Plants - Streak: 4\n" +
                                      "Habit: Clean - Streak: 2")
+
+
+@freeze_time("2015-01-18")
+def test_list_streak_db(temporary_database, predefined_habits):
+    for habit in Habit.Instances.values():
+        habit.save()
+
+    assert func.list_streak_db() == {"Brush": 13, "Duolingo": 13, "Exercise": 0, "Plants": 4, "Clean": 1}
+    assert func.list_streak_db(longest=True) == {"Brush": 14, "Duolingo": 14, "Exercise": 20, "Plants": 4, "Clean": 2}
+
+
+@freeze_time("2015-01-18")
+def test_list_streak_db_random(temporary_database):
+    # random histories around the current date (including future dates)
+    random.seed(5)
+    start = datetime(2014, 6, 1).date()
+    for number in range(30):
+        habit = Daily(f"Daily {number}", "Description") if number % 2 else Weekly(f"Weekly {number}", "Description")
+        density = random.random()
+        for offset in range(400):
+            if random.random() < density:
+                habit.checkoff_streak(str(start + timedelta(days=offset)))
+        habit.save()
+
+    # database results match the python implementation
+    assert func.list_streak_db() == {name: habit.streak() for name, habit in Habit.Instances.items()}
+    assert func.list_streak_db(longest=True) == {name: habit.longest_streak() for name, habit in
+                                                 Habit.Instances.items()}
+
+
+@freeze_time("2015-01-18")
+def test_list_streak_summary(temporary_database, predefined_habits):
+    for habit in Habit.Instances.values():
+        habit.save()
+
+    # reports of lazily loaded habits are answered from the summaries without loading tracking data
+    Habit.Instances = {}
+    Habit.load(lazy=True)
+    assert [streak for streak in func.list_streak(Habit.Instances).values()] == [13, 13, 0, 4, 1]
+    assert [streak for streak in func.list_longest_streak(Habit.Instances).values()] == [14, 14, 20, 4, 2]
+    assert func.list_active(Habit.Instances) == ["Brush", "Duolingo", "Plants", "Clean"]
+    assert not any(habit._tracking_loaded for habit in Habit.Instances.values())
+
+
+def test_rebuild_stats(temporary_database, predefined_habits):
+    for habit in Habit.Instances.values():
+        habit.save()
+    expected = {name: habit._current_summary() for name, habit in Habit.Instances.items()}
+
+    # summaries written on save match summaries computed by the database
+    func.rebuild_stats()
+    assert {name: habit._summary for name, habit in Habit.Instances.items()} == expected
+
+    # stale summaries are repaired
+    with Habit._storage().transaction() as storage:
+        storage._conn.execute("UPDATE habit_stats SET longest_streak = 0, total = 0")
+    func.rebuild_stats()
+    assert {name: habit._summary for name, habit in Habit.Instances.items()} == expected
+
+
+@freeze_time("2015-01-18")
+def test_checkoff_many(temporary_database, predefined_habits):
+    for habit in Habit.Instances.values():
+        habit.save()
+
+    results = func.checkoff_many([("Brush", "2015-01-05"), ("Brush", "2015-01-05"), ("Exercise", "today"),
+                                  ("Plants", datetime(2015, 1, 13).date()), ("Clean", "2015-01-07"),
+                                  ("Brush", "2015-02-01"), ("Brush", "05.01.2015"), ("Unknown", "2015-01-05")])
+    assert [result.status for result in results] == ["added", "duplicate", "added", "duplicate", "added", "invalid",
+                                                     "invalid", "invalid"]
+    assert results[3].date == "2015-01-13"
+
+    # all new dates are saved
+    assert all(not habit._dates_added for habit in Habit.Instances.values())
+    Habit.Instances = {}
+    Habit.load()
+    assert Habit.Instances["Brush"].longest_streak() == 28
+    assert Habit.Instances["Exercise"].streak() == 21
+    assert Habit.Instances["Clean"].streak() == 4
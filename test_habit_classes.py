@@ -1,6 +1,7 @@
 import pytest
 from datetime import datetime
-from habit_classes import Habit, Daily, Weekly
+import os
+from habit_classes import Habit, Daily, Weekly, HabitRepository
 from week_tuple import Week_tuple
 from freezegun import freeze_time
 import sqlite3
@@ -8,45 +9,22 @@ import sqlite3
 
 @pytest.fixture
 def temporary_database() -> None:
-    # setup: create test database
+    # setup: close shared database connections and create an empty test database in memory (never written to disk)
+    Habit.close_db()
     Habit.Instances = {}
-    Habit.change_db("_test")
-
-    # refresh database (drop habit and tracking table and create them again)
-    conn = sqlite3.connect(Habit._DB_NAME)
-
-    cursor = conn.cursor()
-    cursor.execute("DROP TABLE IF EXISTS habit")
-    cursor.execute("DROP TABLE IF EXISTS tracking")
-    cursor.execute("""
-                        CREATE TABLE IF NOT EXISTS habit (
-                            id INTEGER PRIMARY KEY,
-                            name TEXT NOT NULL,
-                            description TEXT NOT NULL,
-                            period TEXT NOT NULL,
-                            date_created TEXT NOT NULL
-                        )        
-                    """)
-    cursor.execute("""
-                        CREATE TABLE IF NOT EXISTS tracking (
-                            id INTEGER PRIMARY KEY,
-                            habit_id INTEGER,
-                            date_checked TEXT,
-                            FOREIGN KEY (habit_id) REFERENCES habit(id)
-                        )   
-                    """)
-    conn.commit()
+    Habit.change_db("_test", memory="ephemeral")
 
     yield
 
-    # teardown: close database connection, delete habits
-    conn.close()
+    # teardown: close database connections (drops the test database), delete habits
+    Habit.close_db()
     Habit.Instances = {}
 
 
 @pytest.fixture
 def predefined_habits() -> list[Habit]:
-    # setup: create five predefined habits
+    # setup: create five predefined habits (in the in-memory test database)
+    Habit.change_db("_test", memory="ephemeral")
     # habit 1 - Brush teeth, Daily
     example_habit_1 = Daily("Brush", "Brush your teeth at least once a day.")
     # tracked dates from 22.12.14 to 18.01.15, missing date: 05.01.15
@@ -197,6 +175,21 @@ class TestWeekly:
         example_week = Week_tuple(2021, 1)
         assert Habit.Instances["Plants"]._previous_week(example_week) == Week_tuple(2020, 53)
 
+    def test_week_index(self, predefined_habits):
+        # week units and Week_tuple objects convert into each other
+        for week in [Week_tuple(2020, 53), Week_tuple(2021, 1), Week_tuple(2024, 52)]:
+            assert Weekly._week_tuple(Weekly._week_index(week)) == week
+
+        assert Weekly._week_index(Week_tuple(2021, 1)) - Weekly._week_index(Week_tuple(2020, 53)) == 1
+
+    def test_weeks_checked(self, predefined_habits):
+        habit = Habit.Instances["Clean"]
+        assert habit._weeks_checked == {Weekly._unit(date.toordinal()) for date in habit._dates_checked}
+
+        habit.checkoff_streak("2015-01-07")
+        assert Weekly._unit(datetime(2015, 1, 7).toordinal()) in habit._weeks_checked
+        assert len(habit._weeks_checked) == 4
+
     def test_convert_week(self, predefined_habits):
         Habit.Instances["Plants"]._dates_checked = []
         # check-off January 4th of multiple years (is always in the first week of the year)
@@ -319,17 +312,205 @@ class TestDatabase:
         # check if Habit.Instances are empty
         assert len(Habit.Instances) == 0
 
-        # check if database tables are empty
-        with sqlite3.connect(Habit._DB_NAME) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            cursor.execute("SELECT * FROM habit")
-            existing_habits = cursor.fetchall()
+        # check if database tables are empty (through the shared connection, the test database lives in memory)
+        cursor = Habit._storage()._conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute("SELECT * FROM habit")
+        existing_habits = cursor.fetchall()
 
-            cursor.execute("SELECT * FROM tracking")
-            existing_tracking_data = cursor.fetchall()
+        cursor.execute("SELECT * FROM tracking")
+        existing_tracking_data = cursor.fetchall()
 
         assert len(existing_habits) == 0
         assert len(existing_tracking_data) == 0
 
+
+    def test_save_incremental(self, temporary_database, predefined_habits):
+        habit = Habit.Instances["Brush"]
+        habit.save()
+        assert habit._dates_added == []
+
+        # repeated saves and check-offs must only add the new dates
+        habit.save()
+        habit.checkoff_streak("1999-12-12")
+        assert habit._dates_added == [datetime(1999, 12, 12).date()]
+        habit.save()
+        habit.save()
+
+        cursor = Habit._storage()._conn.cursor()
+        cursor.execute("SELECT date_checked FROM tracking WHERE habit_id=?", (habit._id,))
+        tracked_dates = [row[0] for row in cursor.fetchall()]
+
+        assert len(tracked_dates) == 28
+        assert len(set(tracked_dates)) == 28
+
+
+    @freeze_time("2015-01-18")
+    def test_load_lazy(self, temporary_database, predefined_habits):
+        for habit in Habit.Instances.values():
+            habit.save()
+
+        # load metadata only
+        Habit.Instances = {}
+        Habit.load(lazy=True)
+        assert [habit._tracking_loaded for habit in Habit.Instances.values()] == [False] * 5
+
+        # streaks are answered from the summary, tracking data of a single habit is loaded on first access
+        assert Habit.Instances["Brush"].streak() == 13
+        assert Habit.Instances["Brush"].longest_streak() == 14
+        assert Habit.Instances["Brush"].is_active() is True
+        assert [habit._tracking_loaded for habit in Habit.Instances.values()] == [False] * 5
+        assert len(Habit.Instances["Brush"]._dates_checked) == 27
+        assert [habit._tracking_loaded for habit in Habit.Instances.values()] == [True, False, False, False, False]
+
+        # check-off of a lazily loaded habit only saves the new date
+        Habit.Instances["Plants"].checkoff_streak("2015-01-07")
+        Habit.Instances["Plants"].save()
+        assert len(Habit.Instances["Plants"]._dates_checked) == 4
+
+        # load remaining habits at once
+        Habit.prefetch()
+        assert all(habit._tracking_loaded for habit in Habit.Instances.values())
+        assert [habit.longest_streak() for habit in Habit.Instances.values()] == [14, 14, 20, 4, 2]
+
+
+@pytest.fixture
+def repositories() -> list[HabitRepository]:
+    # setup: two empty user repositories
+    repositories = [HabitRepository("_user_a"), HabitRepository("_user_b")]
+    for repository in repositories:
+        repository.close()
+        if os.path.exists(repository.db_name):
+            os.remove(repository.db_name)
+
+    yield repositories
+
+    # teardown: close and delete databases
+    for repository in repositories:
+        repository.close()
+        if os.path.exists(repository.db_name):
+            os.remove(repository.db_name)
+
+
+class TestRepository:
+
+    @freeze_time("2015-01-18")
+    def test_separate_users(self, repositories):
+        user_a, user_b = repositories
+        Habit.Instances = {}
+
+        # habits of the same name live in separate registries
+        Daily("Brush", "Brush your teeth.", user_a).checkoff_streak("2015-01-18")
+        Daily("Brush", "Brush your teeth.", user_b)
+        Weekly("Plants", "Water your plants.", user_b)
+        Habit.save_many(list(user_a.instances.values()) + list(user_b.instances.values()))
+        assert Habit.Instances == {}
+        user_a.instances["Brush"].update_name("Floss")
+        user_a.instances["Floss"].save()
+        user_b.instances["Plants"].delete()
+
+        # both users are loaded in one process without switching databases
+        reloaded_a, reloaded_b = HabitRepository("_user_a"), HabitRepository("_user_b")
+        reloaded_a.load()
+        reloaded_b.load(lazy=True)
+        assert list(reloaded_a.instances) == ["Floss"]
+        assert list(reloaded_b.instances) == ["Brush"]
+        assert reloaded_a.instances["Floss"].streak() == 1
+        assert reloaded_b.instances["Brush"].streak() == 0
+        assert reloaded_a.instances["Floss"]._repository is reloaded_a
+
+    def test_save_many_rollback(self, repositories):
+        user_a, _ = repositories
+        Daily("Brush", "Brush your teeth.", user_a).save()
+
+        # the name is taken in the database: the batch is rolled back, the new habits stay unsaved
+        other = HabitRepository("_user_a")
+        plants = Weekly("Plants", "Water your plants.", other)
+        plants.checkoff_streak("2015-01-12")
+        duplicate = Daily("Brush", "Brush your teeth.", other)
+        with pytest.raises(sqlite3.IntegrityError):
+            other.save_many([plants, duplicate])
+        assert plants._id is None and duplicate._id is None and plants._summary is None
+
+        # saving the remaining habit inserts it with its tracked dates
+        plants.save()
+        reloaded = HabitRepository("_user_a")
+        reloaded.load()
+        assert list(reloaded.instances) == ["Brush", "Plants"]
+        assert reloaded.instances["Plants"]._dates_checked == [datetime(2015, 1, 12).date()]
+        assert [row[0] for row in user_a.storage.fetch_tracking()] == [plants._id]
+
+    @freeze_time("2015-01-18")
+    def test_load_habit(self, repositories):
+        user_a, _ = repositories
+        Daily("Brush", "Brush your teeth.", user_a).checkoff_streak("2015-01-17")
+        Weekly("Plants", "Water your plants.", user_a).checkoff_streak("2015-01-12")
+        user_a.save_many(user_a.instances.values())
+
+        # only the requested habit and its tracking data are loaded
+        reloaded = HabitRepository("_user_a")
+        habit = reloaded.load_habit("Plants")
+        assert isinstance(habit, Weekly) and list(reloaded.instances) == ["Plants"]
+        assert habit._id == user_a.instances["Plants"]._id and habit.streak() == 1
+        assert reloaded.load_habit("Plants") is habit
+        assert reloaded.load_habit("Floss") is None
+
+        # the loaded habit is fully functional
+        habit.checkoff_streak("2015-01-18")
+        habit.save()
+        reloaded.load()
+        assert reloaded.instances["Plants"] is habit and habit.longest_streak() == 1
+        assert reloaded.instances["Brush"].longest_streak() == 1
+        assert reloaded.instances["Brush"]._dates_checked == [datetime(2015, 1, 17).date()]
+
+        # habits that are loaded lazily already are returned without their tracking data
+        lazy = HabitRepository("_user_a")
+        lazy.load(lazy=True)
+        assert lazy.load_habit("Brush") is lazy.instances["Brush"]
+        assert not lazy.instances["Brush"]._tracking_loaded
+
+        with pytest.raises(ValueError):
+            reloaded.load_habit(1)
+
+    def test_default_repository(self, temporary_database):
+        # habits without repository use Habit.Instances and Habit._DB_NAME
+        habit = Daily("Brush", "Brush your teeth.")
+        assert habit._repository is Habit.default_repository()
+        assert Habit.default_repository().instances is Habit.Instances
+        assert Habit.default_repository().db_name == "_test.db"
+
+        with pytest.raises(ValueError):
+            Daily("Brush", "Brush your teeth.", "_test")
+
+
+class TestRuns:
+
+    def test_run_count(self, predefined_habits):
+        assert [habit.run_count() for habit in Habit.Instances.values()] == [2, 2, 2, 1, 2]
+
+        # closing the gaps merges the runs
+        Habit.Instances["Brush"].checkoff_streak("2015-01-05")
+        Habit.Instances["Clean"].checkoff_streak("2015-01-07")
+        assert Habit.Instances["Brush"].run_count() == 1
+        assert Habit.Instances["Brush"].longest_streak() == 28
+        assert Habit.Instances["Clean"].run_count() == 1
+        assert Habit.Instances["Clean"].longest_streak() == 4
+
+    def test_week_unit(self, predefined_habits):
+        # consecutive iso weeks have consecutive units, also between years
+        assert Weekly._unit(datetime(2020, 12, 31).toordinal()) + 1 == Weekly._unit(datetime(2021, 1, 4).toordinal())
+        assert Weekly._unit(datetime(2021, 1, 4).toordinal()) == Weekly._unit(datetime(2021, 1, 10).toordinal())
+
+    def test_history_bitset(self, predefined_habits):
+        habit = Habit.Instances["Brush"]
+        bitset = habit.history_bitset()
+
+        # bits round-trip to the tracked dates
+        assert bitset.units() == list(habit._dates_checked.ordinals)
+        assert bitset.run_length(datetime(2015, 1, 18).toordinal()) == 13
+
+        # check-offs update the cached bitset
+        habit.checkoff_streak("2015-01-05")
+        assert habit.history_bitset() is bitset
+        assert bitset.run_length(datetime(2015, 1, 18).toordinal()) == 28
+        assert len(Habit.Instances["Plants"].history_bitset()) == 4
@@ -0,0 +1,55 @@
+import random
+import pytest
+from history_bitset import HistoryBitset
+
+
+def test_from_units():
+    bitset = HistoryBitset.from_units([12, 10, 11, 15], base=10)
+
+    assert bitset.base == 10
+    assert bitset.bits == 0b100111
+    assert len(bitset) == 4
+    assert bitset.units() == [10, 11, 12, 15]
+    assert 12 in bitset
+    assert 13 not in bitset
+    assert 9 not in bitset
+
+    # history before base lowers the base
+    assert HistoryBitset.from_units([5, 20], base=10).base == 5
+    assert HistoryBitset.from_units([]).units() == []
+
+    with pytest.raises(ValueError):
+        HistoryBitset(1.5)
+
+
+def test_round_trip():
+    random.seed(4)
+    units = sorted(random.sample(range(700000, 704000), 2500))
+    bitset = HistoryBitset.from_units(units)
+
+    restored = HistoryBitset.from_bytes(bitset.to_bytes(), bitset.base)
+    assert restored == bitset
+    assert restored.units() == units
+    assert bitset.nbytes <= 500
+
+
+def test_add():
+    bitset = HistoryBitset.from_units([10, 11])
+
+    assert bitset.add(12) is True
+    assert bitset.add(12) is False
+    assert bitset.add(7) is True
+    assert bitset.base == 7
+    assert bitset.units() == [7, 10, 11, 12]
+
+
+def test_count_and_run_length():
+    units = [1, 2, 3, 5, 6, 7, 8, 10]
+    bitset = HistoryBitset.from_units(units, base=0)
+
+    assert bitset.count() == 8
+    assert bitset.count(2, 6) == 4
+    assert bitset.count(first=6) == 4
+    assert bitset.count(last=0) == 0
+    assert bitset.count(9, 8) == 0
+    assert [bitset.run_length(unit) for unit in range(12)] == [0, 1, 2, 3, 0, 1, 2, 3, 4, 0, 1, 0]
@@ -0,0 +1,106 @@
+import json
+import os
+import pytest
+from datetime import date
+from habit_classes import Habit, Daily
+import importer
+from freezegun import freeze_time
+
+
+@pytest.fixture
+def import_database() -> None:
+    # setup: use an empty database with one existing habit
+    Habit.close_db()
+    Habit.Instances = {}
+    Habit.change_db("_import")
+    if os.path.exists(Habit._DB_NAME):
+        os.remove(Habit._DB_NAME)
+    Daily("Brush", "Brush your teeth.").checkoff_streak("2015-01-02")
+    Habit.Instances["Brush"].save()
+    Habit.Instances = {}
+
+    yield
+
+    # teardown: delete habits and database
+    Habit.close_db()
+    Habit.Instances = {}
+    Habit._DB_NAME = "_test.db"
+    os.remove("_import.db")
+
+
+@freeze_time("2015-01-18")
+def test_import_csv(import_database, tmp_path):
+    path = tmp_path / "history.csv"
+    path.write_text("habit,date,period,description\n"
+                    "Brush,2015-01-01,,\n"
+                    "Brush,2015-01-02,,\n"
+                    "Plants,2015-01-05,Weekly,Water your plants.\n"
+                    "Plants,2015-01-07,Weekly,Water your plants.\n"
+                    "Plants,2015-01-12,Weekly,Water your plants.\n"
+                    "Read,2015-01-17,,\n"
+                    "Read,2015-02-01,,\n"
+                    "Read,01.01.2015,,\n")
+
+    report = importer.import_file(str(path), chunk_size=3)
+    assert report[:5] == (8, 4, 2, 2, 2)
+
+    # duplicates are skipped with the rules of the habit period and summaries are rebuilt
+    Habit.load(lazy=True)
+    assert Habit.Instances["Brush"].longest_streak() == 2
+    assert Habit.Instances["Plants"].streak() == 2
+    assert Habit.Instances["Plants"]._description == "Water your plants."
+    assert Habit.Instances["Read"].streak() == 0
+    assert Habit.Instances["Read"]._dates_checked == [date(2015, 1, 17)]
+
+    # created habits exist since their first imported date, existing habits keep their creation date
+    assert Habit.Instances["Plants"]._date_created == "2015-01-05"
+    assert Habit.Instances["Read"]._date_created == "2015-01-17"
+    assert Habit.Instances["Brush"]._date_created != "2015-01-01"
+
+
+@freeze_time("2015-01-18")
+def test_import_jsonl(import_database, tmp_path):
+    path = tmp_path / "history.jsonl"
+    path.write_text("\n".join(json.dumps({"habit": "Clean", "date": f"2015-01-{day:02}", "period": "Weekly"})
+                              for day in range(1, 19)) + "\n")
+
+    report = importer.import_file(str(path))
+    assert report[:5] == (18, 3, 15, 0, 1)
+
+    Habit.load()
+    assert Habit.Instances["Clean"].streak() == 3
+
+
+@freeze_time("2015-01-18")
+def test_import_invalid_records(import_database, tmp_path):
+    # malformed lines, dates, names and descriptions are counted as invalid, valid records are imported
+    path = tmp_path / "history.jsonl"
+    path.write_text("\n".join(['["Brush", "2015-01-03"]', "{not json",
+                               '{"habit": "Brush", "date": ["2015-01-03"]}', '{"habit": 5, "date": "2015-01-03"}',
+                               json.dumps({"habit": "x" * 51, "date": "2015-01-03"}),
+                               json.dumps({"habit": "Read", "date": "2015-01-03", "description": "x" * 101}),
+                               '{"habit": "Brush", "date": "2015-01-03"}']) + "\n")
+
+    report = importer.import_file(str(path), chunk_size=2)
+    assert report[:5] == (7, 1, 0, 6, 0)
+
+    Habit.load()
+    assert list(Habit.Instances) == ["Brush"]
+    assert Habit.Instances["Brush"]._dates_checked == [date(2015, 1, 2), date(2015, 1, 3)]
+
+
+def test_import_invalid_file(import_database):
+    with pytest.raises(ValueError):
+        importer.import_file("history.txt")
+    with pytest.raises(ValueError):
+        importer.import_file("history.csv", chunk_size=0)
+
+
+def test_import_throughput(import_database, tmp_path):
+    path = tmp_path / "history.csv"
+    path.write_text("habit,date\n" + "".join(f"Habit {number % 7},2015-01-{number // 7 % 28 + 1:02}\n"
+                                             for number in range(1000)))
+
+    report = importer.import_file(str(path), chunk_size=100)
+    assert report.rows == 1000 and report.added == 7 * 28 and report.habits_created == 7
+    assert report.rows_per_second > 0
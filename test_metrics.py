@@ -0,0 +1,105 @@
+import socket
+import threading
+import pytest
+from habit_classes import Daily, Weekly, HabitRepository
+import functions as func
+import metrics
+
+
+def test_exposition():
+    registry = metrics.Registry()
+    counter = registry.counter("test_events", "Events.")
+    histogram = registry.histogram("test_seconds", "Latency.", buckets=(0.1, 1))
+    counter.inc()
+    counter.inc(2, kind='a"b')
+    histogram.observe(0.05, operation="save")
+    histogram.observe(0.5, operation="save")
+    histogram.observe(5, operation="save")
+
+    assert registry.exposition().splitlines() == [
+        "# TYPE test_events counter",
+        "# HELP test_events Events.",
+        "test_events_total 1",
+        'test_events_total{kind="a\\"b"} 2',
+        "# TYPE test_seconds histogram",
+        "# HELP test_seconds Latency.",
+        'test_seconds_bucket{operation="save",le="0.1"} 1',
+        'test_seconds_bucket{operation="save",le="1.0"} 2',
+        'test_seconds_bucket{operation="save",le="+Inf"} 3',
+        'test_seconds_count{operation="save"} 3',
+        'test_seconds_sum{operation="save"} 5.55',
+        "# EOF",
+    ]
+
+    with pytest.raises(ValueError):
+        counter.inc(-1)
+    with pytest.raises(ValueError):
+        registry.counter("test_events", "Events.")
+
+
+def test_habit_metrics():
+    repository = HabitRepository("_metrics", memory="ephemeral")
+    checkoffs = metrics.CHECKOFFS.value(period="Daily")
+    saves = metrics.SAVES.value()
+    loads = metrics.LOADS.value()
+    written = metrics.ROWS.total(operation="save")
+    read = metrics.ROWS.total(operation="load")
+    analytics_calls = metrics.ANALYTICS_SECONDS.count(function="list_streak")
+
+    habit = Daily("Brush", "Brush your teeth.", repository)
+    for day in ["2015-01-05", "2015-01-06", "2015-01-06"]:
+        habit.checkoff_streak(day)
+    Weekly("Plants", "Water your plants.", repository).checkoff_streak("2015-01-05")
+    repository.save_many(repository.instances.values())
+    func.list_streak(repository.instances)
+
+    reloaded = HabitRepository("_metrics")
+    reloaded.load()
+    repository.close()
+
+    assert metrics.CHECKOFFS.value(period="Daily") == checkoffs + 2
+    assert metrics.SAVES.value() == saves + 1
+    assert metrics.LOADS.value() == loads + 1
+    # 3 dates and 2 summaries written, 2 habits and 3 dates read
+    assert metrics.ROWS.total(operation="save") == written + 5
+    assert metrics.ROWS.total(operation="load") == read + 5
+    assert metrics.ANALYTICS_SECONDS.count(function="list_streak") == analytics_calls + 1
+    assert 'habit_db_seconds_count{operation="save"}' in metrics.REGISTRY.exposition()
+
+
+def test_exporter(tmp_path):
+    # file target: replaced on every write
+    path = tmp_path / "metrics.txt"
+    exporter = metrics.MetricsExporter(str(path), interval=60)
+    exporter.write()
+    assert path.read_text().endswith("# EOF\n")
+    exporter.close()
+    assert exporter.writes == 2
+
+    # socket target: a scraper stand-in collects the writes of the exporter thread
+    scraper = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    scraper.bind(str(tmp_path / "scraper.sock"))
+    scraper.listen()
+    received = []
+
+    def collect():
+        for _ in range(2):
+            connection, _ = scraper.accept()
+            with connection:
+                data = b""
+                while chunk := connection.recv(65536):
+                    data += chunk
+                received.append(data.decode())
+
+    thread = threading.Thread(target=collect)
+    thread.start()
+    exporter = metrics.configure(f"unix:{tmp_path / 'scraper.sock'}", 0.01)
+    thread.join(5)
+    exporter.close()
+    scraper.close()
+
+    assert len(received) == 2
+    assert all(text.startswith("# TYPE habit_checkoffs counter") and text.endswith("# EOF\n") for text in received)
+
+    with pytest.raises(ValueError):
+        metrics.MetricsExporter("", 1)
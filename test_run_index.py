@@ -0,0 +1,46 @@
+import random
+from run_index import RunIndex
+
+
+def test_add():
+    index = RunIndex()
+
+    assert index.add(5) is True
+    assert index.add(5) is False
+    assert index.add(7) is True
+    assert list(index) == [(5, 5), (7, 7)]
+
+    # closing the gap merges both runs
+    assert index.add(6) is True
+    assert list(index) == [(5, 7)]
+
+    # extending runs to the left and right
+    assert index.add(4) is True
+    assert index.add(8) is True
+    assert index.add(1) is True
+    assert list(index) == [(1, 1), (4, 8)]
+    assert len(index) == 2
+    assert index.longest() == 5
+    assert index.last_run() == (4, 8)
+
+
+def test_run_length():
+    index = RunIndex.from_units([1, 2, 3, 3, 5, 6])
+
+    assert list(index) == [(1, 3), (5, 6)]
+    assert [index.run_length(unit) for unit in range(0, 8)] == [0, 1, 2, 3, 0, 1, 2, 0]
+    assert RunIndex().run_length(1) == 0
+    assert RunIndex().last_run() is None
+
+
+def test_random_order():
+    random.seed(2)
+    units = random.sample(range(1000), 600)
+    index = RunIndex()
+    for unit in units:
+        index.add(unit)
+
+    # incremental index matches index built in one pass
+    expected = RunIndex.from_units(sorted(units))
+    assert list(index) == list(expected)
+    assert index.longest() == expected.longest()
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import date, timedelta
+from server import HabitServer
+from benchmarks.load_client import request, run
+
+
+def serve(directory, scenario, max_users=1000):
+    # run a scenario against a server on a free localhost port
+    async def main():
+        server = HabitServer(str(directory), workers=2, max_users=max_users)
+        host, port = await server.start("127.0.0.1", 0)
+        try:
+            return await scenario(host, port)
+        finally:
+            await server.close()
+
+    return asyncio.run(main())
+
+
+def test_endpoints(tmp_path):
+    today = date.today()
+
+    async def scenario(host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        responses = [
+            await request(reader, writer, "POST", "/users/alice/habits",
+                          {"name": "Brush", "description": "Brush your teeth.", "period": "Daily"}),
+            await request(reader, writer, "POST", "/users/alice/habits",
+                          {"name": "Brush", "description": "Brush your teeth."}),
+            await request(reader, writer, "POST", "/users/alice/checkoffs",
+                          {"items": [["Brush", str(today - timedelta(days=1))], ["Brush", "today"],
+                                     ["Brush", "today"], ["Floss", "today"]]}),
+            await request(reader, writer, "GET", "/users/alice/streaks"),
+            await request(reader, writer, "GET", "/users/alice/habits?period=Weekly"),
+            await request(reader, writer, "GET", "/users/bob/habits"),
+            await request(reader, writer, "GET", "/users/alice/unknown"),
+            await request(reader, writer, "DELETE", "/users/alice/habits"),
+            await request(reader, writer, "GET", "/users/a.b/habits"),
+        ]
+        writer.close()
+        return responses
+
+    responses = serve(tmp_path, scenario)
+    assert [status for status, _ in responses] == [200, 400, 200, 200, 200, 404, 404, 405, 400]
+    assert [result["status"] for result in responses[2][1]["results"]] == ["added", "added", "duplicate", "invalid"]
+    assert responses[3][1] == {"streaks": {"Brush": 2}}
+    assert responses[4][1] == {"habits": []}
+    # read requests do not create databases of unknown users
+    assert responses[5][1] == {"error": "User not found."}
+    assert not (tmp_path / "bob.db").exists()
+
+    # check-offs are saved to the database of the user
+    async def scenario(host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        response = await request(reader, writer, "GET", "/users/alice/streaks?longest=1")
+        writer.close()
+        return response
+
+    assert serve(tmp_path, scenario) == (200, {"streaks": {"Brush": 2}})
+
+
+def test_concurrent_clients(tmp_path):
+    report = serve(tmp_path, lambda host, port: run(host, port, clients=100, requests=6, users=10))
+    assert report["requests"] == 100 * 7
+
+
+def test_least_recently_used_users_are_closed(tmp_path):
+    async def main():
+        server = HabitServer(str(tmp_path), workers=2, max_users=1)
+        host, port = await server.start("127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for user in ["alice", "bob"]:
+                await request(reader, writer, "POST", f"/users/{user}/habits",
+                              {"name": f"Brush {user}", "description": "Brush your teeth."})
+            users = list(server._repositories)
+            return users, await request(reader, writer, "GET", "/users/alice/habits")
+        finally:
+            writer.close()
+            await server.close()
+
+    # alice is closed when bob is loaded and loaded again from her database
+    users, response = asyncio.run(main())
+    assert users == ["bob"]
+    assert response == (200, {"habits": [{"name": "Brush alice", "description": "Brush your teeth.",
+                                          "period": "Daily"}]})
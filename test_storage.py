@@ -0,0 +1,286 @@
+import os
+import pytest
+import sqlite3
+from datetime import date
+from habit_classes import Habit
+from storage import SCHEMA_VERSION, Storage, migrate, schema_version
+
+
+@pytest.fixture
+def legacy_database() -> str:
+    # setup: create database in the layout used before the schema was versioned
+    Habit.close_db()
+    Habit.Instances = {}
+    Habit.change_db("_legacy")
+
+    conn = sqlite3.connect(Habit._DB_NAME)
+    cursor = conn.cursor()
+    cursor.execute("DROP TABLE IF EXISTS habit")
+    cursor.execute("DROP TABLE IF EXISTS tracking")
+    cursor.execute("DROP TABLE IF EXISTS habit_stats")
+    cursor.execute("PRAGMA user_version = 0")
+    cursor.execute("""
+        CREATE TABLE habit (id INTEGER PRIMARY KEY, name TEXT NOT NULL, description TEXT NOT NULL,
+                            period TEXT NOT NULL, date_created TEXT NOT NULL)
+    """)
+    cursor.execute("""
+        CREATE TABLE tracking (id INTEGER PRIMARY KEY, habit_id INTEGER, date_checked TEXT,
+                               FOREIGN KEY (habit_id) REFERENCES habit(id))
+    """)
+    cursor.execute("INSERT INTO habit VALUES (1, 'Brush', 'Brush your teeth.', 'Daily', '2015-01-01')")
+    cursor.executemany("INSERT INTO tracking (habit_id, date_checked) VALUES (?, ?)",
+                       [(1, "2015-01-02"), (1, "2015-01-01"), (1, "2015-01-02"), (1, "not a date")])
+    conn.commit()
+    conn.close()
+
+    yield Habit._DB_NAME
+
+    # teardown: delete habits and database
+    Habit.close_db()
+    Habit.Instances = {}
+    Habit._DB_NAME = "_test.db"
+    os.remove("_legacy.db")
+
+
+def test_migrate_empty_database():
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+
+    assert schema_version(conn) == SCHEMA_VERSION
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    assert {"habit", "tracking"} <= tables
+
+    # running migrations again does not change anything
+    migrate(conn)
+    assert schema_version(conn) == SCHEMA_VERSION
+
+
+def test_migrate_newer_database():
+    conn = sqlite3.connect(":memory:")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+
+    with pytest.raises(ValueError):
+        migrate(conn)
+
+
+def test_migrate_legacy_database(legacy_database):
+    # opening the database upgrades it in place
+    Habit.load()
+
+    assert Habit.Instances["Brush"]._dates_checked == [date(2015, 1, 1), date(2015, 1, 2)]
+
+    with sqlite3.connect(legacy_database) as conn:
+        assert schema_version(conn) == SCHEMA_VERSION
+        rows = conn.execute("SELECT habit_id, date_checked FROM tracking ORDER BY date_checked").fetchall()
+        assert rows == [(1, date(2015, 1, 1).toordinal()), (1, date(2015, 1, 2).toordinal())]
+
+        # summary is created from the tracked dates
+        stats = conn.execute("SELECT run_start, last_checked, longest_streak, total FROM habit_stats").fetchall()
+        assert stats == [(rows[0][1], rows[1][1], 2, 2)]
+
+        # duplicates are rejected by the unique index
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO tracking (habit_id, date_checked) VALUES (?, ?)", rows[0])
+
+
+def test_migrate_duplicate_names():
+    conn = sqlite3.connect(":memory:")
+    migrate(conn)
+    # database of version 3 with two habits of the same name
+    conn.execute("DROP INDEX habit_name")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION - 1}")
+    for _ in range(2):
+        conn.execute("INSERT INTO habit (name, description, period, date_created) "
+                     "VALUES ('Brush', 'Brush your teeth.', 'Daily', '2015-01-01')")
+    conn.commit()
+
+    migrate(conn)
+    assert conn.execute("SELECT id, name FROM habit ORDER BY id").fetchall() == [(1, "Brush"), (2, "Brush (2)")]
+    with pytest.raises(sqlite3.IntegrityError):
+        conn.execute("UPDATE habit SET name = 'Brush' WHERE id = 2")
+
+
+def test_fetch_habit():
+    storage = Storage(":memory:")
+    habit_id = storage.insert_habit("Brush", "Brush your teeth.", "Daily", "2015-01-01")
+    storage.insert_dates([(habit_id, 3), (habit_id, 5)])
+    storage.rebuild_stats()
+
+    habit = storage.fetch_habit("Brush")
+    assert (habit["id"], habit["period"], habit["longest_streak"], habit["total"]) == (habit_id, "Daily", 1, 2)
+    assert storage.fetch_habit("Floss") is None
+    plan = " ".join(row[-1] for row in storage._conn.execute(f"EXPLAIN QUERY PLAN {storage._SELECT_HABIT}",
+                                                              ("Brush",)))
+    assert "habit_name" in plan
+    storage.close()
+
+
+def test_storage_shared():
+    Storage.close_all()
+    storage = Storage.open(":memory:")
+
+    assert Storage.open(":memory:") is storage
+
+    storage.close()
+    assert Storage.open(":memory:") is not storage
+    Storage.close_all()
+    assert len(Storage._open) == 0
+
+
+def test_storage_transaction():
+    storage = Storage(":memory:")
+
+    # nested transactions are committed with the outermost one
+    with storage.transaction():
+        with storage.transaction():
+            habit_id = storage.insert_habit("Brush", "Brush your teeth.", "Daily", "2015-01-01")
+        storage.insert_dates([(habit_id, 1), (habit_id, 2), (habit_id, 2)])
+
+    assert [row["name"] for row in storage.fetch_habits()] == ["Brush"]
+    assert list(storage.fetch_tracking()) == [(habit_id, 1), (habit_id, 2)]
+
+    # failing transactions are rolled back completely
+    with pytest.raises(RuntimeError):
+        with storage.transaction():
+            storage.insert_dates([(habit_id, 3)])
+            raise RuntimeError
+
+    assert list(storage.fetch_tracking()) == [(habit_id, 1), (habit_id, 2)]
+
+    storage.delete_habit(habit_id)
+    assert storage.fetch_habits() == []
+    assert list(storage.fetch_tracking()) == []
+    storage.close()
+
+
+def test_storage_failed_commit(tmp_path):
+    path = str(tmp_path / "busy.db")
+    storage = Storage(path)
+    storage._conn.execute("PRAGMA busy_timeout = 0")
+    reader = sqlite3.connect(path, timeout=0, isolation_level=None)
+
+    # the commit fails while another connection reads, the transaction is rolled back
+    reader.execute("BEGIN")
+    reader.execute("SELECT * FROM habit").fetchall()
+    with pytest.raises(sqlite3.OperationalError, match="locked"):
+        with storage.transaction():
+            storage.insert_habit("Brush", "Brush your teeth.", "Daily", "2015-01-01")
+    assert not storage._conn.in_transaction
+    reader.execute("COMMIT")
+    reader.close()
+
+    # the next transaction does not commit the statements of the failed one
+    with storage.transaction():
+        storage.insert_habit("Plants", "Water your plants.", "Weekly", "2015-01-01")
+    assert [row["name"] for row in storage.fetch_habits()] == ["Plants"]
+    storage.close()
+
+
+def test_storage_read_transaction(tmp_path):
+    path = str(tmp_path / "read.db")
+    storage = Storage(path)
+    with storage.transaction():
+        storage.insert_habit("Brush", "Brush your teeth.", "Daily", "2015-01-01")
+    other = sqlite3.connect(path, timeout=0)
+
+    # other processes cannot write between the queries of a read transaction
+    with storage.read_transaction():
+        assert storage.count_export_tracking() == 0
+        other.execute("INSERT INTO tracking (habit_id, date_checked) VALUES (1, 1)")
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            other.commit()
+        assert list(storage.fetch_export_tracking()) == []
+
+    other.commit()
+    other.close()
+    assert storage.count_export_tracking() == 1
+    storage.close()
+
+
+def test_storage_profiles(tmp_path):
+    path = str(tmp_path / "profile.db")
+    storage = Storage.open(path)
+
+    def pragmas():
+        return [storage._conn.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in ("journal_mode", "synchronous",
+                                                                                        "mmap_size")]
+
+    # profiles are applied to open databases, switching back restores the defaults
+    assert storage.profile == "strict" and pragmas() == ["delete", 2, 0]
+    Storage.set_profile(path, "fast")
+    assert storage.profile == "fast" and pragmas() == ["wal", 1, 256 * 1024 * 1024]
+    storage.insert_dates([(1, 1)])
+    storage.checkpoint()
+    assert os.path.getsize(path + "-wal") == 0
+    Storage.set_profile(path, None)
+    assert pragmas() == ["delete", 2, 0]
+
+    # default profile applies to databases without own profile
+    Storage.set_default_profile("balanced")
+    try:
+        assert pragmas() == ["wal", 1, 0]
+        other = Storage(str(tmp_path / "other.db"))
+        assert other.profile == "balanced"
+        other.close()
+    finally:
+        Storage.set_default_profile("strict")
+    storage.close()
+
+    with pytest.raises(ValueError):
+        Storage.set_profile(path, "unsafe")
+    with pytest.raises(ValueError):
+        Habit.change_db("_test", profile="unsafe")
+
+
+def test_storage_memory(tmp_path, monkeypatch):
+    path = str(tmp_path / "memory.db")
+    storage = Storage.open(path)
+    habit_id = storage.insert_habit("Brush", "Brush your teeth.", "Daily", "2015-01-01")
+    storage.insert_dates([(habit_id, 1)])
+    storage.close()
+
+    # snapshot mode: hydrated from the file, changes reach the file on snapshot only
+    monkeypatch.setattr(Storage, "snapshot_interval", 60.0)
+    Storage.set_memory(path, "snapshot")
+    storage = Storage.open(path)
+    assert storage._conn.execute("PRAGMA database_list").fetchone()[2] == ""
+    assert storage.fetch_dates(habit_id) == [1]
+    storage.insert_dates([(habit_id, 2)])
+    storage.flush()
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM tracking").fetchone()[0] == 1
+    assert storage.snapshot() is True
+    assert storage.snapshot() is False
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM tracking").fetchone()[0] == 2
+    storage.close()
+
+    # snapshots are written in the background
+    monkeypatch.setattr(Storage, "snapshot_interval", 0.01)
+    storage = Storage.open(path)
+    storage.insert_dates([(habit_id, 3)])
+    storage.flush()
+    storage._stop_snapshots.wait(0.2)
+    assert storage.snapshot() is False
+
+    # the last changes are written on close
+    storage.insert_dates([(habit_id, 4)])
+    storage.close()
+    Storage.set_memory(path, None)
+    storage = Storage.open(path)
+    assert storage.fetch_dates(habit_id) == [1, 2, 3, 4]
+
+    # ephemeral mode: the file is neither read nor written
+    Storage.set_memory(path, "ephemeral")
+    assert path not in Storage._open
+    storage = Storage.open(path)
+    assert storage.fetch_habits() == []
+    storage.insert_habit("Floss", "Floss your teeth.", "Daily", "2015-01-01")
+    storage.close()
+    Storage.set_memory(path, None)
+    storage = Storage.open(path)
+    assert [habit[1] for habit in storage.fetch_habits()] == ["Brush"]
+    storage.close()
+
+    with pytest.raises(ValueError):
+        Storage.set_memory(path, "disk")
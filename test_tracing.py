@@ -0,0 +1,83 @@
+import pstats
+from collections import deque
+from habit_classes import Habit, Daily, Weekly
+import functions as func
+import tracing
+from freezegun import freeze_time
+
+
+@freeze_time("2015-01-18")
+def test_spans(tmp_path):
+    Habit.close_db()
+    Habit.Instances = {}
+    Habit.change_db("_test", memory="ephemeral")
+    streak = Daily.streak
+    output = tmp_path / "spans.jsonl"
+
+    tracing.reset()
+    tracing.enable(str(output))
+    try:
+        assert tracing.enabled()
+        habit = Daily("Brush", "Brush your teeth.")
+        for day in ["2015-01-16", "2015-01-17", "2015-01-18"]:
+            habit.checkoff_streak(day)
+        habit.save()
+        Weekly("Plants", "Water your plants.").save()
+
+        assert habit.streak() == 3 and Habit.Instances["Plants"].longest_streak() == 0
+        assert func.list_streak(Habit.Instances) == {"Brush": 3, "Plants": 0}
+        func.list_streak_db()
+    finally:
+        tracing.disable()
+
+    # first span of every name
+    spans = {}
+    for span in tracing.spans():
+        spans.setdefault(span.name, span)
+    assert spans["Daily.streak"].habit_id == habit._id and spans["Daily.streak"].size == 3
+    assert spans["Weekly.longest_streak"].size == 0
+    assert spans["functions.list_streak"].size == 2 and spans["analytics.analyze"].size == 2
+    assert spans["sql.insert_dates"].size == 3
+    assert {"sql.insert_habit", "sql.update_stats", "sql.fetch_streaks", "functions.list_streak_db"} <= set(spans)
+    assert all(span.seconds >= 0 for span in tracing.spans())
+    assert len(output.read_text().splitlines()) == len(tracing.spans())
+
+    names = [row[0] for row in tracing.summary()]
+    assert sorted(names) == sorted(spans)
+
+    # disabling restores the original functions, nothing is recorded anymore
+    assert not tracing.enabled() and Daily.streak is streak
+    count = len(tracing.spans())
+    habit.streak()
+    assert len(tracing.spans()) == count
+
+    tracing.reset()
+    Habit.close_db()
+    Habit.Instances = {}
+
+
+def test_spans_are_bounded(monkeypatch):
+    # only recent spans are kept, the summary covers all spans
+    monkeypatch.setattr(tracing, "_spans", deque(maxlen=2))
+    tracing.reset()
+    for seconds in [0.1, 0.3, 0.2, 0.1, 0.3]:
+        tracing._record(tracing.Span("sql.fetch_habits", 0.0, seconds, None, None, "MainThread"))
+
+    assert [span.seconds for span in tracing.spans()] == [0.1, 0.3]
+    name, calls, total, mean, longest = tracing.summary()[0]
+    assert (name, calls, longest) == ("sql.fetch_habits", 5, 0.3) and abs(total - 1.0) < 1e-9
+    tracing.reset()
+
+
+def test_profile(tmp_path, capsys, monkeypatch):
+    path = tmp_path / "session.prof"
+    monkeypatch.setenv("HABIT_TRACE", "0")
+    monkeypatch.setenv("HABIT_PROFILE", str(path))
+
+    tracing.configure()
+    assert not tracing.enabled()
+    sorted(range(1000))
+    tracing.stop_profile()
+
+    assert "cumulative" in capsys.readouterr().err
+    assert pstats.Stats(str(path)).total_calls > 0
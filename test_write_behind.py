@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import pytest
+from datetime import date, timedelta
+from habit_classes import Habit, Daily, Weekly, HabitRepository
+from storage import Storage
+
+
+@pytest.fixture
+def repository() -> HabitRepository:
+    # setup: empty repository in write-behind mode
+    repository = HabitRepository("_write_behind")
+    if os.path.exists(repository.db_name):
+        os.remove(repository.db_name)
+
+    yield repository
+
+    # teardown: close and delete database
+    repository.close()
+    os.remove(repository.db_name)
+
+
+def tracked(repository: HabitRepository) -> dict:
+    # tracked dates in the database by habit name
+    reloaded = HabitRepository(repository.db_name[:-3])
+    reloaded.load()
+    return {name: list(habit._dates_checked) for name, habit in reloaded.instances.items()}
+
+
+def test_checkoffs_are_written_in_batches(repository):
+    writer = repository.enable_write_behind(max_delay=0.01, max_items=5)
+    assert repository.enable_write_behind() is writer
+
+    # new habits are saved immediately
+    habit = Daily("Brush", "Brush your teeth.", repository)
+    habit.save()
+    assert writer.stats()["items"] == 0
+
+    # check-offs are queued and applied in memory
+    days = [date(2015, 1, 1) + timedelta(days=offset) for offset in range(12)]
+    for day in days:
+        habit.checkoff_streak(str(day))
+        habit.save()
+        assert habit._dates_added == []
+    assert habit.streak() == 0 and habit.longest_streak() == 12
+
+    repository.flush()
+    stats = writer.stats()
+    assert stats["depth"] == 0 and stats["items"] == 12 and 3 <= stats["flushes"] <= 12
+    assert writer.last_flush_latency >= 0
+    assert tracked(repository) == {"Brush": days}
+    assert repository.storage.fetch_habits()[0]["total"] == 12
+
+
+def test_close_writes_pending_changes(repository):
+    Weekly("Plants", "Water your plants.", repository).save()
+    writer = repository.enable_write_behind(max_delay=60)
+
+    # renames and check-offs of one habit are coalesced
+    habit = repository.instances["Plants"]
+    habit.checkoff_streak("2015-01-05")
+    habit.save()
+    habit.update_name("Water")
+    habit.checkoff_streak("2015-01-12")
+    habit.save()
+    assert writer.depth == 2
+
+    repository.close()
+    assert repository.writer is None
+    assert writer.stats()["flushes"] == 1
+    assert tracked(repository) == {"Water": [date(2015, 1, 5), date(2015, 1, 12)]}
+
+    with pytest.raises(ValueError):
+        writer.enqueue([habit])
+
+
+def test_delete_waits_for_queue(repository):
+    habit = Daily("Brush", "Brush your teeth.", repository)
+    habit.save()
+    repository.enable_write_behind(max_delay=60)
+    habit.checkoff_streak("2015-01-05")
+    habit.save()
+
+    habit.delete()
+    assert repository.storage.fetch_dates(habit._id) == []
+    assert tracked(repository) == {}
+
+
+def test_new_habit_waits_for_queue(repository):
+    Daily("Brush", "Brush your teeth.", repository).save()
+    repository.enable_write_behind(max_delay=60)
+
+    # the new habit takes the name of the renamed habit, the queued rename is written first
+    repository.instances["Brush"].update_name("Teeth")
+    repository.instances["Teeth"].save()
+    Daily("Brush", "Brush your teeth.", repository).save()
+    assert repository.instances["Brush"]._id and repository.writer.depth == 0
+    assert tracked(repository) == {"Teeth": [], "Brush": []}
+
+
+def test_failed_changes_are_kept(repository):
+    for name in ["A", "B"]:
+        Daily(name, "Habit.", repository).save()
+    # habit of another process, unknown to the repository
+    with repository.storage.transaction():
+        repository.storage.insert_habit("C", "Habit.", "Daily", "2015-01-01")
+    writer = repository.enable_write_behind(max_delay=60)
+
+    # the rename violates the unique name, the check-offs are written nevertheless
+    habit_a, habit_b = repository.instances["A"], repository.instances["B"]
+    habit_a.checkoff_streak("2015-01-05")
+    habit_a.update_name("C")
+    habit_a.save()
+    habit_b.checkoff_streak("2015-01-05")
+    habit_b.save()
+    with pytest.raises(sqlite3.IntegrityError):
+        repository.flush()
+    assert tracked(repository)["B"] == [date(2015, 1, 5)]
+
+    # the failed change is returned to its habit and written by the next save
+    assert habit_a._dates_added == [date(2015, 1, 5)] and habit_a._saved_name is None
+    habit_a.update_name("D")
+    habit_a.save()
+    repository.flush()
+    assert tracked(repository) == {"D": [date(2015, 1, 5)], "B": [date(2015, 1, 5)], "C": []}
+    assert writer.stats()["depth"] == 0
+
+
+def test_close_db_stops_all_queues(repository):
+    habit = Daily("Brush", "Brush your teeth.", repository)
+    habit.save()
+    writer = repository.enable_write_behind(max_delay=60)
+    habit.checkoff_streak("2015-01-05")
+    habit.save()
+
+    # the queues of all repositories are written before the databases are closed
+    Habit.close_db()
+    assert repository.writer is None and writer.depth == 0
+    assert repository.db_name not in Storage._open
+    assert tracked(repository) == {"Brush": [date(2015, 1, 5)]}
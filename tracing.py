@@ -0,0 +1,271 @@
+import atexit
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+
+
+# timing span of one traced call
+#   size: tracked dates of the habit (habit methods), rows (statements) or habits (list functions), None if unknown
+Span = namedtuple("Span", ["name", "start", "seconds", "habit_id", "size", "thread"])
+
+# environment variables that enable tracing and profiling (see 'configure()')
+TRACE_VARIABLE = "HABIT_TRACE"
+PROFILE_VARIABLE = "HABIT_PROFILE"
+
+# largest number of recent spans kept in memory (long-running processes would grow without limit otherwise)
+MAX_SPANS = 10000
+
+# most recent spans and aggregates of all spans since the last reset. Keys: span name, Values: [calls, total, max]
+_spans = deque(maxlen=MAX_SPANS)
+_totals = {}
+# original functions of the patched instrumentation points. Keys: (owner, attribute name), Values: function
+_originals = {}
+_lock = threading.Lock()
+_output = None
+_profiler = None
+_profile_path = None
+
+
+def _history_size(habit) -> int:
+    # number of tracked dates, without loading the history of a lazily loaded habit
+    if habit._tracking_loaded:
+        return len(habit._date_store)
+    return habit._summary.total if habit._summary is not None else None
+
+
+def _habit_attributes(args, kwargs, result) -> tuple:
+    return args[0]._id, _history_size(args[0])
+
+
+def _statement_attributes(args, kwargs, result) -> tuple:
+    # Storage methods: size is the number of fetched or written rows (if they are a list)
+    rows = result if type(result) is list else args[1] if len(args) > 1 and type(args[1]) is list else None
+    return None, len(rows) if rows is not None else None
+
+
+def _habit_statement_attributes(args, kwargs, result) -> tuple:
+    # Storage methods of one habit: the habit id is their first argument
+    return args[1] if len(args) > 1 else kwargs.get("habit_id"), _statement_attributes(args, kwargs, result)[1]
+
+
+def _list_attributes(args, kwargs, result) -> tuple:
+    habit_dict = args[0] if args else kwargs.get("habit_dict")
+    return None, len(habit_dict) if isinstance(habit_dict, dict) else None
+
+
+def _instrumentation_points() -> list:
+    """
+    Function to list the traced functions: every statement of 'Storage', the streak methods of 'Daily' and 'Weekly', the
+    list functions of 'functions' and the vectorized analysis of 'analytics'.
+
+    Returns:
+        list: (owner, attribute name, span name, attributes function) tuples
+    """
+    # imported here, so importing this module does not import the habit tracker
+    import analytics
+    import functions
+    from habit_classes import Daily, Weekly
+    from storage import Storage
+
+    points = []
+    for name in ["insert_habit", "update_date_created", "insert_dates", "insert_weekly_dates", "update_stats", "rebuild_stats", "fetch_habits",
+                 "fetch_habit", "fetch_tracking", "fetch_streaks", "fetch_export_habits", "fetch_export_tracking",
+                 "count_export_tracking", "flush"]:
+        points.append((Storage, name, f"sql.{name}", _statement_attributes))
+    for name in ["update_habit", "delete_habit", "fetch_dates"]:
+        points.append((Storage, name, f"sql.{name}", _habit_statement_attributes))
+    for cls in (Daily, Weekly):
+        for name in ["streak", "longest_streak", "is_active"]:
+            points.append((cls, name, f"{cls.__name__}.{name}", _habit_attributes))
+    for name in ["list_habits", "list_active", "list_streak", "list_longest_streak", "list_streak_db"]:
+        points.append((functions, name, f"functions.{name}", _list_attributes))
+    for name in ["analyze", "count_in_window"]:
+        points.append((analytics, name, f"analytics.{name}", _list_attributes))
+
+    return points
+
+
+def _traced(function, name: str, attributes):
+    """
+    Function to wrap a function into a span.
+    """
+    @functools.wraps(function)
+    def traced(*args, **kwargs):
+        start = time.perf_counter()
+        result = None
+        try:
+            result = function(*args, **kwargs)
+            return result
+        finally:
+            seconds = time.perf_counter() - start
+            habit_id, size = attributes(args, kwargs, result)
+            _record(Span(name, start, seconds, habit_id, size, threading.current_thread().name))
+
+    return traced
+
+
+def _record(span: Span) -> None:
+    with _lock:
+        _spans.append(span)
+        totals = _totals.get(span.name)
+        if totals is None:
+            totals = _totals[span.name] = [0, 0.0, 0.0]
+        totals[0] += 1
+        totals[1] += span.seconds
+        totals[2] = max(totals[2], span.seconds)
+        if _output is not None:
+            _output.write(json.dumps(span._asdict()) + "\n")
+
+
+def enabled() -> bool:
+    """
+    Function to check whether tracing is enabled.
+    """
+    return bool(_originals)
+
+
+def enable(output: str = None) -> None:
+    """
+    Function to enable tracing: wraps every instrumentation point (see '_instrumentation_points()') into a span. While
+    tracing is disabled, the original functions are in place, so there is no overhead.
+
+    Args:
+        output (str) = None: File to append every span to as a JSON line (in addition to the summary on exit)
+    """
+    global _output
+    if enabled():
+        return
+
+    for owner, attribute, name, attributes in _instrumentation_points():
+        function = owner.__dict__[attribute]
+        _originals[(owner, attribute)] = function
+        setattr(owner, attribute, _traced(function, name, attributes))
+
+    if output is not None:
+        _output = open(output, "a")
+    atexit.register(_exit_summary)
+
+
+def disable() -> None:
+    """
+    Function to disable tracing and restore the original functions. Recorded spans are kept.
+    """
+    global _output
+    for (owner, attribute), function in _originals.items():
+        setattr(owner, attribute, function)
+    _originals.clear()
+
+    if _output is not None:
+        _output.close()
+        _output = None
+    atexit.unregister(_exit_summary)
+
+
+def spans() -> list:
+    """
+    Function to get the most recent recorded spans (at most 'MAX_SPANS', all spans are written to the output file).
+
+    Returns:
+        list: Span
+    """
+    return list(_spans)
+
+
+def reset() -> None:
+    """
+    Function to discard the recorded spans and their aggregates.
+    """
+    with _lock:
+        _spans.clear()
+        _totals.clear()
+
+
+def summary() -> list:
+    """
+    Function to get the aggregates of all recorded spans by name (kept while spans are recorded, not limited by
+    'MAX_SPANS').
+
+    Returns:
+        list: (name, calls, total seconds, mean seconds, max seconds) tuples, by total time descending
+    """
+    with _lock:
+        totals = [(name, *values) for name, values in _totals.items()]
+
+    rows = [(name, calls, total, total / calls, longest) for name, calls, total, longest in totals]
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+def print_summary(file=None) -> None:
+    """
+    Function to print the summary of the recorded spans (default: to stderr).
+    """
+    file = file or sys.stderr
+    print(f"{'span':<32} {'calls':>8} {'total [ms]':>11} {'mean [us]':>10} {'max [us]':>10}", file=file)
+    for name, calls, total, mean, longest in summary():
+        print(f"{name:<32} {calls:>8} {total * 1000:>11.2f} {mean * 1e6:>10.1f} {longest * 1e6:>10.1f}", file=file)
+
+
+def _exit_summary() -> None:
+    if _totals:
+        print_summary()
+    disable()
+
+
+def start_profile(path: str = None) -> None:
+    """
+    Function to profile the rest of the session with cProfile. On exit (or 'stop_profile()'), a summary sorted by
+    cumulative time is printed to stderr.
+
+    Args:
+        path (str) = None: File to dump the raw statistics to (readable with 'pstats')
+    """
+    global _profiler, _profile_path
+    if _profiler is not None:
+        return
+
+    _profile_path = path
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+    atexit.register(stop_profile)
+
+
+def stop_profile(limit: int = 30) -> None:
+    """
+    Function to stop profiling, print the 'limit' most expensive functions (cumulative time) to stderr and dump the
+    statistics if a path was given.
+    """
+    global _profiler
+    if _profiler is None:
+        return
+
+    _profiler.disable()
+    if _profile_path is not None:
+        _profiler.dump_stats(_profile_path)
+    pstats.Stats(_profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(limit)
+    _profiler = None
+    atexit.unregister(stop_profile)
+
+
+def configure(trace: str = None, profile: str = None) -> None:
+    """
+    Function to enable tracing and profiling from command line options or, if not given, from the environment
+    variables 'HABIT_TRACE' and 'HABIT_PROFILE'. A value of "1" enables tracing / profiling, any other value is the
+    output file (JSON lines of spans / raw cProfile statistics). "0" or an empty value disables them.
+
+    Args:
+        trace (str) = None: Value of the tracing option
+        profile (str) = None: Value of the profiling option
+    """
+    trace = trace if trace is not None else os.environ.get(TRACE_VARIABLE, "")
+    profile = profile if profile is not None else os.environ.get(PROFILE_VARIABLE, "")
+
+    if trace not in ("", "0"):
+        enable(None if trace == "1" else trace)
+    if profile not in ("", "0"):
+        start_profile(None if profile == "1" else profile)
@@ -14,10 +14,13 @@ def user_name_validator(name: str):
         return True
 
 
-def habit_name_validator(habit_name: str):
+def habit_name_validator(habit_name: str, habit_dict: dict = None):
+    if habit_dict is None:
+        habit_dict = Habit.Instances
+
     if len(habit_name) == 0 or len(habit_name) > 50:
         return "Habit name must be between 1 and 50 characters long."
-    elif habit_name in list_habits(Habit.Instances):
+    elif habit_name in list_habits(habit_dict):
         return "Habit name already taken."
     else:
         return True
@@ -0,0 +1,271 @@
+import atexit
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import date
+import metrics
+
+
+# changes of one habit since its last save, see 'WriteBehindQueue.enqueue()'
+_Delta = namedtuple("_Delta", ["habit_id", "name", "description", "ordinals", "summary", "enqueued"])
+
+# marks the end of the queue
+_STOP = object()
+# ends the current batch
+_FLUSH = object()
+
+
+class WriteBehindQueue:
+    """
+    Class to save the changes of habits in the background (write-behind).
+
+    Changes are applied in memory immediately. 'enqueue()' takes a snapshot of the changes in the calling thread and
+    returns at once, a writer thread coalesces the queued changes into batched transactions. A batch is written when it
+    holds 'max_items' changes or when the oldest change waited 'max_delay' seconds. Pending changes are written by
+    'flush()', by 'close()' and when the interpreter exits (atexit).
+    If a batch fails, its changes are written one habit at a time. Changes that still fail are returned to their habits
+    (see '_restore()'), so they are written by the next save, before the error is raised by 'flush()' or 'close()'.
+
+    Instance methods:
+        enqueue()
+        flush()
+        close()
+        stats()
+        _raise_error()
+        _restore()
+        _run()
+        _write()
+        _write_deltas()
+
+    Properties:
+        depth
+        last_flush_latency
+    """
+    def __init__(self, repository, max_delay: float = 0.05, max_items: int = 100):
+        """
+        Creates a queue and starts its writer thread.
+
+        Args:
+            repository (HabitRepository): Repository whose storage receives the changes
+            max_delay (float) = 0.05: Longest time in seconds a change waits for its batch
+            max_items (int) = 100: Largest number of changes per batch
+        """
+        if not isinstance(max_delay, (int, float)) or max_delay < 0:
+            raise ValueError("max_delay must be a non-negative number")
+        if not type(max_items) is int or max_items < 1:
+            raise ValueError("max_items must be a positive int")
+
+        self._repository = repository
+        self.max_delay = max_delay
+        self.max_items = max_items
+        self._queue = queue.Queue()
+        self._closed = False
+        self._error = None
+        # changes that could not be written, see '_restore()'
+        self._failed = []
+        self._lock = threading.Lock()
+        self._flushes = 0
+        self._items = 0
+        self._last_latency = 0.0
+        self._max_latency = 0.0
+        self._last_delay = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="habit-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def depth(self) -> int:
+        """
+        Number of changes waiting to be written.
+        """
+        return self._queue.qsize()
+
+    @property
+    def last_flush_latency(self) -> float:
+        """
+        Duration of the last batch transaction in seconds.
+        """
+        return self._last_latency
+
+    def enqueue(self, habits) -> None:
+        """
+        Queues the changes of habits since their last save and marks the habits as saved. Habits must have been saved
+        before (i.e. have an id).
+
+        Args:
+            habits (iterable): Habit instances
+        """
+        if self._closed:
+            raise ValueError("queue is closed")
+        self._restore()
+
+        now = time.monotonic()
+        for habit in habits:
+            if not habit._id:
+                raise ValueError("habits must be saved before their changes can be queued")
+
+            renamed = habit._name != habit._saved_name or habit._description != habit._saved_description
+            if not renamed and not habit._dates_added:
+                continue
+            if habit._dates_added:
+                habit._summary = habit._current_summary()
+            self._queue.put(_Delta(habit._id, habit._name if renamed else None, habit._description,
+                                   [day.toordinal() for day in habit._dates_added],
+                                   habit._summary if habit._dates_added else None, now))
+            habit._mark_saved()
+
+    def flush(self) -> None:
+        """
+        Writes all queued changes without waiting for 'max_delay' and waits until they are written.
+        """
+        if not self._closed:
+            self._queue.put(_FLUSH)
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """
+        Writes all queued changes and stops the writer thread. Called on exit if the queue was not closed before.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+            atexit.unregister(self.close)
+            # e.g. the database was locked by another process: try the failed changes once more
+            with self._lock:
+                failed, self._failed = self._failed, []
+            self._write_deltas(failed)
+        self._raise_error()
+
+    def stats(self) -> dict:
+        """
+        Returns the state of the queue.
+
+        Returns:
+            dict: depth, number of flushes (batches), number of written changes, duration of the last and of the
+            longest batch transaction in seconds and the time the oldest change of the last batch waited in seconds
+        """
+        return {"depth": self.depth, "flushes": self._flushes, "items": self._items,
+                "last_flush_seconds": self._last_latency, "max_flush_seconds": self._max_latency,
+                "last_delay_seconds": self._last_delay}
+
+    def _raise_error(self) -> None:
+        """
+        Raises the first error of the writer thread (once), after the changes that could not be written are returned to
+        their habits.
+        """
+        self._restore()
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _restore(self) -> None:
+        """
+        Returns the changes that could not be written to their habits (in the calling thread): the dates are added to
+        'Habit._dates_added' again and renamed habits are marked as unsaved, so the next save writes them.
+        """
+        with self._lock:
+            failed, self._failed = self._failed, []
+        if not failed:
+            return
+
+        habits_by_id = {habit._id: habit for habit in self._repository.instances.values()}
+        for delta in failed:
+            habit = habits_by_id.get(delta.habit_id)
+            # deleted habits have nothing to save
+            if habit is None:
+                continue
+            dates = [date.fromordinal(ordinal) for ordinal in delta.ordinals]
+            habit._dates_added.extend(day for day in dates if day not in habit._dates_added)
+            if delta.name is not None:
+                habit._saved_name = None
+
+    def _run(self) -> None:
+        """
+        Loop of the writer thread: collects changes into batches and writes them.
+        """
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP or item is _FLUSH:
+                stop = item is _STOP
+                self._queue.task_done()
+                continue
+
+            # collect until the batch is full, the oldest change waited long enough or a marker arrives
+            batch = [item]
+            markers = 0
+            deadline = item.enqueued + self.max_delay
+            while len(batch) < self.max_items:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP or item is _FLUSH:
+                    stop = item is _STOP
+                    markers = 1
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            for _ in range(len(batch) + markers):
+                self._queue.task_done()
+
+    def _write(self, batch: list) -> None:
+        """
+        Writes a batch of changes in one transaction. Names and summaries of a habit are coalesced to the latest change.
+        """
+        start = time.monotonic()
+        renamed = {}
+        summaries = {}
+        for delta in batch:
+            if delta.name is not None:
+                renamed[delta.habit_id] = (delta.name, delta.description)
+            if delta.summary is not None:
+                summaries[delta.habit_id] = delta.summary
+
+        try:
+            storage = self._repository.storage
+            with storage.transaction():
+                for habit_id, (name, description) in renamed.items():
+                    storage.update_habit(habit_id, name, description)
+                storage.insert_dates([(delta.habit_id, ordinal) for delta in batch for ordinal in delta.ordinals])
+                storage.update_stats(summaries.items())
+        except Exception:
+            # one bad change must not discard the changes of other habits
+            self._write_deltas(batch)
+            return
+
+        end = time.monotonic()
+        metrics.DB_SECONDS.observe(end - start, operation="write_behind")
+        metrics.ROWS.observe(sum(len(delta.ordinals) for delta in batch) + len(summaries), operation="write_behind")
+        self._flushes += 1
+        self._items += len(batch)
+        self._last_latency = end - start
+        self._max_latency = max(self._max_latency, self._last_latency)
+        self._last_delay = end - batch[0].enqueued
+
+    def _write_deltas(self, deltas: list) -> None:
+        """
+        Writes changes one at a time, each in its own transaction. Changes that fail are kept for '_restore()', the
+        first error is kept for '_raise_error()'.
+        """
+        storage = self._repository.storage
+        for delta in deltas:
+            try:
+                with storage.transaction():
+                    if delta.name is not None:
+                        storage.update_habit(delta.habit_id, delta.name, delta.description)
+                    storage.insert_dates([(delta.habit_id, ordinal) for ordinal in delta.ordinals])
+                    if delta.summary is not None:
+                        storage.update_stats([(delta.habit_id, delta.summary)])
+            except Exception as error:
+                with self._lock:
+                    self._failed.append(delta)
+                    if self._error is None:
+                        self._error = error
+                continue
+            self._items += 1